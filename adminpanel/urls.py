@@ -25,6 +25,8 @@ urlpatterns = [
     path("products/add/",                        views.product_add,    name="product_add"),
     path("products/edit/<int:product_id>/",      views.product_edit,   name="product_edit"),
     path("products/delete/<int:product_id>/",    views.product_delete, name="product_delete"),
+    path("products/import/",                     views.product_import, name="product_import"),
+    path("products/export/",                     views.product_export, name="product_export"),
 
     # ── CONTACT LENSES (Products) ──────────────────────────────────────────────
     path("contact-lenses/",                          views.contact_lens_list,   name="contact_lens_list"),
@@ -31,7 +31,9 @@ from orders.models import Order, OrderItem
 from users.models import User
 from reviews.models import Review
 from django.db.models import Count, Max
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+import io
+from catalog.bulk_io import FORMATS as CATALOG_FORMATS, import_catalog, export_catalog, format_for
 # Helper: Check if admin
 def is_admin(user):
     return (
@@ -492,6 +494,44 @@ def product_delete(request, product_id):
     return render(request, 'adminpanel/products/delete_confirm.html', {'product': product})
 
 
+@login_required
+@user_passes_test(is_admin)
+def product_import(request):
+    """Upload a CSV / JSONL file and upsert it by SKU (see catalog/bulk_io.py)."""
+    report = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        fmt = request.POST.get('format') or format_for(upload.name if upload else '', default=None)
+        if not upload:
+            messages.error(request, 'Choose a file to import.')
+        elif fmt not in CATALOG_FORMATS:
+            messages.error(request, 'Unknown file type; pick CSV or JSONL.')
+        else:
+            report = import_catalog(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''), fmt)
+            summary = (f"{report['products_created']} products created, {report['products_updated']} updated, "
+                       f"{report['variants_created']} variants created, {report['variants_updated']} updated.")
+            if report['error_count']:
+                messages.warning(request, f"{summary} {report['error_count']} rows skipped.")
+            else:
+                messages.success(request, summary)
+
+    return render(request, 'adminpanel/products/import.html', {'report': report, 'formats': CATALOG_FORMATS})
+
+
+@login_required
+@user_passes_test(is_admin)
+def product_export(request):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in CATALOG_FORMATS:
+        fmt = 'csv'
+    response = StreamingHttpResponse(
+        export_catalog(fmt),
+        content_type='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+    )
+    response['Content-Disposition'] = f'attachment; filename="catalog.{fmt}"'
+    return response
+
+
 # ==================== CONTACT LENSES ====================
 
 @login_required
@@ -1283,7 +1323,7 @@ def medical_lens_add(request):
                 messages.error(request, e)
         else:
             try:
-                LensOption.objects.create(
+                lens_option = LensOption.objects.create(
                     lens_brand_id=lens_brand_id,
                     lens_type_id=lens_type_id,
                     index=index,
@@ -1292,6 +1332,7 @@ def medical_lens_add(request):
                     max_power=max_power,
                     is_active=is_active,
                 )
+                lens_option.coatings.set(request.POST.getlist('coatings'))
                 messages.success(request, "Lens option added successfully!")
                 return redirect('adminpanel:medical_lens_list')
             except Exception as ex:
@@ -1344,6 +1385,7 @@ def medical_lens_edit(request, option_id):
                 lens_option.max_power = max_power
                 lens_option.is_active = is_active
                 lens_option.save()
+                lens_option.coatings.set(request.POST.getlist('coatings'))
                 messages.success(request, "Lens option updated successfully!")
                 return redirect('adminpanel:medical_lens_list')
             except Exception as ex:
@@ -1355,6 +1397,7 @@ def medical_lens_edit(request, option_id):
         'lens_types': LensType.objects.filter(is_active=True).order_by('name'),
         'index_choices': INDEX_CHOICES,
         'available_coatings': LensAddOn.objects.filter(is_active=True),
+        'selected_coatings': list(lens_option.coatings.all()),
     })
 
 
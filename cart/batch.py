@@ -0,0 +1,262 @@
+# cart/batch.py
+"""
+Batch cart changes.
+
+The cart endpoints change one line per request, and each read the line's
+quantity and saved it back, so two quick clicks could lose one of them.
+apply_cart_operations() applies a list of operations to a cart store
+(cart/store.py) at once:
+
+    {"op": "add", "product_id": 7, "quantity": 2}   a line; optionally with
+                                                    variant_id, lens_option_id,
+                                                    addon_ids,
+                                                    sunglass_lens_option_id,
+                                                    requires_prescription,
+                                                    prescription_data,
+                                                    special_instructions
+    {"op": "increment", "item_id": 12, "by": -1}
+    {"op": "set", "item_id": 12, "quantity": 3}     0 removes the line
+    {"op": "remove", "item_id": 12}
+
+parse_operations() checks them and loads the products, variants, lens
+options and add-ons they name with one query each, into a CartBatch: the
+resulting change of each existing line, and the new lines. A plain add
+(no lenses and no prescription) adds to the cart's plain line of the same
+product and variant, as add_to_cart always did. Quantities stay between 1
+and get_product_stock().
+
+The database store writes a batch in one transaction. It runs one UPDATE
+for all quantities, using F('quantity') + n so concurrent increments add up,
+and one DELETE. The new plain lines go in one bulk insert and all their
+add-ons in another.
+"""
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least
+
+from catalog.models import Product, ProductVariant
+from lenses.models import LensOption, LensOptionAddOn, SunglassLensOption
+
+
+MAX_OPERATIONS = 100  # per request to the batch endpoint
+
+
+class CartBatchError(ValueError):
+    """An operation of a batch is malformed or names something that cannot be added."""
+
+
+def get_product_stock(product):
+    """Return effective stock limit for a product."""
+    if getattr(product, 'track_inventory', False):
+        stock = getattr(product, 'stock_quantity', 0)
+        if stock and stock > 0:
+            return stock
+    return 99
+
+
+# ── Batch ─────────────────────────────────────────────────────────────────────
+
+@dataclass
+class LineChange:
+    """What a batch does to one existing line."""
+    quantity: int  = None   # set to this, before `by`; None keeps the current quantity
+    by:       int  = 0
+    remove:   bool = False
+
+    def final(self, current, stock):
+        base = current if self.quantity is None else self.quantity
+        return max(1, min(base + self.by, stock))
+
+    def expression(self, stock):
+        """The new quantity for an UPDATE; relative to the row's quantity unless set."""
+        if self.quantity is not None:
+            return Value(self.final(0, stock))
+        return Greatest(Least(F('quantity') + self.by, Value(stock)), Value(1))
+
+
+@dataclass
+class NewLine:
+    fields: dict                                # CartItem fields
+    addons: list = field(default_factory=list)  # [(LensAddOn, price)]
+    stock:  int  = 99
+
+    @property
+    def plain(self):
+        """A line add_to_cart would add to an existing one (see DatabaseCartStore.find_plain_item)."""
+        return not (
+            self.fields['requires_prescription'] or self.fields.get('lens_option')
+            or self.fields.get('sunglass_lens_option') or self.fields.get('prescription_data')
+            or self.fields.get('special_instructions') or self.addons
+        )
+
+    @property
+    def key(self):
+        variant = self.fields.get('variant')
+        return self.fields['product'].id, variant.id if variant else None
+
+
+class CartBatch:
+
+    def __init__(self):
+        self.changes   = {}  # item id → LineChange
+        self.new_lines = []
+
+    def change(self, item_id):
+        change = self.changes.setdefault(item_id, LineChange())
+        if change.remove:
+            raise CartBatchError(f'Item {item_id} is removed earlier in the batch.')
+        return change
+
+    def merge_plain(self, plain_items):
+        """
+        Turn the plain new lines the cart already has — `plain_items` maps
+        (product id, variant id) to the id of its plain line — into
+        increments of those lines. Returns the lines still to create.
+        """
+        left = []
+        for line in self.new_lines:
+            item_id = plain_items.get(line.key) if line.plain else None
+            if item_id is None or self.changes.get(item_id, LineChange()).remove:
+                left.append(line)
+            else:
+                self.changes.setdefault(item_id, LineChange()).by += line.fields['quantity']
+        return left
+
+
+# ── Parsing ───────────────────────────────────────────────────────────────────
+
+def _int(op, name, default=None):
+    value = op.get(name, default)
+    if value is None or value == '':
+        raise CartBatchError(f"{op.get('op')}: {name} is required.")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise CartBatchError(f"{op.get('op')}: {name} must be an integer.")
+
+
+def _ids(ops, name):
+    return {_int(op, name) for op in ops if op.get(name) not in (None, '')}
+
+
+def _addon_ids(op):
+    addon_ids = op.get('addon_ids') or []
+    if not isinstance(addon_ids, list):
+        raise CartBatchError('add: addon_ids must be a list.')
+    return [_int({'op': 'add', 'addon_id': addon_id}, 'addon_id') for addon_id in addon_ids]
+
+
+def parse_operations(operations):
+    """A CartBatch of a list of operation dicts; CartBatchError if any of them is invalid."""
+    if not isinstance(operations, list) or not all(isinstance(op, dict) for op in operations):
+        raise CartBatchError('operations must be a list of objects.')
+
+    adds = [op for op in operations if op.get('op') == 'add']
+    products = Product.objects.filter(is_active=True).in_bulk(_ids(adds, 'product_id'))
+    variants = ProductVariant.objects.in_bulk(_ids(adds, 'variant_id'))
+    lenses   = LensOption.objects.in_bulk(_ids(adds, 'lens_option_id'))
+    sunglass = SunglassLensOption.objects.in_bulk(_ids(adds, 'sunglass_lens_option_id'))
+    addons   = {
+        (row.lens_option_id, row.addon_id): row
+        for row in LensOptionAddOn.objects.filter(
+            lens_option_id__in=lenses, addon_id__in={addon_id for op in adds for addon_id in _addon_ids(op)},
+        ).select_related('addon')
+    }
+
+    batch, plain = CartBatch(), {}
+    for op in operations:
+        kind = op.get('op')
+        if kind == 'add':
+            line = _new_line(op, products, variants, lenses, sunglass, addons)
+            if line.plain and line.key in plain:
+                merged = plain[line.key]
+                merged.fields['quantity'] = min(merged.fields['quantity'] + line.fields['quantity'], line.stock)
+                continue
+            if line.plain:
+                plain[line.key] = line
+            batch.new_lines.append(line)
+        elif kind == 'increment':
+            batch.change(_int(op, 'item_id')).by += _int(op, 'by', 1)
+        elif kind == 'set':
+            change   = batch.change(_int(op, 'item_id'))
+            quantity = _int(op, 'quantity')
+            if quantity <= 0:
+                change.remove = True
+            else:
+                change.quantity, change.by = quantity, 0
+        elif kind == 'remove':
+            batch.change(_int(op, 'item_id')).remove = True
+        else:
+            raise CartBatchError(f'Unknown operation {kind!r}.')
+    return batch
+
+
+def _new_line(op, products, variants, lenses, sunglass, addons):
+    product = products.get(_int(op, 'product_id'))
+    if product is None:
+        raise CartBatchError(f"Product {op['product_id']} is not available.")
+
+    variant = None
+    if op.get('variant_id') not in (None, ''):
+        variant = variants.get(_int(op, 'variant_id'))
+        if variant is None or variant.product_id != product.id:
+            raise CartBatchError(f"Variant {op['variant_id']} is not a variant of {product.name}.")
+
+    unit_price = product.base_price
+    if variant and variant.price_adjustment:
+        unit_price += variant.price_adjustment
+
+    lens_option, sunglass_lens_option, lens_price = None, None, Decimal('0.00')
+    if op.get('lens_option_id') not in (None, ''):
+        lens_option = lenses.get(_int(op, 'lens_option_id'))
+        if lens_option is None:
+            raise CartBatchError(f"Lens option {op['lens_option_id']} does not exist.")
+        lens_price = lens_option.base_price
+    elif op.get('sunglass_lens_option_id') not in (None, ''):
+        sunglass_lens_option = sunglass.get(_int(op, 'sunglass_lens_option_id'))
+        if sunglass_lens_option is None:
+            raise CartBatchError(f"Sunglass lens option {op['sunglass_lens_option_id']} does not exist.")
+        lens_price = sunglass_lens_option.base_price
+
+    line_addons = []
+    for addon_id in dict.fromkeys(_addon_ids(op)):
+        row = addons.get((lens_option.id if lens_option else None, addon_id))
+        if row is None:
+            raise CartBatchError(f'Add-on {addon_id} is not available with this lens.')
+        line_addons.append((row.addon, row.price))
+
+    prescription_data = op.get('prescription_data')
+    if prescription_data is not None and not isinstance(prescription_data, dict):
+        raise CartBatchError('add: prescription_data must be an object.')
+
+    stock = get_product_stock(product)
+    return NewLine(
+        fields={
+            'product':               product,
+            'variant':               variant,
+            'quantity':              min(max(1, _int(op, 'quantity', 1)), stock),
+            'unit_price':            unit_price,
+            'requires_prescription': op.get('requires_prescription') in (True, 'true'),
+            'lens_option':           lens_option,
+            'sunglass_lens_option':  sunglass_lens_option,
+            'lens_price':            lens_price,
+            'prescription_data':     prescription_data,
+            'special_instructions':  str(op.get('special_instructions') or ''),
+        },
+        addons=line_addons,
+        stock=stock,
+    )
+
+
+# ── Entry point ───────────────────────────────────────────────────────────────
+
+def apply_cart_operations(store, operations):
+    """
+    Apply a list of operations to the cart `store` at once. Raises
+    CartBatchError for an invalid operation and CartItem.DoesNotExist for an
+    item the cart does not have; either way nothing is changed.
+    """
+    store.apply_batch(parse_operations(operations))
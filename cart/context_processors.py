@@ -1,33 +1,17 @@
 # cart/context_processors.py
-from django.db.models import Sum
-from .models import Cart
+from .summary import cart_summary
 
 
 def cart_processor(request):
     """
     Add cart info to template context.
-    Counts total QUANTITY (sum), not distinct rows.
+    Counts total QUANTITY (sum), not distinct rows — cached, and never
+    creates a session or cart (cart/summary.py).
     """
     cart_count = 0
 
     try:
-        if request.user.is_authenticated:
-            cart = Cart.objects.filter(customer=request.user).first()
-            if cart:
-                result = cart.items.aggregate(total=Sum('quantity'))
-                cart_count = result['total'] or 0
-        else:
-            # Only read session_key if a session already exists — don't force-create one
-            session_key = request.session.session_key
-            if session_key:
-                cart = Cart.objects.filter(
-                    session_key=session_key,
-                    customer=None
-                ).first()
-                if cart:
-                    result = cart.items.aggregate(total=Sum('quantity'))
-                    cart_count = result['total'] or 0
-
+        cart_count = cart_summary(request)['cart_count']
     except Exception as e:
         print(f"Cart context processor error: {e}")
 
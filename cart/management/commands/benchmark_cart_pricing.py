@@ -0,0 +1,93 @@
+# cart/management/commands/benchmark_cart_pricing.py
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from cart.models import Cart, CartItem, CartItemLensAddOn
+from cart.pricing import cart_lines, price_lines
+from catalog.models import Product
+from lenses.models import LensAddOn
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter:
+    """connection.execute_wrapper() that counts the queries run through it."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = ('Price throwaway carts of growing size with cart/pricing.py and report queries and time per size; '
+            'fails if the query count depends on the number of lines. Nothing is kept.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', default='1,10,100', help='Comma-separated cart sizes (default 1,10,100).')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per size (default 20).')
+
+    def handle(self, *args, **options):
+        sizes    = [int(size) for size in options['lines'].split(',')]
+        products = list(Product.objects.filter(is_active=True).order_by('id')[:max(sizes)])
+        if not products:
+            raise CommandError('No active products to put in the carts.')
+
+        results = []
+        try:
+            with transaction.atomic():
+                addons = [
+                    LensAddOn.objects.create(name=f'Benchmark {i}', addon_type='tinted', code=f'benchmark-pricing-{i}')
+                    for i in range(2)
+                ]
+                for size in sizes:
+                    results.append((size, *self._measure(self._cart(size, products, addons), options['repeat'])))
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f'{"lines":>6} {"queries":>8} {"ms":>8}  subtotal')
+        for size, queries, ms, subtotal in results:
+            self.stdout.write(f'{size:>6} {queries:>8} {ms:>8.2f}  {subtotal}')
+        if len({queries for _size, queries, _ms, _subtotal in results}) > 1:
+            raise CommandError('The number of queries depends on the number of cart lines.')
+        self.stdout.write(self.style.SUCCESS(f'{results[0][1]} query(ies) whatever the number of lines.'))
+
+    def _cart(self, size, products, addons):
+        cart  = Cart.objects.create(session_key=f'benchmark-pricing-{size}')
+        # One save() per line: the add-ons need its id, which bulk_create() does not return on MySQL
+        items = [
+            CartItem.objects.create(cart=cart, product=products[i % len(products)], quantity=1 + i % 3,
+                                    unit_price=products[i % len(products)].base_price, lens_price=Decimal(i % 2 * 150))
+            for i in range(size)
+        ]
+        CartItemLensAddOn.objects.bulk_create(
+            CartItemLensAddOn(cart_item=item, addon=addon, price=Decimal('25.00'))
+            for item in items for addon in addons
+        )
+        return cart
+
+    def _measure(self, cart, repeat):
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            pricing = price_lines(cart_lines(cart))
+
+        # Same lines priced item by item, as the views used to
+        expected = sum(
+            (item.unit_price + item.lens_price + sum(addon.price for addon in item.lens_addons.all())) * item.quantity
+            for item in cart.items.prefetch_related('lens_addons')
+        )
+        if pricing.subtotal != expected:
+            raise CommandError(f'Subtotal {pricing.subtotal} of a {cart.items.count()}-line cart, expected {expected}.')
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            price_lines(cart_lines(cart))
+        return queries.count, (time.perf_counter() - started) * 1000 / repeat, pricing.subtotal
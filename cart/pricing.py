@@ -0,0 +1,149 @@
+# cart/pricing.py
+"""
+Cart pricing — the one place cart lines become totals.
+
+The cart page and its AJAX endpoints, checkout and order placement, coupon
+validation and buy-now each priced carts with a Python loop of their own
+(reading lens_addons item by item, then another query for the quantity).
+They all go through price_lines() now:
+
+    line total   (unit price + lens price + add-on prices) × quantity
+    subtotal     Σ line totals
+    discount     the session coupon's amount, never more than the subtotal
+    shipping     SHIPPING_COST when the discounted subtotal is below
+                 FREE_SHIPPING_THRESHOLD — none for an empty cart or a
+                 free-shipping coupon
+    total        subtotal − discount + shipping (no tax)
+
+cart_lines() prices the lines of a Cart row in one annotated query —
+add-ons summed by a correlated subquery — whatever the number of lines;
+guest carts kept in the cache (cart/store.py) are priced from their cached
+lines. `manage.py benchmark_cart_pricing` checks the query count.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import CartItem, CartItemLensAddOn
+
+
+FREE_SHIPPING_THRESHOLD = Decimal('200.00')
+SHIPPING_COST           = Decimal('20.00')
+
+ZERO  = Decimal('0.00')
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+@dataclass(frozen=True)
+class PricedLine:
+    """One cart line; amounts are already multiplied by the quantity."""
+    item_id:  int
+    quantity: int
+    goods:    Decimal  # unit price
+    lenses:   Decimal  # lens price
+    addons:   Decimal  # lens add-ons
+
+    @property
+    def total(self):
+        return self.goods + self.lenses + self.addons
+
+
+@dataclass(frozen=True)
+class CartPricing:
+    lines:           tuple
+    quantity:        int
+    subtotal:        Decimal
+    addons_total:    Decimal
+    coupon_discount: Decimal
+    free_shipping:   bool
+    shipping:        Decimal
+    tax:             Decimal
+    total:           Decimal
+
+    @property
+    def discounted(self):
+        return self.subtotal - self.coupon_discount
+
+    @property
+    def free_shipping_remaining(self):
+        return max(ZERO, FREE_SHIPPING_THRESHOLD - self.discounted)
+
+    @property
+    def shipping_progress(self):
+        """Percentage of the way to free shipping, for the cart page's bar."""
+        return min(100, float(self.discounted / FREE_SHIPPING_THRESHOLD * 100)) if self.discounted > 0 else 0
+
+    def line(self, item_id):
+        return next((line for line in self.lines if line.item_id == item_id), None)
+
+    def line_total(self, item_id):
+        line = self.line(item_id)
+        return line.total if line else ZERO
+
+
+# ── Lines ─────────────────────────────────────────────────────────────────────
+
+def cart_lines(cart):
+    """PricedLines of the CartItem rows of `cart`, in one query."""
+    addon_prices = (
+        CartItemLensAddOn.objects.filter(cart_item=OuterRef('pk'))
+        .order_by().values('cart_item').annotate(total=Sum('price')).values('total')
+    )
+    rows = (
+        CartItem.objects.filter(cart=cart)
+        .annotate(addon_price=Coalesce(Subquery(addon_prices, output_field=MONEY), Value(ZERO), output_field=MONEY))
+        .annotate(
+            goods=ExpressionWrapper(F('unit_price') * F('quantity'), output_field=MONEY),
+            lenses=ExpressionWrapper(F('lens_price') * F('quantity'), output_field=MONEY),
+            addons=ExpressionWrapper(F('addon_price') * F('quantity'), output_field=MONEY),
+        )
+        .values_list('id', 'quantity', 'goods', 'lenses', 'addons')
+    )
+    return [PricedLine(*row) for row in rows]
+
+
+def product_line(product, quantity):
+    """A PricedLine for `quantity` of a product bought on its own (buy now)."""
+    return PricedLine(None, quantity, Decimal(product.base_price) * quantity, ZERO, ZERO)
+
+
+# ── Totals ────────────────────────────────────────────────────────────────────
+
+def _coupon_effect(coupon, subtotal):
+    """(discount, free shipping) of an applied coupon as stored in the session by promotions.apply_coupon."""
+    if not coupon:
+        return ZERO, False
+    if coupon.get('discount_type', '') == 'free_shipping':
+        return ZERO, True
+    try:
+        return min(Decimal(str(coupon.get('discount_amount', '0'))), subtotal), False
+    except Exception:
+        return ZERO, False
+
+
+def price_lines(lines, coupon=None):
+    """CartPricing of PricedLines, with `coupon` — the session's 'applied_coupon' — applied."""
+    lines    = tuple(lines)
+    subtotal = sum((line.total for line in lines), ZERO)
+    discount, free_shipping = _coupon_effect(coupon, subtotal)
+    discounted = max(subtotal - discount, ZERO)
+
+    if free_shipping or discounted >= FREE_SHIPPING_THRESHOLD or discounted == 0:
+        shipping = ZERO
+    else:
+        shipping = SHIPPING_COST
+
+    return CartPricing(
+        lines=lines,
+        quantity=sum(line.quantity for line in lines),
+        subtotal=subtotal,
+        addons_total=sum((line.addons for line in lines), ZERO),
+        coupon_discount=discount,
+        free_shipping=free_shipping,
+        shipping=shipping,
+        tax=ZERO,
+        total=discounted + shipping,
+    )
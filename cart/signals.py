@@ -1,10 +1,17 @@
 # cart/signals.py
 """
 Signal handlers for cart functionality.
-Merges guest cart into user cart on login.
+Merges guest cart into user cart on login — writing a guest cart kept in
+the cache (cart/store.py) to the database first — and drops the cached badge
+count (cart/summary.py) of a cart whenever it or one of its items changes.
 """
 from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+
+from .models import Cart, CartItem
+from .store import GUEST_CART_ID_KEY, DatabaseCartStore, guest_cart_store
+from .summary import invalidate_cart_summary
 from .views import merge_guest_cart_on_login
 
 
@@ -13,5 +20,27 @@ def merge_cart_on_login(sender, user, request, **kwargs):
     """
     Automatically merge guest cart with user cart when user logs in.
     """
-    if request.session.session_key:
-        merge_guest_cart_on_login(user, request.session.session_key)
\ No newline at end of file
+    guest = guest_cart_store(request)
+    if not isinstance(guest, DatabaseCartStore) and guest.quantity():
+        guest.materialise()
+    # login() has already changed the session key; a guest Cart row created
+    # before it is found by the id kept in the session.
+    guest_cart_id = request.session.pop(GUEST_CART_ID_KEY, None)
+    if request.session.session_key or guest_cart_id:
+        merge_guest_cart_on_login(user, request.session.session_key, guest_cart_id)
+
+
+@receiver(post_save, sender=Cart)
+@receiver(post_delete, sender=Cart)
+def forget_cart_summary(sender, instance, **kwargs):
+    invalidate_cart_summary(instance.customer_id, instance.session_key)
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def forget_cart_summary_for_item(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Cart):
+        return  # deleted with its cart, which forgets the summary itself
+    owner = Cart.objects.filter(pk=instance.cart_id).values_list('customer_id', 'session_key').first()
+    if owner:
+        invalidate_cart_summary(*owner)
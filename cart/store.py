@@ -0,0 +1,407 @@
+# cart/store.py
+"""
+Cart stores: where the items of a visitor's cart live.
+
+The cart views go through a store instead of Cart / CartItem rows:
+
+    items()                      CartItem objects, newest first, with product,
+                                 variant, lens options and add-ons loaded
+    get_item(item_id)            one of them, or CartItem.DoesNotExist
+    find_plain_item(p, variant)  the line without lenses or prescription that
+                                 a plain add-to-cart adds to, or None
+    add_item(addons, **fields)   a new line; fields as for CartItem
+    set_quantity(item, n) · remove_item(item) · clear()
+    apply_batch(batch)           a CartBatch (cart/batch.py) at once
+    quantity()                   total quantity
+    priced_lines()               PricedLines for cart/pricing.py
+    materialise()                the Cart row holding the items, created if
+                                 needed (checkout, login merge)
+
+DatabaseCartStore keeps them in Cart / CartItem rows — always for signed-in
+customers. Guests get settings.CART_GUEST_STORE, by default CacheCartStore
+when the default cache is shared between processes (core/checks.py) and
+DatabaseCartStore otherwise. CacheCartStore keeps one cache entry per guest
+cart, referenced from the session, so the quantity clicks of carts that are
+mostly abandoned never touch the database. Its items become rows only when
+materialise() is called — by the login merge (cart/signals.py) or
+get_or_create_cart() at checkout.
+
+Guest cache entries last GUEST_CART_TIMEOUT (the session lifetime) and are
+read and written whole; two tabs changing one guest cart at the same moment
+can lose one of the changes.
+"""
+
+import secrets
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, IntegerField, Sum, When
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from catalog.models import Product, ProductVariant
+from core.checks import PROCESS_LOCAL_CACHES
+from lenses.models import LensAddOn, LensOption, SunglassLensOption
+from .batch import get_product_stock
+from .models import Cart, CartItem, CartItemLensAddOn
+from .pricing import PricedLine, cart_lines
+from .summary import invalidate_cart_summary
+
+
+GUEST_CART_TIMEOUT = settings.SESSION_COOKIE_AGE
+SESSION_KEY        = 'guest_cart'
+GUEST_CART_ID_KEY  = 'guest_cart_id'  # survives the session key change at login
+
+# CartItem fields kept on a guest cart line (foreign keys by id)
+LINE_FIELDS = [
+    'product_id', 'variant_id', 'quantity', 'unit_price', 'requires_prescription',
+    'lens_option_id', 'sunglass_lens_option_id', 'lens_price', 'prescription_data',
+    'contact_lens_left_power', 'contact_lens_right_power', 'special_instructions',
+]
+
+ITEM_RELATED = ('product', 'product__brand', 'variant', 'lens_option', 'sunglass_lens_option')
+
+# The lines find_plain_item() looks among
+PLAIN_LINE = dict(requires_prescription=False, lens_option__isnull=True, sunglass_lens_option__isnull=True)
+
+
+def find_cart(request):
+    """The cart of the user or session, or None; unlike get_or_create_cart() never writes."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return Cart.objects.filter(customer=request.user).first()
+    session_key = request.session.session_key
+    if not session_key:
+        return None
+    return Cart.objects.filter(session_key=session_key, customer=None).first()
+
+
+def _create_cart(request, customer):
+    currency = request.session.get('currency', 'QAR')
+    if customer is not None:
+        cart, _ = Cart.objects.get_or_create(customer=customer, defaults={'currency': currency})
+        return cart
+    if not request.session.session_key:
+        request.session.create()
+    cart, _ = Cart.objects.get_or_create(
+        session_key=request.session.session_key, customer=None, defaults={'currency': currency}
+    )
+    request.session[GUEST_CART_ID_KEY] = cart.pk
+    return cart
+
+
+def _set_addons(item, addons):
+    """Fill item.lens_addons.all() with `addons`, as prefetch_related() would."""
+    queryset = CartItemLensAddOn.objects.all()
+    queryset._result_cache, queryset._prefetch_done = list(addons), True
+    item._prefetched_objects_cache = {'lens_addons': queryset}
+
+
+# ── Database ──────────────────────────────────────────────────────────────────
+
+class DatabaseCartStore:
+    """Items as CartItem rows of the visitor's Cart, which is created on the first add."""
+
+    def __init__(self, request):
+        self.request = request
+        self.cart    = find_cart(request)
+
+    def items(self):
+        if self.cart is None:
+            return []
+        return list(self.cart.items.select_related(*ITEM_RELATED).prefetch_related('lens_addons__addon'))
+
+    def get_item(self, item_id):
+        if self.cart is None:
+            raise CartItem.DoesNotExist
+        return self.cart.items.get(id=item_id)
+
+    def find_plain_item(self, product, variant):
+        if self.cart is None:
+            return None
+        return self.cart.items.filter(product=product, variant=variant, **PLAIN_LINE).first()
+
+    def add_item(self, addons=(), **fields):
+        item = CartItem.objects.create(cart=self.materialise(), **fields)
+        for addon in addons:
+            CartItemLensAddOn.objects.create(cart_item=item, addon=addon, price=addon.price)
+        return item
+
+    def set_quantity(self, item, quantity):
+        item.quantity = quantity
+        item.save()
+
+    def remove_item(self, item):
+        item.delete()
+
+    def clear(self):
+        if self.cart is not None:
+            self.cart.items.all().delete()
+
+    def apply_batch(self, batch):
+        """
+        Write `batch` in one transaction: one UPDATE of all quantities, one
+        DELETE, and bulk inserts of the new lines and their add-ons.
+        CartItem.DoesNotExist if it names an item the cart does not have.
+        """
+        with transaction.atomic():
+            cart = self.materialise() if batch.new_lines else self.cart
+            if cart is None:
+                raise CartItem.DoesNotExist
+
+            plain = {}
+            products = {line.fields['product'].id for line in batch.new_lines if line.plain}
+            if products:
+                for item_id, product_id, variant_id in (cart.items.filter(product_id__in=products, **PLAIN_LINE)
+                                                        .values_list('id', 'product_id', 'variant_id')):
+                    plain.setdefault((product_id, variant_id), item_id)  # the newest, as find_plain_item()
+            new_lines = batch.merge_plain(plain)
+
+            items = cart.items.select_related('product').in_bulk(batch.changes) if batch.changes else {}
+            if len(items) != len(batch.changes):
+                raise CartItem.DoesNotExist
+
+            changed = {item_id: change for item_id, change in batch.changes.items() if not change.remove}
+            if changed:
+                cart.items.filter(id__in=changed).update(
+                    quantity=Case(
+                        *[When(id=item_id, then=change.expression(get_product_stock(items[item_id].product)))
+                          for item_id, change in changed.items()],
+                        output_field=IntegerField(),
+                    ),
+                    updated_at=timezone.now(),
+                )
+            removed = [item_id for item_id, change in batch.changes.items() if change.remove]
+            if removed:
+                cart.items.filter(id__in=removed).delete()
+
+            plain_items, addons = [], []
+            for line in new_lines:
+                item = CartItem(cart=cart, **line.fields)
+                if not line.addons:
+                    plain_items.append(item)
+                    continue
+                item.save()  # the add-ons need its id, which bulk_create() does not return on MySQL
+                addons.extend(CartItemLensAddOn(cart_item=item, addon=addon, price=price) for addon, price in line.addons)
+            CartItem.objects.bulk_create(plain_items)
+            CartItemLensAddOn.objects.bulk_create(addons)
+            invalidate_cart_summary(cart.customer_id, cart.session_key)  # update() and bulk_create() send no signals
+
+    def quantity(self):
+        if self.cart is None:
+            return 0
+        return self.cart.items.aggregate(total=Sum('quantity'))['total'] or 0
+
+    def priced_lines(self):
+        return cart_lines(self.cart) if self.cart is not None else []
+
+    def materialise(self):
+        if self.cart is None:
+            self.cart = _create_cart(self.request, self.request.user if self.request.user.is_authenticated else None)
+        return self.cart
+
+
+# ── Cache ─────────────────────────────────────────────────────────────────────
+
+class CacheCartStore:
+    """
+    A guest cart as one cache entry {'currency', 'next_id', 'lines'}, each line
+    a dict of LINE_FIELDS plus 'id', 'addons' [(addon id, price)] and
+    'created_at'. The session only holds the entry's token, which survives
+    the session key change at login.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.token   = request.session.get(SESSION_KEY)
+        self._state  = None
+
+    @property
+    def state(self):
+        if self._state is None:
+            self._state = (cache.get(self._key()) if self.token else None) or {
+                'currency': self.request.session.get('currency', 'QAR'),
+                'next_id':  1,
+                'lines':    [],
+            }
+        return self._state
+
+    def _key(self):
+        return f'guest_cart:{self.token}'
+
+    def _save(self):
+        if not self.token:
+            self.token = secrets.token_urlsafe(16)
+            self.request.session[SESSION_KEY] = self.token
+        cache.set(self._key(), self.state, GUEST_CART_TIMEOUT)
+        invalidate_cart_summary(None, self.request.session.session_key)
+
+    def _line(self, item_id):
+        for line in self.state['lines']:
+            if line['id'] == item_id:
+                return line
+        raise CartItem.DoesNotExist
+
+    def _build(self, lines):
+        """CartItem objects (not saved; pk = line id) for `lines`, with everything they refer to in a few queries."""
+        def load(queryset, name):
+            return queryset.in_bulk({line[name] for line in lines if line[name] is not None})
+
+        products  = load(Product.objects.select_related('brand'), 'product_id')
+        variants  = load(ProductVariant.objects.all(), 'variant_id')
+        lenses    = load(LensOption.objects.all(), 'lens_option_id')
+        sunglass  = load(SunglassLensOption.objects.all(), 'sunglass_lens_option_id')
+        addons    = LensAddOn.objects.in_bulk({addon_id for line in lines for addon_id, _price in line['addons']})
+
+        items = []
+        for line in lines:
+            product = products.get(line['product_id'])
+            if product is None:  # deleted since it was added
+                continue
+            item = CartItem(id=line['id'], created_at=line['created_at'],
+                            **{name: line[name] for name in LINE_FIELDS})
+            item.product              = product
+            item.variant              = variants.get(line['variant_id'])
+            item.lens_option          = lenses.get(line['lens_option_id'])
+            item.sunglass_lens_option = sunglass.get(line['sunglass_lens_option_id'])
+            _set_addons(item, [
+                CartItemLensAddOn(addon=addons[addon_id], price=price)
+                for addon_id, price in line['addons'] if addon_id in addons
+            ])
+            items.append(item)
+        return items
+
+    def items(self):
+        return self._build(self.state['lines'][::-1])
+
+    def get_item(self, item_id):
+        return self._build([self._line(int(item_id))])[0]
+
+    def find_plain_item(self, product, variant):
+        for line in reversed(self.state['lines']):
+            if (line['product_id'] == product.id and line['variant_id'] == (variant.id if variant else None)
+                    and not line['requires_prescription'] and line['lens_option_id'] is None
+                    and line['sunglass_lens_option_id'] is None):
+                return self._build([line])[0]
+        return None
+
+    def _append(self, fields, addons):
+        """Add a line of CartItem `fields` and [(addon id, price)] to the state; returns it as a CartItem."""
+        item = CartItem(**fields)
+        line = {name: getattr(item, name) for name in LINE_FIELDS}
+        line.update(id=self.state['next_id'], addons=list(addons), created_at=timezone.now())
+        self.state['next_id'] += 1
+        self.state['lines'].append(line)
+        item.id = line['id']
+        return item
+
+    def add_item(self, addons=(), **fields):
+        item = self._append(fields, [(addon.id, addon.price) for addon in addons])
+        self._save()
+        return item
+
+    def set_quantity(self, item, quantity):
+        self._line(item.id)['quantity'] = item.quantity = quantity
+        self._save()
+
+    def remove_item(self, item):
+        self.state['lines'].remove(self._line(item.id))
+        self._save()
+
+    def clear(self):
+        if self.state['lines']:
+            self.state['lines'] = []
+            self._save()
+
+    def apply_batch(self, batch):
+        """Apply `batch` to the cached lines and write the entry once; nothing to increment in the database."""
+        lines = {line['id']: line for line in self.state['lines']}
+        plain = {
+            (line['product_id'], line['variant_id']): line['id']
+            for line in self.state['lines']  # oldest first, so the newest wins as in find_plain_item()
+            if not line['requires_prescription'] and line['lens_option_id'] is None
+            and line['sunglass_lens_option_id'] is None
+        }
+        new_lines = batch.merge_plain(plain)
+        if any(item_id not in lines for item_id in batch.changes):
+            raise CartItem.DoesNotExist
+
+        products = Product.objects.in_bulk({lines[item_id]['product_id'] for item_id in batch.changes})
+        for item_id, change in batch.changes.items():
+            line = lines[item_id]
+            if change.remove:
+                self.state['lines'].remove(line)
+            else:
+                line['quantity'] = change.final(line['quantity'], get_product_stock(products.get(line['product_id'])))
+        for line in new_lines:
+            self._append(line.fields, [(addon.id, price) for addon, price in line.addons])
+        self._save()
+
+    def quantity(self):
+        return sum(line['quantity'] for line in self.state['lines'])
+
+    def priced_lines(self):
+        lines = self.state['lines']
+        alive = set(Product.objects.filter(id__in={line['product_id'] for line in lines}).values_list('id', flat=True))
+        return [
+            PricedLine(
+                line['id'],
+                line['quantity'],
+                line['unit_price'] * line['quantity'],
+                Decimal(line['lens_price'] or 0) * line['quantity'],
+                sum((Decimal(price) for _addon_id, price in line['addons']), Decimal('0.00')) * line['quantity'],
+            )
+            for line in lines if line['product_id'] in alive
+        ]
+
+    def materialise(self):
+        """
+        Write the lines as CartItem rows of the session's guest Cart — even
+        once signed in, so the login merge combines them — and forget the
+        cache entry.
+        """
+        with transaction.atomic():
+            cart = _create_cart(self.request, None)
+            plain = []
+            for item in self._build(self.state['lines']):
+                addons = list(item.lens_addons.all())
+                item.pk, item.cart, item._prefetched_objects_cache = None, cart, {}
+                if not addons:
+                    plain.append(item)
+                    continue
+                item.save()  # the add-ons need its id, which bulk_create() does not return on MySQL
+                CartItemLensAddOn.objects.bulk_create(
+                    CartItemLensAddOn(cart_item=item, addon=addon.addon, price=addon.price) for addon in addons
+                )
+            CartItem.objects.bulk_create(plain)
+        if self.token:
+            cache.delete(self._key())
+            self.request.session.pop(SESSION_KEY, None)
+        self.token, self._state = None, None
+        return cart
+
+
+# ── Lookup ────────────────────────────────────────────────────────────────────
+
+def guest_cart_store(request):
+    """
+    The store of the session's guest cart: settings.CART_GUEST_STORE if set,
+    else CacheCartStore — or DatabaseCartStore when the default cache is
+    process-local, where a cached cart would only exist in the worker that
+    served the add and vanish on restart or eviction.
+    """
+    path = getattr(settings, 'CART_GUEST_STORE', None)
+    if path:
+        return import_string(path)(request)
+    if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+        return DatabaseCartStore(request)
+    return CacheCartStore(request)
+
+
+def get_cart_store(request):
+    """The store of the visitor's cart: the database for customers, the guest store otherwise."""
+    if request.user.is_authenticated:
+        return DatabaseCartStore(request)
+    return guest_cart_store(request)
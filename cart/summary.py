@@ -0,0 +1,84 @@
+# cart/summary.py
+"""
+Read-only cart and wishlist badge counts.
+
+Every page shows the cart and wishlist counts, and used to get them
+through cart.views.get_or_create_cart — which, for an anonymous visitor,
+created a session and a Cart row on a plain GET, so every crawler and
+first-time visitor cost two writes. Reads now go through the cart store
+(cart/store.py), which never creates anything: visitors without a session
+have an empty cart, and carts are created by the add-to-cart views only.
+
+cart_summary() caches the counts per cart owner (user or session) and per
+user's wishlist for SUMMARY_TIMEOUT; cart/signals.py, wishlist/signals.py
+and the guest cart store delete them after commit whenever a cart, cart
+item or wishlist item is written.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+SUMMARY_TIMEOUT = 60 * 60  # seconds; entries are deleted on every write anyway
+
+
+# ── Keys ──────────────────────────────────────────────────────────────────────
+
+def _cart_key(customer_id=None, session_key=None):
+    if customer_id is not None:
+        return f'cart_summary:user:{customer_id}'
+    return f'cart_summary:session:{session_key}' if session_key else None
+
+
+def _wishlist_key(user_id):
+    return f'cart_summary:wishlist:{user_id}'
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+def _cart_count(request):
+    from .store import get_cart_store  # the stores invalidate through this module
+
+    return get_cart_store(request).quantity()
+
+
+def _wishlist_count(user):
+    from wishlist.models import WishlistItem  # wishlist imports the catalog, not the cart
+
+    return WishlistItem.objects.filter(wishlist__user=user).count()
+
+
+def cart_summary(request):
+    """{'cart_count', 'wishlist_count'}: total cart quantity and wishlist items, from the cache when possible."""
+    user        = request.user
+    customer_id = user.pk if user.is_authenticated else None
+    cart_key    = _cart_key(customer_id, request.session.session_key)
+    if cart_key is None:
+        return {'cart_count': 0, 'wishlist_count': 0}
+
+    keys   = [cart_key] + ([_wishlist_key(customer_id)] if customer_id is not None else [])
+    cached = cache.get_many(keys)
+
+    summary = {'cart_count': cached.get(cart_key), 'wishlist_count': 0}
+    if summary['cart_count'] is None:
+        summary['cart_count'] = _cart_count(request)
+        cache.set(cart_key, summary['cart_count'], SUMMARY_TIMEOUT)
+    if customer_id is not None:
+        summary['wishlist_count'] = cached.get(_wishlist_key(customer_id))
+        if summary['wishlist_count'] is None:
+            summary['wishlist_count'] = _wishlist_count(user)
+            cache.set(_wishlist_key(customer_id), summary['wishlist_count'], SUMMARY_TIMEOUT)
+    return summary
+
+
+# ── Invalidation ──────────────────────────────────────────────────────────────
+
+def invalidate_cart_summary(customer_id=None, session_key=None):
+    """Forget the cached cart count of an owner once the current transaction commits."""
+    key = _cart_key(customer_id, session_key)
+    if key is not None:
+        transaction.on_commit(lambda: cache.delete(key))
+
+
+def invalidate_wishlist_count(user_id):
+    transaction.on_commit(lambda: cache.delete(_wishlist_key(user_id)))
@@ -1,3 +1,246 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from catalog.models import Category, Product
+from lenses.models import LensAddOn
+from .batch import CartBatchError, apply_cart_operations
+from .models import Cart, CartItem, CartItemLensAddOn
+from .store import CacheCartStore, DatabaseCartStore
+from .views import merge_guest_cart_on_login
+
+
+User = get_user_model()
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def guest_request():
+    request = RequestFactory().post('/')
+    request.session = SessionStore()
+    request.user = AnonymousUser()
+    return request
+
+
+def make_product(sku, stock=5, track_inventory=True):
+    category, _ = Category.objects.get_or_create(slug='frames', defaults={'name': 'Frames'})
+    return Product.objects.create(
+        sku=sku, name=sku, slug=sku.lower(), product_type='eyeglasses', category=category,
+        base_price=Decimal('100.00'), stock_quantity=stock, track_inventory=track_inventory,
+    )
+
+
+class CartBatchTestsMixin:
+    """apply_cart_operations() against the store of `store_class`."""
+
+    store_class = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.frame = make_product('FRAME-1', stock=5)
+        cls.other = make_product('FRAME-2', track_inventory=False)
+
+    def setUp(self):
+        self.request = guest_request()
+
+    def store(self):
+        return self.store_class(self.request)
+
+    def add(self, product, quantity=1, **fields):
+        return self.store().add_item(product=product, quantity=quantity, unit_price=product.base_price, **fields)
+
+    def apply(self, *operations):
+        apply_cart_operations(self.store(), list(operations))
+
+    def quantities(self):
+        return sorted((item.product_id, item.quantity, item.requires_prescription) for item in self.store().items())
+
+    def test_set_then_increment(self):
+        item = self.add(self.frame, 2)
+        self.apply({'op': 'set', 'item_id': item.id, 'quantity': 3},
+                   {'op': 'increment', 'item_id': item.id, 'by': 1})
+        self.assertEqual(self.store().get_item(item.id).quantity, 4)
+
+    def test_increments_add_up(self):
+        item = self.add(self.other, 1)
+        self.apply({'op': 'increment', 'item_id': item.id, 'by': 2},
+                   {'op': 'increment', 'item_id': item.id})
+        self.assertEqual(self.store().get_item(item.id).quantity, 4)
+
+    def test_set_zero_removes(self):
+        item = self.add(self.frame, 2)
+        self.apply({'op': 'set', 'item_id': item.id, 'quantity': 0})
+        self.assertEqual(self.quantities(), [])
+
+    def test_plain_add_merges_into_plain_line(self):
+        plain        = self.add(self.frame, 1)
+        prescription = self.add(self.frame, 1, requires_prescription=True)
+        self.apply({'op': 'remove', 'item_id': prescription.id},
+                   {'op': 'add', 'product_id': self.frame.id, 'quantity': 2})
+        self.assertEqual(self.quantities(), [(self.frame.id, 3, False)])
+        self.assertEqual(self.store().get_item(plain.id).quantity, 3)
+
+    def test_plain_add_after_removing_plain_line_is_a_new_line(self):
+        plain = self.add(self.frame, 1)
+        self.apply({'op': 'remove', 'item_id': plain.id},
+                   {'op': 'add', 'product_id': self.frame.id, 'quantity': 2})
+        self.assertEqual(self.quantities(), [(self.frame.id, 2, False)])
+        with self.assertRaises(CartItem.DoesNotExist):
+            self.store().get_item(plain.id)
+
+    def test_plain_adds_in_one_batch_make_one_line(self):
+        self.apply({'op': 'add', 'product_id': self.other.id, 'quantity': 1},
+                   {'op': 'add', 'product_id': self.other.id, 'quantity': 2})
+        self.assertEqual(self.quantities(), [(self.other.id, 3, False)])
+
+    def test_prescription_add_is_not_merged(self):
+        self.add(self.frame, 1)
+        self.apply({'op': 'add', 'product_id': self.frame.id, 'requires_prescription': True})
+        self.assertEqual(self.quantities(), [(self.frame.id, 1, False), (self.frame.id, 1, True)])
+
+    def test_quantities_are_clamped_to_stock(self):
+        item = self.add(self.frame, 4)
+        self.apply({'op': 'increment', 'item_id': item.id, 'by': 10})
+        self.assertEqual(self.store().get_item(item.id).quantity, 5)
+        self.apply({'op': 'set', 'item_id': item.id, 'quantity': 50})
+        self.assertEqual(self.store().get_item(item.id).quantity, 5)
+        self.apply({'op': 'increment', 'item_id': item.id, 'by': -10})
+        self.assertEqual(self.store().get_item(item.id).quantity, 1)
+
+    def test_new_line_is_clamped_to_stock(self):
+        self.apply({'op': 'add', 'product_id': self.frame.id, 'quantity': 9},
+                   {'op': 'add', 'product_id': self.frame.id, 'quantity': 9})
+        self.assertEqual(self.quantities(), [(self.frame.id, 5, False)])
+
+    def test_merged_add_is_clamped_to_stock(self):
+        item = self.add(self.frame, 4)
+        self.apply({'op': 'add', 'product_id': self.frame.id, 'quantity': 3})
+        self.assertEqual(self.store().get_item(item.id).quantity, 5)
+
+    def test_unknown_item_changes_nothing(self):
+        item = self.add(self.frame, 1)
+        with self.assertRaises(CartItem.DoesNotExist):
+            self.apply({'op': 'increment', 'item_id': item.id, 'by': 1},
+                       {'op': 'add', 'product_id': self.other.id},
+                       {'op': 'remove', 'item_id': item.id + 1000})
+        self.assertEqual(self.quantities(), [(self.frame.id, 1, False)])
+
+    def test_invalid_operation_changes_nothing(self):
+        item = self.add(self.frame, 1)
+        with self.assertRaises(CartBatchError):
+            self.apply({'op': 'increment', 'item_id': item.id, 'by': 1},
+                       {'op': 'add', 'product_id': self.other.id, 'quantity': 'two'})
+        self.assertEqual(self.quantities(), [(self.frame.id, 1, False)])
+
+    def test_change_after_remove_is_rejected(self):
+        item = self.add(self.frame, 1)
+        with self.assertRaises(CartBatchError):
+            self.apply({'op': 'remove', 'item_id': item.id},
+                       {'op': 'increment', 'item_id': item.id})
+        self.assertEqual(self.quantities(), [(self.frame.id, 1, False)])
+
+
+class DatabaseCartBatchTests(CartBatchTestsMixin, TestCase):
+    store_class = DatabaseCartStore
+
+    def test_unknown_item_on_empty_cart(self):
+        with self.assertRaises(CartItem.DoesNotExist):
+            self.apply({'op': 'remove', 'item_id': 1})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CacheCartBatchTests(CartBatchTestsMixin, TestCase):
+    store_class = CacheCartStore
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(cache.clear)
+
+
+class MergeGuestCartTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user  = User.objects.create_user(username='customer', email='customer@example.com', password='x')
+        cls.frame = make_product('FRAME-1', track_inventory=False)
+        cls.addon = LensAddOn.objects.create(name='Blue light', addon_type='blue_protection', code='blue-protection')
+
+    def setUp(self):
+        self.user_cart  = Cart.objects.create(customer=self.user)
+        self.guest_cart = Cart.objects.create(session_key='guest-session')
+
+    def line(self, cart, quantity=1, addons=(), **fields):
+        item = CartItem.objects.create(cart=cart, product=self.frame, quantity=quantity,
+                                       unit_price=self.frame.base_price, **fields)
+        for addon in addons:
+            CartItemLensAddOn.objects.create(cart_item=item, addon=addon, price=Decimal('50.00'))
+        return item
+
+    def merge(self, session_key='guest-session', guest_cart_id=None):
+        merge_guest_cart_on_login(self.user, session_key, guest_cart_id)
+
+    def lines(self):
+        return sorted(
+            (item.quantity, bool(item.prescription_data), sorted(addon.addon_id for addon in item.lens_addons.all()))
+            for item in CartItem.objects.filter(cart=self.user_cart).prefetch_related('lens_addons')
+        )
+
+    def test_same_plain_line_adds_quantity(self):
+        kept = self.line(self.user_cart, 1)
+        self.line(self.guest_cart, 2)
+        self.merge()
+        self.assertEqual(self.lines(), [(3, False, [])])
+        kept.refresh_from_db()
+        self.assertEqual(kept.quantity, 3)
+        self.assertFalse(Cart.objects.filter(pk=self.guest_cart.pk).exists())
+
+    def test_same_addons_add_quantity(self):
+        self.line(self.user_cart, 1, addons=[self.addon])
+        self.line(self.guest_cart, 1, addons=[self.addon])
+        self.merge()
+        self.assertEqual(self.lines(), [(2, False, [self.addon.id])])
+
+    def test_different_addons_move_over(self):
+        self.line(self.user_cart, 1)
+        self.line(self.guest_cart, 2, addons=[self.addon])
+        self.merge()
+        self.assertEqual(self.lines(), [(1, False, []), (2, False, [self.addon.id])])
+
+    def test_same_prescription_adds_quantity(self):
+        prescription = {'od_sphere': '-1.25', 'os_sphere': '-1.00'}
+        self.line(self.user_cart, 1, requires_prescription=True, prescription_data=prescription)
+        self.line(self.guest_cart, 1, requires_prescription=True, prescription_data=dict(prescription))
+        self.merge()
+        self.assertEqual(self.lines(), [(2, True, [])])
+
+    def test_different_prescription_moves_over(self):
+        self.line(self.user_cart, 1, requires_prescription=True, prescription_data={'od_sphere': '-1.25'})
+        self.line(self.guest_cart, 1, requires_prescription=True, prescription_data={'od_sphere': '-2.00'})
+        self.line(self.guest_cart, 1)
+        self.merge()
+        self.assertEqual(self.lines(), [(1, False, []), (1, True, []), (1, True, [])])
+
+    def test_guest_cart_becomes_the_users_without_one(self):
+        self.user_cart.delete()
+        self.line(self.guest_cart, 2, addons=[self.addon])
+        self.merge()
+        self.guest_cart.refresh_from_db()
+        self.assertEqual(self.guest_cart.customer, self.user)
+        self.assertIsNone(self.guest_cart.session_key)
+        self.assertEqual(self.guest_cart.items.get().lens_addons.count(), 1)
+
+    def test_guest_cart_found_by_id_after_session_key_change(self):
+        self.line(self.user_cart, 1)
+        self.line(self.guest_cart, 2)
+        self.merge(session_key='rotated-at-login', guest_cart_id=self.guest_cart.pk)
+        self.assertEqual(self.lines(), [(3, False, [])])
+
+    def test_other_guest_carts_are_left_alone(self):
+        other = Cart.objects.create(session_key='other-session')
+        self.line(other, 1)
+        self.merge()
+        self.assertEqual(self.lines(), [])
+        self.assertEqual(other.items.count(), 1)
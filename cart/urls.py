@@ -18,6 +18,7 @@ urlpatterns = [
     path('update/<int:item_id>/<str:action>/', views.update_cart_quantity, name='update_cart_quantity'),
     path('remove/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
     path('clear/', views.clear_cart, name='clear_cart'),
+    path('batch/', views.cart_batch, name='batch'),
     
     # AJAX Endpoints
     path('api/count/', views.get_cart_count, name='get_cart_count'),
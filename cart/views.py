@@ -3,158 +3,119 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST, require_http_methods
-from django.db.models import Sum
+from django.db.models import prefetch_related_objects
+from django.http import Http404
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from collections import Counter
 from decimal import Decimal
-
-from .models import Cart, CartItem, CartItemLensAddOn
-from catalog.models import Product, ProductVariant, ContactLensColor
+import json
+
+from .batch import MAX_OPERATIONS, CartBatchError, apply_cart_operations, get_product_stock
+from .models import Cart, CartItem
+from .pricing import price_lines
+from .store import get_cart_store
+from .summary import cart_summary, invalidate_cart_summary
+from catalog.models import Product, ProductVariant, ContactLensProduct
+from catalog.power_matrix import get_power_matrix, power_status
 from lenses.models import LensOption, LensAddOn, SunglassLensOption
 
 
-FREE_SHIPPING_THRESHOLD = Decimal('200.00')
-SHIPPING_COST           = Decimal('20.00')
-
-
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
 
 def get_or_create_cart(request):
-    """Get or create cart for user or session."""
-    if request.user.is_authenticated:
-        cart, _ = Cart.objects.get_or_create(
-            customer=request.user,
-            defaults={'currency': request.session.get('currency', 'QAR')}
-        )
-    else:
-        if not request.session.session_key:
-            request.session.create()
-        session_key = request.session.session_key
-        cart, _ = Cart.objects.get_or_create(
-            session_key=session_key,
-            customer=None,
-            defaults={'currency': request.session.get('currency', 'QAR')}
-        )
-    return cart
-
-
-def calculate_item_total(cart_item):
-    """Calculate total price for a cart item including lens options and add-ons."""
-    total = cart_item.unit_price * cart_item.quantity
-
-    if cart_item.lens_price:
-        total += cart_item.lens_price * cart_item.quantity
-
-    for addon in cart_item.lens_addons.all():
-        total += addon.price * cart_item.quantity
-
-    return total
-
-
-def get_coupon_discount(request, subtotal):
     """
-    Read the applied coupon from session and return the discount amount.
-    Returns (discount_amount, free_shipping_flag).
+    Get or create the Cart row of the user or session.
+    Guest carts kept in the cache (store.py) are written to the database
+    first; the cart views themselves go through get_cart_store().
     """
-    applied = request.session.get('applied_coupon')
-    if not applied:
-        return Decimal('0.00'), False
+    return get_cart_store(request).materialise()
 
-    discount    = Decimal('0.00')
-    free_ship   = False
-    disc_type   = applied.get('discount_type', '')
 
-    if disc_type == 'free_shipping':
-        free_ship = True
-    else:
-        try:
-            discount = Decimal(str(applied.get('discount_amount', '0')))
-            # Never discount more than the subtotal
-            discount = min(discount, subtotal)
-        except Exception:
-            discount = Decimal('0.00')
-
-    return discount, free_ship
+def get_cart_item_or_404(store, item_id):
+    """One item of the cart `store`; Http404 if the cart has no such item."""
+    try:
+        return store.get_item(item_id)
+    except CartItem.DoesNotExist:
+        raise Http404('No CartItem matches the given query.')
 
 
-def get_cart_totals(cart, request=None):
+def get_cart_totals(store, request=None):
     """
-    Calculate all cart totals.
+    CartPricing (pricing.py) of the cart `store` (store.py).
     Pass `request` to apply any active session coupon.
-    cart_count = total QUANTITY (sum of all item quantities).
+    quantity = total QUANTITY (sum of all item quantities).
     """
-    cart_items = cart.items.select_related(
-        'product', 'variant', 'lens_option', 'sunglass_lens_option'
-    ).prefetch_related('lens_addons')
-
-    subtotal = Decimal('0.00')
-    for item in cart_items:
-        subtotal += calculate_item_total(item)
-
-    # Coupon
-    coupon_discount = Decimal('0.00')
-    free_shipping   = False
-    if request is not None:
-        coupon_discount, free_shipping = get_coupon_discount(request, subtotal)
-
-    discounted = max(subtotal - coupon_discount, Decimal('0.00'))
-
-    # Shipping
-    if free_shipping or discounted >= FREE_SHIPPING_THRESHOLD:
-        shipping = Decimal('0.00')
-    elif discounted > Decimal('0.00'):
-        shipping = SHIPPING_COST
-    else:
-        shipping = Decimal('0.00')
-
-    total     = discounted + shipping
-    total_qty = cart_items.aggregate(total=Sum('quantity'))['total'] or 0
-
-    return {
-        'subtotal':        subtotal,
-        'coupon_discount': coupon_discount,
-        'tax':             Decimal('0.00'),
-        'shipping':        shipping,
-        'total':           total,
-        'item_count':      total_qty,
-    }
-
-
-def get_product_stock(product):
-    """Return effective stock limit for a product."""
-    if getattr(product, 'track_inventory', False):
-        stock = getattr(product, 'stock_quantity', 0)
-        if stock and stock > 0:
-            return stock
-    return 99
+    coupon = request.session.get('applied_coupon') if request is not None else None
+    return price_lines(store.priced_lines(), coupon)
+
+
+def _line_signature(item):
+    """What makes two cart lines the same purchase: everything but the quantity and the unit price."""
+    return (
+        item.product_id, item.variant_id, item.lens_option_id, item.sunglass_lens_option_id,
+        item.requires_prescription, item.lens_price,
+        json.dumps(item.prescription_data, sort_keys=True, default=str),
+        item.contact_lens_left_power, item.contact_lens_right_power, item.special_instructions,
+        frozenset(addon.addon_id for addon in item.lens_addons.all()),
+    )
 
 
-def merge_guest_cart_on_login(user, session_key):
-    """Merge guest cart with user cart on login."""
+def merge_guest_cart_on_login(user, session_key, guest_cart_id=None):
+    """
+    Merge guest cart (by session key, or by id) with user cart on login.
+    A guest line the user's cart already has (same _line_signature, add-ons
+    and prescription included) adds its quantity to it; the others move over
+    with their add-ons. Both carts are loaded at once and written with bulk
+    queries in one transaction — the same few queries whatever their size.
+    """
     try:
-        guest_cart = Cart.objects.filter(session_key=session_key, customer=None).first()
+        guest_q = Q(pk=guest_cart_id) if guest_cart_id else Q(session_key=session_key)
+        carts = list(
+            Cart.objects.filter((guest_q & Q(customer=None)) | Q(customer=user)).order_by('id')
+        )
+        guest_cart = next((cart for cart in carts if cart.customer_id is None), None)
+        user_cart  = next((cart for cart in carts if cart.customer_id == user.pk), None)
         if not guest_cart:
             return
 
-        user_cart, _ = Cart.objects.get_or_create(customer=user)
+        with transaction.atomic():
+            if user_cart is None:
+                guest_cart.customer, guest_cart.session_key = user, None
+                guest_cart.save(update_fields=['customer', 'session_key', 'updated_at'])
+                return
 
-        for item in guest_cart.items.all():
-            existing = user_cart.items.filter(
-                product=item.product,
-                variant=item.variant,
-                lens_option=item.lens_option,
-                sunglass_lens_option=item.sunglass_lens_option,
-            ).first()
-
-            if existing:
-                existing.quantity += item.quantity
-                existing.save()
-                item.delete()
-            else:
-                item.cart = user_cart
-                item.save()
-
-        guest_cart.delete()
+            items = (
+                CartItem.objects.filter(cart__in=[user_cart, guest_cart])
+                .order_by('cart_id', 'created_at', 'id')
+                .prefetch_related('lens_addons')
+            )
+            user_items  = [item for item in items if item.cart_id == user_cart.id]
+            guest_items = [item for item in items if item.cart_id == guest_cart.id]
+
+            lines = {}
+            for item in user_items:
+                lines.setdefault(_line_signature(item), item)
+
+            grown, moved = {}, []
+            for item in guest_items:
+                signature = _line_signature(item)
+                target    = lines.get(signature)
+                if target is None:
+                    lines[signature] = item
+                    moved.append(item.id)
+                else:
+                    target.quantity  += item.quantity
+                    target.updated_at = timezone.now()
+                    grown[target.id]  = target
+
+            CartItem.objects.bulk_update(grown.values(), ['quantity', 'updated_at'])
+            CartItem.objects.filter(id__in=moved).update(cart=user_cart, updated_at=timezone.now())
+            guest_cart.delete()  # with the lines merged into others
+            invalidate_cart_summary(user.pk)
 
     except Exception as e:
         print(f"Error merging cart: {e}")
@@ -166,52 +127,26 @@ def merge_guest_cart_on_login(user, session_key):
 
 def cart_view(request):
     """Display cart contents with coupon discount applied."""
-    cart       = get_or_create_cart(request)
-    cart_items = cart.items.select_related(
-        'product', 'variant', 'lens_option', 'sunglass_lens_option'
-    ).prefetch_related('lens_addons', 'product__images')
+    store      = get_cart_store(request)
+    cart_items = store.items()
+    prefetch_related_objects(cart_items, 'product__images')
+    totals     = get_cart_totals(store, request)   # ← pass request for coupon
 
-    # ── Per-item totals ───────────────────────────────────────────────────────
-    subtotal = Decimal('0.00')
     for item in cart_items:
-        item.item_total = calculate_item_total(item)
-        subtotal += item.item_total
-
-    # ── Coupon ────────────────────────────────────────────────────────────────
-    coupon_discount, free_shipping = get_coupon_discount(request, subtotal)
-    discounted = max(subtotal - coupon_discount, Decimal('0.00'))
-
-    # ── Shipping ──────────────────────────────────────────────────────────────
-    if free_shipping or discounted >= FREE_SHIPPING_THRESHOLD:
-        shipping = Decimal('0.00')
-    elif discounted > Decimal('0.00'):
-        shipping = SHIPPING_COST
-    else:
-        shipping = Decimal('0.00')
-
-    total = discounted + shipping
-
-    # ── Free-shipping progress bar (based on discounted subtotal) ─────────────
-    free_shipping_remaining = max(Decimal('0.00'), FREE_SHIPPING_THRESHOLD - discounted)
-    shipping_progress = (
-        min(100, float(discounted / FREE_SHIPPING_THRESHOLD * 100))
-        if discounted > 0 else 0
-    )
-
-    total_qty = cart_items.aggregate(total=Sum('quantity'))['total'] or 0
+        item.item_total = totals.line_total(item.id)
 
     context = {
-        'cart':                    cart,
+        'cart':                    store,
         'cart_items':              cart_items,
-        'subtotal':                subtotal,
-        'coupon_discount':         coupon_discount,
-        'tax':                     Decimal('0.00'),
-        'shipping':                shipping,
-        'total':                   total,
-        'item_count':              total_qty,
-        'cart_count':              total_qty,
-        'free_shipping_remaining': free_shipping_remaining,
-        'shipping_progress':       shipping_progress,
+        'subtotal':                totals.subtotal,
+        'coupon_discount':         totals.coupon_discount,
+        'tax':                     totals.tax,
+        'shipping':                totals.shipping,
+        'total':                   totals.total,
+        'item_count':              totals.quantity,
+        'cart_count':              totals.quantity,
+        'free_shipping_remaining': totals.free_shipping_remaining,
+        'shipping_progress':       totals.shipping_progress,
     }
 
     return render(request, 'cart.html', context)
@@ -224,65 +159,63 @@ def cart_view(request):
 def update_cart_quantity(request, item_id, action):
     """Update cart item quantity via AJAX. Accepts GET and POST."""
     try:
-        cart      = get_or_create_cart(request)
-        cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
+        store     = get_cart_store(request)
+        cart_item = get_cart_item_or_404(store, item_id)
 
         product     = cart_item.product
         stock_limit = get_product_stock(product)
 
         if action == 'increase':
             if cart_item.quantity >= stock_limit:
-                totals = get_cart_totals(cart, request)
+                totals = get_cart_totals(store, request)
                 return JsonResponse({
                     'success':      False,
                     'limit_reached': True,
                     'quantity':     cart_item.quantity,
                     'message':      f'Only {stock_limit} unit(s) available in stock.',
-                    'item_total':   str(calculate_item_total(cart_item)),
-                    'subtotal':     str(totals['subtotal']),
-                    'shipping':     str(totals['shipping']),
-                    'tax':          str(totals['tax']),
-                    'cart_total':   str(totals['total']),
-                    'cart_count':   totals['item_count'],
+                    'item_total':   str(totals.line_total(cart_item.id)),
+                    'subtotal':     str(totals.subtotal),
+                    'shipping':     str(totals.shipping),
+                    'tax':          str(totals.tax),
+                    'cart_total':   str(totals.total),
+                    'cart_count':   totals.quantity,
                 })
 
-            cart_item.quantity += 1
-            cart_item.save()
+            apply_cart_operations(store, [{'op': 'increment', 'item_id': cart_item.id, 'by': 1}])
 
         elif action == 'decrease':
             if cart_item.quantity <= 1:
-                totals = get_cart_totals(cart, request)
+                totals = get_cart_totals(store, request)
                 return JsonResponse({
                     'success':    False,
                     'block':      True,
                     'quantity':   cart_item.quantity,
                     'message':    'Minimum quantity is 1. Use the Remove button to delete.',
-                    'item_total': str(calculate_item_total(cart_item)),
-                    'subtotal':   str(totals['subtotal']),
-                    'shipping':   str(totals['shipping']),
-                    'tax':        str(totals['tax']),
-                    'cart_total': str(totals['total']),
-                    'cart_count': totals['item_count'],
+                    'item_total': str(totals.line_total(cart_item.id)),
+                    'subtotal':   str(totals.subtotal),
+                    'shipping':   str(totals.shipping),
+                    'tax':        str(totals.tax),
+                    'cart_total': str(totals.total),
+                    'cart_count': totals.quantity,
                 })
 
-            cart_item.quantity -= 1
-            cart_item.save()
+            apply_cart_operations(store, [{'op': 'increment', 'item_id': cart_item.id, 'by': -1}])
 
         else:
             return JsonResponse({'success': False, 'message': 'Invalid action.'}, status=400)
 
-        item_total = calculate_item_total(cart_item)
-        totals     = get_cart_totals(cart, request)   # ← pass request for coupon
+        totals = get_cart_totals(store, request)   # ← pass request for coupon
+        line   = totals.line(cart_item.id)
 
         return JsonResponse({
             'success':     True,
-            'quantity':    cart_item.quantity,
-            'item_total':  str(item_total),
-            'subtotal':    str(totals['subtotal']),
-            'shipping':    str(totals['shipping']),
-            'tax':         str(totals['tax']),
-            'cart_total':  str(totals['total']),
-            'cart_count':  totals['item_count'],
+            'quantity':    line.quantity if line else 0,
+            'item_total':  str(totals.line_total(cart_item.id)),
+            'subtotal':    str(totals.subtotal),
+            'shipping':    str(totals.shipping),
+            'tax':         str(totals.tax),
+            'cart_total':  str(totals.total),
+            'cart_count':  totals.quantity,
             'stock_limit': stock_limit,
         })
 
@@ -301,22 +234,22 @@ def update_cart_quantity(request, item_id, action):
 def remove_from_cart(request, item_id):
     """Remove item from cart via AJAX."""
     try:
-        cart      = get_or_create_cart(request)
-        cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
+        store     = get_cart_store(request)
+        cart_item = get_cart_item_or_404(store, item_id)
 
         product_name = cart_item.product.name
-        cart_item.delete()
+        store.remove_item(cart_item)
 
-        totals = get_cart_totals(cart, request)   # ← pass request for coupon
+        totals = get_cart_totals(store, request)   # ← pass request for coupon
 
         return JsonResponse({
             'success':    True,
             'message':    f'{product_name} removed from cart.',
-            'cart_count': totals['item_count'],
-            'subtotal':   str(totals['subtotal']),
-            'shipping':   str(totals['shipping']),
-            'tax':        str(totals['tax']),
-            'cart_total': str(totals['total']),
+            'cart_count': totals.quantity,
+            'subtotal':   str(totals.subtotal),
+            'shipping':   str(totals.shipping),
+            'tax':        str(totals.tax),
+            'cart_total': str(totals.total),
         })
 
     except Exception as e:
@@ -337,50 +270,24 @@ def add_to_cart(request):
         quantity   = max(1, int(request.POST.get('quantity', 1)))
 
         product = get_object_or_404(Product, id=product_id, is_active=True)
-        variant = None
-        if variant_id:
-            variant = get_object_or_404(ProductVariant, id=variant_id, product=product)
+        store   = get_cart_store(request)
 
-        stock = get_product_stock(product)
-        if quantity > stock:
-            quantity = stock
+        # Adds to the product's plain line if the cart has one (capped at stock)
+        apply_cart_operations(store, [{
+            'op':         'add',
+            'product_id': product.id,
+            'variant_id': variant_id,
+            'quantity':   quantity,
+        }])
 
-        cart = get_or_create_cart(request)
-
-        unit_price = product.base_price
-        if variant and variant.price_adjustment:
-            unit_price += variant.price_adjustment
-
-        existing = cart.items.filter(
-            product=product,
-            variant=variant,
-            requires_prescription=False,
-            lens_option__isnull=True,
-            sunglass_lens_option__isnull=True,
-        ).first()
-
-        if existing:
-            new_qty = min(existing.quantity + quantity, stock)
-            existing.quantity = new_qty
-            existing.save()
-        else:
-            CartItem.objects.create(
-                cart=cart,
-                product=product,
-                variant=variant,
-                quantity=quantity,
-                unit_price=unit_price,
-                requires_prescription=False,
-            )
-
-        totals = get_cart_totals(cart, request)
+        totals = get_cart_totals(store, request)
 
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
                 'success':    True,
                 'message':    f'{product.name} added to cart!',
-                'cart_count': totals['item_count'],
-                'cart_total': str(totals['total']),
+                'cart_count': totals.quantity,
+                'cart_total': str(totals.total),
             })
 
         messages.success(request, f'{product.name} added to cart!')
@@ -427,7 +334,7 @@ def add_eyeglass_to_cart(request):
         if variant_id:
             variant = get_object_or_404(ProductVariant, id=variant_id)
 
-        cart = get_or_create_cart(request)
+        store = get_cart_store(request)
 
         unit_price = product.base_price
         if variant and variant.price_adjustment:
@@ -446,8 +353,8 @@ def add_eyeglass_to_cart(request):
             except Exception:
                 pass
 
-        cart_item = CartItem.objects.create(
-            cart=cart,
+        store.add_item(
+            addons=LensAddOn.objects.filter(id__in=addon_ids),
             product=product,
             variant=variant,
             quantity=quantity,
@@ -459,25 +366,14 @@ def add_eyeglass_to_cart(request):
             special_instructions=request.POST.get('special_instructions', ''),
         )
 
-        for addon_id in addon_ids:
-            try:
-                addon = LensAddOn.objects.get(id=addon_id)
-                CartItemLensAddOn.objects.create(
-                    cart_item=cart_item,
-                    addon=addon,
-                    price=addon.price,
-                )
-            except LensAddOn.DoesNotExist:
-                pass
-
-        totals = get_cart_totals(cart, request)
+        totals = get_cart_totals(store, request)
 
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
                 'success':    True,
                 'message':    f'{product.name} with lenses added to cart!',
-                'cart_count': totals['item_count'],
-                'cart_total': str(totals['total']),
+                'cart_count': totals.quantity,
+                'cart_total': str(totals.total),
             })
 
         messages.success(request, f'{product.name} with lenses added to cart!')
@@ -520,7 +416,7 @@ def add_sunglass_to_cart(request):
         if variant_id:
             variant = get_object_or_404(ProductVariant, id=variant_id)
 
-        cart = get_or_create_cart(request)
+        store = get_cart_store(request)
 
         unit_price = product.base_price
         if variant and variant.price_adjustment:
@@ -532,8 +428,7 @@ def add_sunglass_to_cart(request):
             sunglass_lens_option = get_object_or_404(SunglassLensOption, id=sunglass_lens_id)
             lens_price = sunglass_lens_option.price
 
-        CartItem.objects.create(
-            cart=cart,
+        store.add_item(
             product=product,
             variant=variant,
             quantity=quantity,
@@ -544,14 +439,14 @@ def add_sunglass_to_cart(request):
             prescription_data=prescription_data,
         )
 
-        totals = get_cart_totals(cart, request)
+        totals = get_cart_totals(store, request)
 
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
                 'success':    True,
                 'message':    f'{product.name} added to cart!',
-                'cart_count': totals['item_count'],
-                'cart_total': str(totals['total']),
+                'cart_count': totals.quantity,
+                'cart_total': str(totals.total),
             })
 
         messages.success(request, f'{product.name} added to cart!')
@@ -579,24 +474,41 @@ def add_contact_lens_to_cart(request):
         right_power = request.POST.get('right_power')
 
         product = get_object_or_404(Product, id=product_id, is_active=True)
-        cart    = get_or_create_cart(request)
+        store   = get_cart_store(request)
+
+        # Colors, powers and stock all come from the product's power matrix.
+        matrix    = get_power_matrix(product.id)
+        colors    = matrix.get('colors', {})
+        lens_type = ContactLensProduct.objects.filter(product=product).values_list('lens_type', flat=True).first()
+
+        if color_id:
+            color = colors.get(str(color_id))
+            if color is None:
+                raise ValueError('The selected color is not available for this lens.')
+        elif len(colors) == 1:
+            # Clear lenses keep their powers on a single color row.
+            color_id, color = next(iter(colors.items()))
+        elif (lens_type == 'color' and colors) or any(c['power_enabled'] for c in colors.values()):
+            raise ValueError('Please select a color.')
+        else:
+            color = None
 
         prescription_data = None
-        try:
-            contact_lens = product.contact_lens
-            if contact_lens.lens_type == 'color' and color_id:
-                color = get_object_or_404(
-                    ContactLensColor, id=color_id, contact_lens=contact_lens
-                )
+        if color:
+            if lens_type == 'color':
                 prescription_data = {
                     'color_id':   color_id,
-                    'color_name': color.name,
+                    'color_name': color['name'],
                 }
-        except Exception:
-            pass
-
-        CartItem.objects.create(
-            cart=cart,
+            # A color with power options only sells those; a plano-only color sells none.
+            if not color['power_enabled'] or color['available'] != '0':
+                wanted = Counter(Decimal(p) for p in (left_power, right_power) if p and Decimal(p) != 0)
+                for power, boxes in wanted.items():
+                    available, stock = power_status(matrix, color_id, power)
+                    if not available or stock < quantity * boxes:
+                        raise ValueError(f"Power {power} is not available in {color['name']}.")
+
+        store.add_item(
             product=product,
             quantity=quantity,
             unit_price=product.base_price,
@@ -605,14 +517,14 @@ def add_contact_lens_to_cart(request):
             prescription_data=prescription_data,
         )
 
-        totals = get_cart_totals(cart, request)
+        totals = get_cart_totals(store, request)
 
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
                 'success':    True,
                 'message':    f'{product.name} added to cart!',
-                'cart_count': totals['item_count'],
-                'cart_total': str(totals['total']),
+                'cart_count': totals.quantity,
+                'cart_total': str(totals.total),
             })
 
         messages.success(request, f'{product.name} added to cart!')
@@ -625,6 +537,48 @@ def add_contact_lens_to_cart(request):
         return redirect('catalog:contact_lenses_list')
 
 
+# ============================================
+# BATCH (AJAX)
+# ============================================
+
+@require_POST
+def cart_batch(request):
+    """
+    Apply a list of cart operations (batch.py) at once.
+    JSON body: {"operations": [{"op": "add" | "increment" | "set" | "remove", ...}, ...]}
+    Either all of them are applied or none; the new totals come back once.
+    """
+    try:
+        operations = json.loads(request.body or b'{}').get('operations')
+    except (ValueError, AttributeError):
+        return JsonResponse({'success': False, 'message': 'Invalid JSON body.'}, status=400)
+    if isinstance(operations, list) and len(operations) > MAX_OPERATIONS:
+        return JsonResponse({'success': False, 'message': f'At most {MAX_OPERATIONS} operations per batch.'}, status=400)
+
+    store = get_cart_store(request)
+    try:
+        apply_cart_operations(store, operations)
+    except CartBatchError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    except CartItem.DoesNotExist:
+        return JsonResponse({'success': False, 'message': 'Item not found in cart.'}, status=404)
+
+    totals = get_cart_totals(store, request)
+
+    return JsonResponse({
+        'success':    True,
+        'items':      [
+            {'id': line.item_id, 'quantity': line.quantity, 'item_total': str(line.total)}
+            for line in totals.lines
+        ],
+        'cart_count': totals.quantity,
+        'subtotal':   str(totals.subtotal),
+        'shipping':   str(totals.shipping),
+        'tax':        str(totals.tax),
+        'cart_total': str(totals.total),
+    })
+
+
 # ============================================
 # UPDATE CART ITEM (form POST)
 # ============================================
@@ -633,23 +587,22 @@ def add_contact_lens_to_cart(request):
 def update_cart_item(request, item_id):
     """Update cart item quantity via standard form POST."""
     try:
-        cart      = get_or_create_cart(request)
-        cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
+        store     = get_cart_store(request)
+        cart_item = get_cart_item_or_404(store, item_id)
         quantity  = int(request.POST.get('quantity', 1))
 
         if quantity <= 0:
-            cart_item.delete()
+            store.remove_item(cart_item)
             messages.success(request, 'Item removed from cart.')
         else:
             stock = get_product_stock(cart_item.product)
-            cart_item.quantity = min(quantity, stock)
-            cart_item.save()
+            store.set_quantity(cart_item, min(quantity, stock))
             messages.success(request, 'Cart updated.')
 
-        totals = get_cart_totals(cart, request)
+        totals = get_cart_totals(store, request)
 
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return JsonResponse({'success': True, 'cart_count': totals['item_count']})
+            return JsonResponse({'success': True, 'cart_count': totals.quantity})
 
         return redirect('cart:cart_view')
 
@@ -668,8 +621,7 @@ def update_cart_item(request, item_id):
 def clear_cart(request):
     """Clear all items from cart."""
     try:
-        cart = get_or_create_cart(request)
-        cart.items.all().delete()
+        get_cart_store(request).clear()
         messages.success(request, 'Cart cleared.')
 
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -690,23 +642,19 @@ def clear_cart(request):
 
 def get_cart_count(request):
     """Return current cart total quantity."""
-    cart   = get_or_create_cart(request)
-    result = cart.items.aggregate(total=Sum('quantity'))
-    count  = result['total'] or 0
-    return JsonResponse({'count': count})
+    return JsonResponse({'count': cart_summary(request)['cart_count']})
 
 
 def get_cart_summary(request):
     """Return cart summary for header mini-cart."""
-    cart       = get_or_create_cart(request)
-    cart_items = cart.items.select_related('product', 'variant').prefetch_related('product__images')
+    store      = get_cart_store(request)
+    cart_items = store.items()
+    prefetch_related_objects(cart_items, 'product__images')
+    totals     = get_cart_totals(store)
 
     items_data = []
-    subtotal   = Decimal('0.00')
 
     for item in cart_items:
-        item_total = calculate_item_total(item)
-        subtotal  += item_total
         first_img  = item.product.images.first()
 
         items_data.append({
@@ -715,15 +663,13 @@ def get_cart_summary(request):
             'variant_name': item.variant.color_name if item.variant else None,
             'quantity':     item.quantity,
             'unit_price':   str(item.unit_price),
-            'item_total':   str(item_total),
+            'item_total':   str(totals.line_total(item.id)),
             'image_url':    first_img.image.url if first_img else None,
             'product_url':  f'/products/{item.product.slug}/',
         })
 
-    total_qty = cart_items.aggregate(total=Sum('quantity'))['total'] or 0
-
     return JsonResponse({
         'items':    items_data,
-        'subtotal': str(subtotal),
-        'count':    total_qty,
-    })
\ No newline at end of file
+        'subtotal': str(totals.subtotal),
+        'count':    totals.quantity,
+    })
@@ -0,0 +1,757 @@
+# catalog/bulk_io.py
+"""
+Streaming bulk import / export of the catalog, keyed by SKU.
+
+Two formats:
+
+    jsonl  one product per line:
+               {"sku": "RB-3025", "name": "Aviator", "product_type": "sunglasses",
+                "category": "sunglasses", "brand": "ray-ban", "base_price": "650.00", ...,
+                "tags": ["Bestseller"], "images": ["products/rb3025.jpg"],
+                "specifications": [{"key": "Frame Material", "value": "Metal"}],
+                "variants": [{"variant_sku": "RB-3025-GLD", "color_name": "Gold", ...}]}
+
+    csv    one row per variant. Consecutive rows with the same `sku` are one
+           product whose columns are read from the first of them; variant
+           columns are prefixed `variant_`. tags and images are '|'-separated,
+           specifications are 'Key=Value|Key=Value' ('\\' escapes '|').
+
+Category is given by slug, brand by slug or name. Images are storage names
+of files already uploaded (e.g. products/rb3025.jpg).
+
+Import upserts products by `sku` and variants by `variant_sku`. Input is
+read in batches of BATCH_SIZE products and every batch costs a fixed number
+of queries (one multi-row upsert per table) whatever its size, so memory
+stays constant and throughput is bound by the database, not round trips.
+Only the fields present in the input are written; tags, images and
+specifications are replaced per product when present; variants that are not
+mentioned are left alone.
+
+A record that fails validation is reported with its line number and
+skipped. If a batch hits a database error it is retried one product at a
+time, so the error lands on the record that caused it.
+
+Bulk writes bypass model signals: each batch refreshes its product cards
+and detail-cache versions itself, and the import finishes with a price
+statistics and home snapshot rebuild.
+"""
+
+import csv
+import io
+import json
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction, DatabaseError
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .bulk_sql import insert_rows
+from .cards import refresh_product_cards
+from .catalog_version import bump_catalog_version
+from .detail_cache import bump_product_version
+from .home_snapshot import home_snapshot_rebuilds_suspended, rebuild_home_snapshot
+from .models import (
+    Product, ProductVariant, ProductSpecification, ProductImage,
+    ProductTag, ProductTagRelation, Category, Brand,
+)
+from .price_stats import rebuild_price_statistics
+from search.autocomplete import bump_index_version as bump_autocomplete_version
+from search.indexing import refresh_search_documents
+
+
+BATCH_SIZE          = 1000
+MAX_REPORTED_ERRORS = 1000
+FORMATS             = ('csv', 'jsonl')
+
+# input key → kind of value
+PRODUCT_FIELDS = {
+    'name':              'str',
+    'slug':              'str',
+    'product_type':      'str',
+    'category':          'category',
+    'brand':             'brand',
+    'short_description': 'str',
+    'description':       'str',
+    'base_price':        'decimal',
+    'compare_at_price':  'optional_decimal',
+    'gender':            'str',
+    'age_group':         'str',
+    'track_inventory':   'bool',
+    'stock_quantity':    'int',
+    'is_active':         'bool',
+    'is_featured':       'bool',
+}
+VARIANT_FIELDS = {
+    'color_name':       'str',
+    'color_code':       'str',
+    'size':             'str',
+    'lens_width':       'optional_decimal',
+    'bridge_width':     'optional_decimal',
+    'temple_length':    'optional_decimal',
+    'price_adjustment': 'decimal',
+    'stock_quantity':   'int',
+    'is_active':        'bool',
+    'is_default':       'bool',
+}
+CHILD_KEYS = ('tags', 'images', 'specifications')
+
+PRODUCT_ATTNAMES = [
+    {'category': 'category_id', 'brand': 'brand_id'}.get(name, name) for name in PRODUCT_FIELDS
+]
+REQUIRED_FOR_NEW = ('name', 'product_type', 'category_id', 'base_price')
+
+PRODUCT_DEFAULTS = {name: Product._meta.get_field(name).get_default() for name in PRODUCT_ATTNAMES}
+VARIANT_DEFAULTS = {name: ProductVariant._meta.get_field(name).get_default() for name in VARIANT_FIELDS}
+
+CHOICES = {
+    name: {value for value, _label in Product._meta.get_field(name).choices}
+    for name in ('product_type', 'gender', 'age_group')
+}
+
+CSV_PRODUCT_COLUMNS = ['sku'] + list(PRODUCT_FIELDS) + list(CHILD_KEYS)
+CSV_VARIANT_COLUMNS = ['variant_sku'] + [f'variant_{name}' for name in VARIANT_FIELDS]
+
+TRUE_VALUES  = {'1', 'true', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off', ''}
+
+
+# ── Values ────────────────────────────────────────────────────────────────────
+
+def _parse(kind, value):
+    if kind == 'str':
+        return '' if value is None else str(value).strip()
+    if kind == 'bool':
+        if isinstance(value, bool):
+            return value
+        text = str(value if value is not None else '').strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+        raise ValueError(f'not a boolean: {value!r}')
+    if kind == 'int':
+        text = str(value if value is not None else '').strip()
+        try:
+            return int(text or 0)
+        except ValueError:
+            raise ValueError(f'not an integer: {value!r}')
+    # decimal / optional_decimal
+    text = str(value if value is not None else '').strip()
+    if not text:
+        if kind == 'optional_decimal':
+            return None
+        raise ValueError('a value is required')
+    try:
+        number = Decimal(text)
+    except InvalidOperation:
+        number = None
+    if number is None or not number.is_finite():
+        raise ValueError(f'not a number: {value!r}')
+    return number.quantize(Decimal('0.01'))
+
+
+def _format(value):
+    """CSV cell for a stored value."""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def _join(values):
+    return '|'.join(str(v).replace('\\', '\\\\').replace('|', '\\|') for v in values)
+
+
+def _split(text):
+    values, current, chars = [], [], iter(text or '')
+    for char in chars:
+        if char == '\\':
+            current.append(next(chars, ''))
+        elif char == '|':
+            values.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    values.append(''.join(current))
+    return [v.strip() for v in values if v.strip()]
+
+
+# ── Readers ───────────────────────────────────────────────────────────────────
+# Both yield (line_no, record, error): a record dict in the JSONL shape, or
+# None plus a message when the input itself could not be read.
+
+def read_jsonl(lines):
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield line_no, None, f'invalid JSON: {exc}'
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, 'expected a JSON object'
+            continue
+        yield line_no, record, None
+
+
+def _csv_record(rows):
+    first  = rows[0]
+    record = {k: v for k, v in first.items() if k in CSV_PRODUCT_COLUMNS and k not in CHILD_KEYS}
+    if 'tags' in first:
+        record['tags'] = _split(first['tags'])
+    if 'images' in first:
+        record['images'] = _split(first['images'])
+    if 'specifications' in first:
+        specs = []
+        for pair in _split(first['specifications']):
+            key, sep, value = pair.partition('=')
+            if not sep:
+                raise ValueError(f'specifications: expected Key=Value, got {pair!r}')
+            specs.append({'key': key.strip(), 'value': value.strip()})
+        record['specifications'] = specs
+
+    variants = []
+    for row in rows:
+        if not (row.get('variant_sku') or '').strip():
+            continue
+        variants.append({
+            ('variant_sku' if column == 'variant_sku' else column[len('variant_'):]): row[column]
+            for column in CSV_VARIANT_COLUMNS if column in row
+        })
+    if 'variant_sku' in first:
+        record['variants'] = variants
+    return record
+
+
+def read_csv(lines):
+    reader = csv.DictReader(lines)
+    group, group_line, group_sku = [], None, None
+
+    def emit():
+        try:
+            return group_line, _csv_record(group), None
+        except ValueError as exc:
+            return group_line, None, str(exc)
+
+    for row in reader:
+        row.pop(None, None)  # cells beyond the header
+        sku = (row.get('sku') or '').strip()
+        if group and sku == group_sku:
+            group.append(row)
+            continue
+        if group:
+            yield emit()
+        group, group_line, group_sku = [row], reader.line_num, sku
+    if group:
+        yield emit()
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl}
+
+
+# ── Import ────────────────────────────────────────────────────────────────────
+
+class _Item:
+    __slots__ = ('line', 'sku', 'fields', 'children', 'variants')
+
+    def __init__(self, line, sku, fields, children, variants):
+        self.line     = line
+        self.sku      = sku
+        self.fields   = fields    # Product attnames → values
+        self.children = children  # present CHILD_KEYS → cleaned lists
+        self.variants = variants  # [(variant_sku, {field: value})] or None
+
+
+class CatalogImporter:
+    """Upserts records from read_csv / read_jsonl in batches; see import_catalog()."""
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.categories = dict(Category.objects.values_list('slug', 'id'))
+        self.brands     = {}
+        for brand_id, slug, name in Brand.objects.values_list('id', 'slug', 'name'):
+            self.brands[slug] = brand_id
+            self.brands.setdefault(name.strip().lower(), brand_id)
+        self.tags = dict(ProductTag.objects.values_list('name', 'id'))
+
+        self.batch         = []
+        self.batch_skus    = set()
+        self.batch_vskus   = set()
+        self.touched       = False
+        self.report        = {
+            'records':          0,
+            'products_created': 0,
+            'products_updated': 0,
+            'variants_created': 0,
+            'variants_updated': 0,
+            'error_count':      0,
+            'errors':           [],  # [(line, sku, message)], first MAX_REPORTED_ERRORS
+        }
+
+    def error(self, line, sku, message):
+        self.report['error_count'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append((line, sku, message))
+
+    # ── Validation ──
+
+    def _clean(self, line, record):
+        sku = str(record.get('sku') or '').strip()
+        if not sku:
+            raise ValueError('sku is required')
+        if len(sku) > 100:
+            raise ValueError('sku is longer than 100 characters')
+
+        fields = {}
+        for name, kind in PRODUCT_FIELDS.items():
+            if name not in record:
+                continue
+            value = record[name]
+            try:
+                if kind == 'category':
+                    slug = str(value or '').strip()
+                    if slug not in self.categories:
+                        raise ValueError(f'unknown category {slug!r}')
+                    fields['category_id'] = self.categories[slug]
+                elif kind == 'brand':
+                    key = str(value or '').strip()
+                    if not key:
+                        fields['brand_id'] = None
+                    elif key in self.brands or key.lower() in self.brands:
+                        fields['brand_id'] = self.brands.get(key, self.brands.get(key.lower()))
+                    else:
+                        raise ValueError(f'unknown brand {key!r}')
+                else:
+                    fields[name] = _parse(kind, value)
+                    if name in CHOICES and fields[name] not in CHOICES[name]:
+                        raise ValueError(f'must be one of {", ".join(sorted(CHOICES[name]))}')
+            except ValueError as exc:
+                raise ValueError(f'{name}: {exc}')
+        if 'slug' in fields and not fields['slug']:
+            del fields['slug']  # blank keeps the current slug / generates one
+
+        children = {}
+        if 'tags' in record:
+            children['tags'] = list(dict.fromkeys(str(t).strip() for t in _as_list(record['tags'], 'tags') if str(t).strip()))
+        if 'images' in record:
+            children['images'] = list(dict.fromkeys(str(i).strip() for i in _as_list(record['images'], 'images') if str(i).strip()))
+        if 'specifications' in record:
+            specs = []
+            for spec in _as_list(record['specifications'], 'specifications'):
+                if isinstance(spec, dict):
+                    key, value = spec.get('key'), spec.get('value')
+                elif isinstance(spec, (list, tuple)) and len(spec) == 2:
+                    key, value = spec
+                else:
+                    raise ValueError('specifications: expected {"key", "value"} objects')
+                key = str(key or '').strip()
+                if key:
+                    specs.append((key, str(value if value is not None else '').strip()))
+            children['specifications'] = specs
+
+        variants = None
+        if 'variants' in record:
+            variants = []
+            for variant in _as_list(record['variants'], 'variants'):
+                if not isinstance(variant, dict):
+                    raise ValueError('variants: expected objects')
+                variant_sku = str(variant.get('variant_sku') or '').strip()
+                if not variant_sku:
+                    raise ValueError('variants: variant_sku is required')
+                values = {}
+                for name, kind in VARIANT_FIELDS.items():
+                    if name in variant:
+                        try:
+                            values[name] = _parse(kind, variant[name])
+                        except ValueError as exc:
+                            raise ValueError(f'variant {variant_sku}: {name}: {exc}')
+                variants.append((variant_sku, values))
+
+        return _Item(line, sku, fields, children, variants)
+
+    # ── Batching ──
+
+    def add(self, line, record, error=None):
+        self.report['records'] += 1
+        if error is None:
+            try:
+                item = self._clean(line, record)
+            except ValueError as exc:
+                error = str(exc)
+        if error is not None:
+            self.error(line, (record or {}).get('sku', '') if isinstance(record, dict) else '', error)
+            return
+
+        variant_skus = {vsku for vsku, _ in item.variants or ()}
+        if item.sku in self.batch_skus or variant_skus & self.batch_vskus:
+            self.flush()  # a later record for the same SKU must see the earlier one written
+        self.batch.append(item)
+        self.batch_skus.add(item.sku)
+        self.batch_vskus |= variant_skus
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        items = self._check(self.batch)
+        self.batch, self.batch_skus, self.batch_vskus = [], set(), set()
+        if not items:
+            return
+
+        self._ensure_tags(items)
+        # Deleting stale images fires model signals; finish() rebuilds the
+        # home snapshot once for the whole import instead.
+        with home_snapshot_rebuilds_suspended():
+            try:
+                with transaction.atomic():
+                    written = [self._write(items)]
+            except DatabaseError:
+                written = []
+                for item in items:
+                    try:
+                        with transaction.atomic():
+                            written.append(self._write([item]))
+                    except DatabaseError as exc:
+                        self.error(item.line, item.sku, f'database error: {exc}')
+
+        card_ids, detail_ids = set(), set()
+        for counts, cards, details in written:
+            for key, value in counts.items():
+                self.report[key] += value
+            card_ids   |= cards
+            detail_ids |= details
+        if card_ids or detail_ids:
+            self.touched = True
+            refresh_product_cards(card_ids)
+            refresh_search_documents(card_ids | detail_ids)
+            for product_id in detail_ids:
+                bump_product_version(product_id)
+
+    def finish(self):
+        self.flush()
+        if self.touched:
+            rebuild_price_statistics()
+            rebuild_home_snapshot()
+            bump_catalog_version()
+            bump_autocomplete_version()
+        return self.report
+
+    # ── Writing ──
+
+    def _check(self, items):
+        """Drop records that conflict with stored data; load the rows they will update."""
+        if not items:
+            return []
+        self.existing = {
+            row['sku']: row for row in
+            Product.objects.filter(sku__in=[i.sku for i in items]).values('id', 'sku', *PRODUCT_ATTNAMES)
+        }
+        self.existing_variants = {
+            row['variant_sku']: row for row in
+            ProductVariant.objects.filter(variant_sku__in=[vsku for i in items for vsku, _ in i.variants or ()])
+            .values('id', 'product_id', 'variant_sku', *VARIANT_FIELDS)
+        }
+
+        valid = []
+        for item in items:
+            current = self.existing.get(item.sku)
+            if current is None:
+                missing = [f.replace('_id', '') for f in REQUIRED_FOR_NEW if f not in item.fields]
+                if missing:
+                    self.error(item.line, item.sku, f'new product needs {", ".join(missing)}')
+                    continue
+            taken = [
+                vsku for vsku, _ in item.variants or ()
+                if vsku in self.existing_variants
+                and (current is None or self.existing_variants[vsku]['product_id'] != current['id'])
+            ]
+            if taken:
+                self.error(item.line, item.sku, f'variant_sku already used by another product: {", ".join(taken)}')
+                continue
+            valid.append(item)
+        return valid
+
+    def _ensure_tags(self, items):
+        names   = {name for i in items for name in i.children.get('tags', ())}
+        missing = names - self.tags.keys()
+        if missing:
+            ProductTag.objects.bulk_create(
+                [ProductTag(name=name, slug=slugify(name)[:50] or name[:50]) for name in missing],
+                ignore_conflicts=True,
+            )
+            self.tags.update(ProductTag.objects.filter(name__in=missing).values_list('name', 'id'))
+
+    def _write(self, items):
+        """
+        Write one batch. Returns (counts, card_ids, detail_ids): the products
+        whose card must be rebuilt and the existing products whose detail
+        page changed. Rows identical to what is stored are not written.
+        """
+        counts   = defaultdict(int)
+        card_ids = set()
+
+        # Products: one upsert on sku for new and changed rows.
+        now, upserts = timezone.now(), []
+        for item in items:
+            current = self.existing.get(item.sku)
+            if current is None:
+                values = {**PRODUCT_DEFAULTS, 'slug': _default_slug(item), **item.fields}
+                counts['products_created'] += 1
+            else:
+                values = {**current, **item.fields}
+                if values == current:
+                    continue
+                counts['products_updated'] += 1
+                card_ids.add(current['id'])
+            upserts.append([item.sku, now] + [values[name] for name in PRODUCT_ATTNAMES])
+        insert_rows(Product, ['sku', 'created_at'] + PRODUCT_ATTNAMES, upserts,
+                     conflict_field='sku', update_fields=PRODUCT_ATTNAMES)
+
+        ids, created = {sku: row['id'] for sku, row in self.existing.items()}, set()
+        new_skus = [i.sku for i in items if i.sku not in ids]
+        if new_skus:
+            rows = dict(Product.objects.filter(sku__in=new_skus).values_list('sku', 'id'))
+            ids.update(rows)
+            created = set(rows.values())
+
+        card_ids  |= created | self._write_variants(items, ids, counts) | self._write_images(items, ids)
+        detail_ids = card_ids | self._write_specifications(items, ids) | self._write_tags(items, ids)
+        return counts, card_ids, detail_ids - created
+
+    def _write_variants(self, items, ids, counts):
+        upserts, changed = [], set()
+        for item in items:
+            product_id = ids[item.sku]
+            for vsku, values in item.variants or ():
+                current = self.existing_variants.get(vsku)
+                if current is None:
+                    merged = {**VARIANT_DEFAULTS, **values}
+                    counts['variants_created'] += 1
+                else:
+                    merged = {**current, **values}
+                    if merged == current:
+                        continue
+                    counts['variants_updated'] += 1
+                upserts.append([product_id, vsku] + [merged[name] for name in VARIANT_FIELDS])
+                changed.add(product_id)
+        insert_rows(ProductVariant, ['product_id', 'variant_sku'] + list(VARIANT_FIELDS), upserts,
+                     conflict_field='variant_sku', update_fields=list(VARIANT_FIELDS))
+        return changed
+
+    def _write_specifications(self, items, ids):
+        targets = {ids[i.sku]: i.children['specifications'] for i in items if 'specifications' in i.children}
+        if not targets:
+            return set()
+        current = defaultdict(list)
+        rows = (ProductSpecification.objects.filter(product_id__in=targets)
+                .order_by('product_id', 'display_order', 'id')
+                .values_list('id', 'product_id', 'spec_key', 'spec_value', 'display_order'))
+        for spec_id, product_id, key, value, order in rows:
+            current[product_id].append((spec_id, key, value, order))
+
+        # Matched by position, so re-importing an unchanged list writes nothing.
+        creates, updates, stale, changed = [], [], [], set()
+        for product_id, specs in targets.items():
+            old = current[product_id]
+            for position, (key, value) in enumerate(specs):
+                if position < len(old):
+                    spec_id, old_key, old_value, old_order = old[position]
+                    if (old_key, old_value, old_order) != (key, value, position):
+                        updates.append(ProductSpecification(pk=spec_id, spec_key=key, spec_value=value, display_order=position))
+                        changed.add(product_id)
+                else:
+                    creates.append([product_id, key, value, position])
+                    changed.add(product_id)
+            if len(old) > len(specs):
+                stale += [row[0] for row in old[len(specs):]]
+                changed.add(product_id)
+
+        insert_rows(ProductSpecification, ['product_id', 'spec_key', 'spec_value', 'display_order'], creates)
+        if updates:
+            ProductSpecification.objects.bulk_update(updates, ['spec_key', 'spec_value', 'display_order'])
+        if stale:
+            ProductSpecification.objects.filter(pk__in=stale).delete()
+        return changed
+
+    def _write_tags(self, items, ids):
+        targets = {}
+        for item in items:
+            if 'tags' in item.children:
+                targets[ids[item.sku]] = {self.tags[name] for name in item.children['tags'] if name in self.tags}
+        if not targets:
+            return set()
+        current = defaultdict(dict)
+        for relation_id, product_id, tag_id in (ProductTagRelation.objects.filter(product_id__in=targets)
+                                                .values_list('id', 'product_id', 'tag_id')):
+            current[product_id][tag_id] = relation_id
+
+        creates, stale, changed = [], [], set()
+        for product_id, tag_ids in targets.items():
+            added   = [[product_id, t] for t in tag_ids - current[product_id].keys()]
+            removed = [rid for t, rid in current[product_id].items() if t not in tag_ids]
+            if added or removed:
+                creates += added
+                stale   += removed
+                changed.add(product_id)
+        insert_rows(ProductTagRelation, ['product_id', 'tag_id'], creates)
+        if stale:
+            ProductTagRelation.objects.filter(pk__in=stale).delete()
+        return changed
+
+    def _write_images(self, items, ids):
+        targets = {ids[i.sku]: i.children['images'] for i in items if 'images' in i.children}
+        if not targets:
+            return set()
+        current = defaultdict(dict)
+        rows = (ProductImage.objects.filter(product_id__in=targets, variant__isnull=True)
+                .values_list('id', 'product_id', 'image', 'display_order', 'is_primary'))
+        for image_id, product_id, name, order, primary in rows:
+            current[product_id][name] = (image_id, order, primary)
+
+        # Product-level images only; variant images are managed in the admin.
+        now, creates, updates, stale, changed = timezone.now(), [], [], [], set()
+        for product_id, names in targets.items():
+            old = current[product_id]
+            for position, name in enumerate(names):
+                primary = position == 0
+                if name in old:
+                    image_id, order, was_primary = old[name]
+                    if (order, was_primary) != (position, primary):
+                        updates.append(ProductImage(pk=image_id, display_order=position, is_primary=primary))
+                        changed.add(product_id)
+                else:
+                    creates.append([product_id, name, '', position, primary, now])
+                    changed.add(product_id)
+            removed = [image_id for name, (image_id, _o, _p) in old.items() if name not in names]
+            if removed:
+                stale += removed
+                changed.add(product_id)
+
+        insert_rows(ProductImage, ['product_id', 'image', 'alt_text', 'display_order', 'is_primary', 'created_at'], creates)
+        if updates:
+            ProductImage.objects.bulk_update(updates, ['display_order', 'is_primary'])
+        if stale:
+            ProductImage.objects.filter(pk__in=stale).delete()
+        return changed
+
+
+def _as_list(value, name):
+    if not isinstance(value, list):
+        raise ValueError(f'{name}: expected a list')
+    return value
+
+
+def _default_slug(item):
+    return slugify(f"{item.fields.get('name', '')}-{item.sku}")[:50].strip('-') or slugify(item.sku)[:50]
+
+
+def import_catalog(lines, fmt, batch_size=BATCH_SIZE):
+    """
+    Import an iterable of text lines (an open file) in `fmt` ('csv' or 'jsonl').
+    Returns the report dict: records, products/variants created and updated,
+    error_count and the first MAX_REPORTED_ERRORS (line, sku, message) errors.
+    """
+    importer = CatalogImporter(batch_size)
+    for line, record, error in READERS[fmt](lines):
+        importer.add(line, record, error)
+    return importer.finish()
+
+
+# ── Export ────────────────────────────────────────────────────────────────────
+
+EXPORT_FIELDS = ['id', 'sku', 'category__slug', 'brand__slug'] + [
+    name for name, kind in PRODUCT_FIELDS.items() if kind not in ('category', 'brand')
+]
+
+
+def _export_batches(batch_size):
+    """Yield lists of JSONL-shaped records, walking products by id."""
+    last_id = 0
+    while True:
+        rows = list(Product.objects.filter(id__gt=last_id).order_by('id').values(*EXPORT_FIELDS)[:batch_size])
+        if not rows:
+            return
+        last_id = rows[-1]['id']
+        ids     = [row['id'] for row in rows]
+
+        variants, specs, tags, images = defaultdict(list), defaultdict(list), defaultdict(list), defaultdict(list)
+        for v in (ProductVariant.objects.filter(product_id__in=ids).order_by('id')
+                  .values('product_id', 'variant_sku', *VARIANT_FIELDS)):
+            variants[v.pop('product_id')].append(v)
+        for product_id, key, value in (ProductSpecification.objects.filter(product_id__in=ids)
+                                       .order_by('display_order', 'id').values_list('product_id', 'spec_key', 'spec_value')):
+            specs[product_id].append({'key': key, 'value': value})
+        for product_id, name in (ProductTagRelation.objects.filter(product_id__in=ids)
+                                 .order_by('tag__name').values_list('product_id', 'tag__name')):
+            tags[product_id].append(name)
+        for product_id, name in (ProductImage.objects.filter(product_id__in=ids, variant__isnull=True)
+                                 .order_by('-is_primary', 'display_order', 'id').values_list('product_id', 'image')):
+            images[product_id].append(name)
+
+        records = []
+        for row in rows:
+            product_id = row.pop('id')
+            record = {
+                'sku':      row.pop('sku'),
+                'category': row.pop('category__slug'),
+                'brand':    row.pop('brand__slug') or '',
+                **row,
+                'tags':           tags[product_id],
+                'images':         images[product_id],
+                'specifications': specs[product_id],
+                'variants':       variants[product_id],
+            }
+            records.append(record)
+        yield records
+
+
+def _jsonl_chunks(batch_size):
+    for records in _export_batches(batch_size):
+        yield ''.join(json.dumps(record, default=str, ensure_ascii=False) + '\n' for record in records)
+
+
+def _csv_chunks(batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def take():
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writerow(CSV_PRODUCT_COLUMNS + CSV_VARIANT_COLUMNS)
+    yield take()
+    for records in _export_batches(batch_size):
+        for record in records:
+            product = [_format(record[c]) for c in CSV_PRODUCT_COLUMNS if c not in CHILD_KEYS]
+            product += [
+                _join(record['tags']),
+                _join(record['images']),
+                _join(f"{s['key']}={s['value']}" for s in record['specifications']),
+            ]
+            blank = [''] * (len(CSV_PRODUCT_COLUMNS) - 1)
+            for n, variant in enumerate(record['variants'] or [None]):
+                cells = product if n == 0 else [record['sku']] + blank
+                if variant is None:
+                    writer.writerow(cells + [''] * len(CSV_VARIANT_COLUMNS))
+                else:
+                    writer.writerow(cells + [variant['variant_sku']] + [_format(variant[f]) for f in VARIANT_FIELDS])
+        yield take()
+
+
+def export_catalog(fmt, batch_size=BATCH_SIZE):
+    """Yield the whole catalog in `fmt` as text chunks (one per batch of products)."""
+    return _csv_chunks(batch_size) if fmt == 'csv' else _jsonl_chunks(batch_size)
+
+
+def format_for(filename, default='jsonl'):
+    """'csv' / 'jsonl' from a file name's extension."""
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return default
@@ -0,0 +1,63 @@
+# catalog/bulk_sql.py
+"""
+Multi-row INSERT / upsert, for the bulk paths (catalog/bulk_io.py imports,
+catalog/cards.py refreshes) where the ORM's per-value SQL compilation in
+bulk_create() outweighs the database work.
+
+Rows are sent as explicit multi-row VALUES lists, one statement per chunk,
+rather than through cursor.executemany(): mysqlclient only rewrites an
+executemany into one multi-row INSERT when the statement ends in plain
+`ON DUPLICATE ...`, and on MySQL >= 8.0.19 Django's upsert suffix starts
+with `AS new`, which would turn every row into its own round trip.
+"""
+
+from django.db import connections, router, transaction
+from django.db.models.constants import OnConflict
+
+
+MAX_ROWS_PER_STATEMENT = 500  # keeps statements well under max_allowed_packet
+
+
+def insert_rows(model, fields, rows, conflict_field=None, update_fields=()):
+    """
+    INSERT `rows` (lists of values for `fields`) in multi-row statements;
+    with `conflict_field`, rows that already exist are updated instead.
+    Model defaults are not applied: `fields` must cover every NOT NULL column.
+
+    bulk_create() compiles SQL for every value of every row, which costs
+    more than the database work at import volumes; here the statement is
+    built once per chunk size and each value is only adapted for the backend.
+    """
+    if not rows:
+        return
+    connection = connections[router.db_for_write(model)]
+    ops        = connection.ops
+    opts       = model._meta
+    columns    = [opts.get_field(name) for name in fields]
+
+    prefix = 'INSERT INTO {} ({}) VALUES '.format(
+        ops.quote_name(opts.db_table),
+        ', '.join(ops.quote_name(field.column) for field in columns),
+    )
+    suffix = ''
+    if conflict_field:
+        suffix = ' ' + ops.on_conflict_suffix_sql(
+            columns, OnConflict.UPDATE,
+            [opts.get_field(name).column for name in update_fields],
+            [opts.get_field(conflict_field).column],
+        )
+    placeholders = '({})'.format(', '.join(['%s'] * len(columns)))
+    chunk_size   = max(1, min(MAX_ROWS_PER_STATEMENT, ops.bulk_batch_size(columns, rows)))
+
+    statements = {}
+    # One transaction, like bulk_create(): in autocommit mode every chunk would commit.
+    with transaction.atomic(using=connection.alias, savepoint=False), connection.cursor() as cursor:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            if len(chunk) not in statements:
+                statements[len(chunk)] = prefix + ', '.join([placeholders] * len(chunk)) + suffix
+            params = [
+                field.get_db_prep_save(value, connection)
+                for row in chunk for field, value in zip(columns, row)
+            ]
+            cursor.execute(statements[len(chunk)], params)
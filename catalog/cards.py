@@ -0,0 +1,161 @@
+# catalog/cards.py
+"""
+ProductCard projection: everything a product grid tile shows, in one row.
+
+A card used to be assembled per product at render time (primary image,
+secondary image, a variants slice, discount maths), costing 3-4 queries per
+tile. refresh_product_cards() rebuilds the cards for a batch of products in
+a fixed number of queries; catalog/signals.py calls it after every commit
+that touches a product, its images, variants or approved reviews.
+
+Grids read the card through Product.card (select_related('card')), or query
+ProductCard directly when they only need card fields.
+"""
+
+import threading
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Avg, Count
+from django.utils import timezone
+
+from reviews.models import Review
+from .bulk_sql import insert_rows
+from .models import Product, ProductCard, ProductImage, ProductVariant
+
+
+MAX_SWATCHES = 5
+
+CARD_FIELDS = [
+    'name', 'slug', 'sku', 'product_type', 'brand_name',
+    'primary_image_url', 'secondary_image_url', 'swatches',
+    'base_price', 'compare_at_price', 'min_price', 'discount_percentage', 'in_stock',
+    'rating_average', 'rating_count',
+    'is_active', 'is_featured', 'created_at',
+]
+
+
+def discount_percentage(base_price, compare_at_price):
+    if compare_at_price and compare_at_price > base_price:
+        return int(((compare_at_price - base_price) / compare_at_price) * 100)
+    return None
+
+
+def _image_url(name):
+    if not name:
+        return ''
+    return ProductImage._meta.get_field('image').storage.url(name)
+
+
+def _build_card(product, images, variants, rating):
+    primary = next((img for img in images if img['is_primary']), images[0] if images else None)
+    secondary = next((img for img in images if primary and img['id'] != primary['id']), None)
+
+    adjustments = [v['price_adjustment'] for v in variants]
+    min_price = product.base_price + min(adjustments) if adjustments else product.base_price
+
+    return ProductCard(
+        product=product,
+        name=product.name,
+        slug=product.slug,
+        sku=product.sku,
+        product_type=product.product_type,
+        brand_name=product.brand.name if product.brand else '',
+        primary_image_url=_image_url(primary['image']) if primary else '',
+        secondary_image_url=_image_url(secondary['image']) if secondary else '',
+        swatches=[
+            {'name': v['color_name'], 'code': v['color_code']}
+            for v in variants if v['color_code']
+        ][:MAX_SWATCHES],
+        base_price=product.base_price,
+        compare_at_price=product.compare_at_price,
+        min_price=max(min_price, Decimal('0')),
+        discount_percentage=discount_percentage(product.base_price, product.compare_at_price),
+        in_stock=product.is_in_stock,
+        rating_average=round(rating['avg'], 2) if rating else None,
+        rating_count=rating['n'] if rating else 0,
+        is_active=product.is_active,
+        is_featured=product.is_featured,
+        created_at=product.created_at,
+    )
+
+
+# ── Refresh ───────────────────────────────────────────────────────────────────
+
+def refresh_product_cards(product_ids=None):
+    """
+    Rebuild the cards for `product_ids` (all products when None) in five
+    queries per batch. Cards of products that no longer exist are removed.
+    Returns the number of cards written.
+    """
+    products = Product.objects.select_related('brand').order_by('id')
+    if product_ids is not None:
+        product_ids = set(product_ids)
+        if not product_ids:
+            return 0
+        products = products.filter(id__in=product_ids)
+    products = list(products)
+    ids = [p.id for p in products]
+
+    images = {}
+    for row in (ProductImage.objects.filter(product_id__in=ids)
+                .order_by('product_id', 'display_order', 'id')
+                .values('id', 'product_id', 'image', 'is_primary')):
+        images.setdefault(row['product_id'], []).append(row)
+
+    variants = {}
+    for row in (ProductVariant.objects.filter(product_id__in=ids, is_active=True)
+                .order_by('product_id', '-is_default', 'id')
+                .values('product_id', 'color_name', 'color_code', 'price_adjustment')):
+        variants.setdefault(row['product_id'], []).append(row)
+
+    ratings = {
+        row['product_id']: row
+        for row in (Review.objects.filter(product_id__in=ids, is_approved=True)
+                    .values('product_id')
+                    .annotate(avg=Avg('rating'), n=Count('id'))
+                    .order_by())
+    }
+
+    cards = [
+        _build_card(p, images.get(p.id, []), variants.get(p.id, []), ratings.get(p.id))
+        for p in products
+    ]
+
+    stale = ProductCard.objects.all() if product_ids is None else ProductCard.objects.filter(product_id__in=product_ids)
+    stale.exclude(product_id__in=ids).delete()
+
+    now = timezone.now()
+    insert_rows(
+        ProductCard,
+        ['product_id', 'updated_at'] + CARD_FIELDS,
+        [[card.product_id, now] + [getattr(card, name) for name in CARD_FIELDS] for card in cards],
+        conflict_field='product_id',
+        update_fields=CARD_FIELDS,
+    )
+    return len(cards)
+
+
+def refresh_product_card(product_id):
+    return refresh_product_cards([product_id])
+
+
+# ── Deferred refresh ──────────────────────────────────────────────────────────
+# Saving a product from the admin fires a signal per image and variant row;
+# collect the ids and rebuild once, after the transaction commits.
+
+_pending = threading.local()
+
+
+def _flush_pending():
+    ids = getattr(_pending, 'ids', None)
+    if ids:
+        _pending.ids = set()
+        refresh_product_cards(ids)
+
+
+def schedule_card_refresh(product_id):
+    if not hasattr(_pending, 'ids'):
+        _pending.ids = set()
+    _pending.ids.add(product_id)
+    transaction.on_commit(_flush_pending)
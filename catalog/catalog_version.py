@@ -0,0 +1,33 @@
+# catalog/catalog_version.py
+"""
+One catalog-wide version number in the cache.
+
+catalog/signals.py bumps it after commit on every Product, Brand or
+Category write, and bulk imports bump it once when they finish. Caches of
+results that depend on the catalog as a whole — search result pages
+(search/result_cache.py) — put it in their keys, so a write makes every
+older entry unreachable without purging anything.
+"""
+
+import time
+
+from django.core.cache import cache
+
+
+VERSION_KEY = 'catalog:version'
+
+
+def catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seeded from the clock, so a version lost to eviction never repeats an old one.
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
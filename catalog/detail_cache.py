@@ -0,0 +1,88 @@
+# catalog/detail_cache.py
+"""
+Versioned cache for the product-dependent part of detail pages.
+
+Every product has a version number in the cache. catalog/signals.py bumps
+it (after commit) whenever the product, its images, variants,
+specifications, contact-lens data or reviews change, so a cached entry is
+only served while its version still matches — no explicit purging needed.
+
+What is cached is the evaluated context (product, gallery, variants with
+their images, specs, reviews, rating summary, related products, ...), not
+rendered HTML: the detail templates interleave CSRF tokens and per-user
+review state with the product markup. Per-user bits are added by the view
+on every request.
+
+Cross-product data on the page (related products, lens brands / types) is
+bounded by DETAIL_CACHE_TIMEOUT instead of the version.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.utils.translation import get_language
+
+from core.db_router import primary_reads
+from .models import Product
+
+
+DETAIL_CACHE_TIMEOUT = 60 * 15  # seconds
+
+
+# ── Per-product versions ──────────────────────────────────────────────────────
+
+def _version_key(product_id):
+    return f'product_version:{product_id}'
+
+
+def product_version(product_id):
+    key     = _version_key(product_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a version lost to eviction never comes back
+        # with a number an older cached entry was built under.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_product_version(product_id):
+    try:
+        cache.incr(_version_key(product_id))
+    except ValueError:
+        cache.set(_version_key(product_id), time.time_ns(), None)
+
+
+# ── Detail context ────────────────────────────────────────────────────────────
+
+def cached_detail_context(kind, slug, build):
+    """
+    Product-dependent context for the `kind` detail page of `slug`.
+
+    `build(slug)` computes the context (it must contain 'product' and may
+    raise Http404); its result is reused until the product's version moves
+    on or DETAIL_CACHE_TIMEOUT passes. Returns a new dict the caller may
+    extend with per-user context.
+    """
+    key   = f'product_detail:{kind}:{get_language()}:{slug}'
+    entry = cache.get(key)
+    if entry is not None:
+        product_id = entry['product_id']
+        version    = product_version(product_id)
+        if entry['version'] == version:
+            return dict(entry['context'])
+    # The version is read before building, and the build reads the primary:
+    # a bump that lands mid-build leaves the entry one version behind (rebuilt
+    # next time), and a lagging replica can't store old rows under the new one.
+    with primary_reads():
+        if entry is None:
+            product_id = Product.objects.filter(slug=slug).values_list('pk', flat=True).first()
+            version    = product_version(product_id) if product_id is not None else None
+        context = build(slug)
+    if context['product'].pk == product_id:
+        cache.set(key, {
+            'product_id': product_id,
+            'version':    version,
+            'context':    context,
+        }, DETAIL_CACHE_TIMEOUT)
+    return dict(context)
@@ -0,0 +1,137 @@
+# catalog/home_snapshot.py
+"""
+Precomputed home page snapshot.
+
+Both home views (catalog.views.home_view and core.views.home) render from a
+single cached structure instead of querying banners, products and brands on
+every request. The snapshot is rebuilt:
+
+    - after commit, whenever a banner, brand or product changes
+      (catalog/signals.py) — once per transaction; a save outside one only
+      drops the snapshot and the next read rebuilds it
+    - when it is read after its `valid_until` — the next start_date /
+      end_date of a home banner, i.e. the moment the live slides change
+    - by `manage.py rebuild_home_snapshot` (run it from cron with
+      --stale-only to rebuild at banner boundaries ahead of traffic)
+"""
+
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q, Min
+from django.utils import timezone
+
+from content.models import Banner
+from core.db_router import primary_reads
+from .models import Product, ProductCard, Brand
+
+
+HOME_SNAPSHOT_KEY     = 'home_snapshot'
+HOME_SNAPSHOT_TIMEOUT = 60 * 60 * 24  # seconds; signals and boundaries normally rebuild sooner
+HOME_PLACEMENTS       = ('main_slider', 'sale_banner')
+
+
+def _next_banner_boundary(now):
+    """First moment after `now` at which the set of live home banners changes."""
+    bounds = Banner.objects.filter(is_active=True, placement__in=HOME_PLACEMENTS).aggregate(
+        next_start=Min('start_date', filter=Q(start_date__gt=now)),
+        next_end=Min('end_date', filter=Q(end_date__gte=now)),
+    )
+    candidates = []
+    if bounds['next_start']:
+        candidates.append(bounds['next_start'])
+    if bounds['next_end']:
+        # Banners stay live through end_date itself (end_date__gte=now).
+        candidates.append(bounds['next_end'] + timedelta(microseconds=1))
+    return min(candidates) if candidates else None
+
+
+def build_home_snapshot(now=None):
+    now = now or timezone.now()
+
+    banners = list(
+        Banner.objects.filter(placement__in=HOME_PLACEMENTS, is_active=True)
+        .filter(Q(start_date__isnull=True) | Q(start_date__lte=now))
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=now))
+        .order_by('display_order')
+    )
+
+    products = Product.objects.filter(is_active=True).select_related('brand', 'card')
+    brands   = list(Brand.objects.filter(is_active=True).order_by('display_order')[:12])
+    cards    = ProductCard.objects.filter(is_active=True)
+
+    return {
+        'hero_slides':        [b for b in banners if b.placement == 'main_slider'],
+        'sale_banner':        next((b for b in banners if b.placement == 'sale_banner'), None),
+        'featured_products':  list(products.filter(is_featured=True)[:8]),
+        'new_arrivals':       list(products.order_by('-created_at')[:8]),
+        'eyeglasses_preview': list(products.filter(product_type='eyeglasses')[:3]),
+        'top_brands':         brands[:3],
+        'brands':             brands,
+
+        # core.views.home product tabs (ProductCard rows)
+        'latest_cards':       list(cards.order_by('-created_at')[:8]),
+        'top_rated_cards':    list(cards.filter(is_featured=True).order_by('-base_price')[:8]),
+        'best_seller_cards':  list(cards.order_by('product_id')[:8]),
+
+        'built_at':           now,
+        'valid_until':        _next_banner_boundary(now),
+    }
+
+
+def rebuild_home_snapshot():
+    with primary_reads():
+        snapshot = build_home_snapshot()
+    cache.set(HOME_SNAPSHOT_KEY, snapshot, HOME_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def is_stale(snapshot, now=None):
+    if snapshot is None:
+        return True
+    valid_until = snapshot['valid_until']
+    return valid_until is not None and (now or timezone.now()) >= valid_until
+
+
+def get_home_snapshot():
+    snapshot = cache.get(HOME_SNAPSHOT_KEY)
+    if is_stale(snapshot):
+        snapshot = rebuild_home_snapshot()
+    return snapshot
+
+
+# ── Deferred rebuild ──────────────────────────────────────────────────────────
+# One rebuild per transaction, however many rows it touched. Saves outside a
+# transaction only drop the snapshot, so a loop of them costs one rebuild, on
+# the next read. Bulk writers suspend this and rebuild once themselves.
+
+_pending = threading.local()
+
+
+def _rebuild_if_dirty():
+    if getattr(_pending, 'dirty', False):
+        _pending.dirty = False
+        rebuild_home_snapshot()
+
+
+def schedule_home_snapshot_rebuild():
+    if getattr(_pending, 'suspended', 0):
+        return
+    if not transaction.get_connection().in_atomic_block:
+        cache.delete(HOME_SNAPSHOT_KEY)
+        return
+    _pending.dirty = True
+    transaction.on_commit(_rebuild_if_dirty)
+
+
+@contextmanager
+def home_snapshot_rebuilds_suspended():
+    """Ignore schedule_home_snapshot_rebuild() in this thread; the caller rebuilds when done."""
+    _pending.suspended = getattr(_pending, 'suspended', 0) + 1
+    try:
+        yield
+    finally:
+        _pending.suspended -= 1
@@ -0,0 +1,182 @@
+# catalog/lens_attributes.py
+"""
+In-memory attribute bitmask index for the medical lenses listing.
+
+Every active LensOption is reduced to one bitmask with a bit per lens brand
+slug, lens type slug, index value and coating code, so filtering by
+coatings no longer needs the m2m join + DISTINCT and facet counts need no
+extra queries:
+
+    group matches    (masks & selected_bits).any(axis=1)   — OR within a group
+    filter           AND of the group matches and the price range
+    facet counts     rows matching every *other* group, counted per bit
+
+Masks are a (options × words) uint64 array, so the number of distinct
+attribute values is not limited to 64. Sort orders are precomputed once per
+build; a request only applies a boolean mask to them.
+
+The index is built per process and stamped with a version kept in the
+cache. catalog/signals.py bumps the version (after commit) when a lens
+option, its coatings, a lens brand / type or a coating changes; each process
+notices the new version on its next request and rebuilds.
+"""
+
+import threading
+import time
+
+import numpy as np
+from django.core.cache import cache
+
+from core.db_router import primary_reads
+from .models import LensOption
+
+
+GROUPS       = ('lens_brand', 'lens_type', 'index', 'coating')
+LENS_SORTS   = ('-created_at', 'base_price', '-base_price', 'name', '-name')
+DEFAULT_SORT = '-created_at'
+VERSION_KEY  = 'lens_attributes:version'
+
+_lock  = threading.Lock()
+_index = None
+
+
+# ── Versions ──────────────────────────────────────────────────────────────────
+
+def index_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_index_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+# ── Index ─────────────────────────────────────────────────────────────────────
+
+class LensAttributeIndex:
+
+    def __init__(self, version, ids, bits, masks, prices, orders):
+        self.version = version
+        self.ids     = ids      # (n,) int64 LensOption ids
+        self.bits    = bits     # {group: {value: bit}}
+        self.masks   = masks    # (n, words) uint64
+        self.prices  = prices   # (n,) float64
+        self.orders  = orders   # {sort: (n,) row positions}
+
+    @classmethod
+    def build(cls, version):
+        rows = list(
+            LensOption.objects.filter(is_active=True).order_by('id')
+            .values_list('id', 'lens_brand__slug', 'lens_type__slug', 'index', 'base_price',
+                         'created_at', 'lens_brand__name', 'lens_type__name')
+        )
+        position = {row[0]: i for i, row in enumerate(rows)}
+        coatings = (
+            LensOption.coatings.through.objects
+            .filter(lensoption_id__in=position.keys())
+            .values_list('lensoption_id', 'lensaddon__code')
+        )
+
+        # row → {group: values}
+        values = [
+            {'lens_brand': {r[1]}, 'lens_type': {r[2]}, 'index': {r[3]}, 'coating': set()}
+            for r in rows
+        ]
+        for option_id, code in coatings:
+            values[position[option_id]]['coating'].add(code)
+
+        bits, next_bit = {}, 0
+        for group in GROUPS:
+            seen = sorted({v for row in values for v in row[group] if v not in (None, '')})
+            bits[group] = {value: next_bit + i for i, value in enumerate(seen)}
+            next_bit += len(seen)
+
+        words = max(1, (next_bit + 63) // 64)
+        masks = np.zeros((len(rows), words), dtype=np.uint64)
+        for i, row in enumerate(values):
+            for group in GROUPS:
+                for value in row[group]:
+                    bit = bits[group].get(value)
+                    if bit is not None:
+                        masks[i, bit >> 6] |= np.uint64(1 << (bit & 63))
+
+        ids     = np.array([r[0] for r in rows], dtype=np.int64)
+        prices  = np.array([float(r[4]) for r in rows], dtype=np.float64)
+        created = np.array([r[5].timestamp() if r[5] else 0.0 for r in rows], dtype=np.float64)
+        names   = [f'{r[6]} {r[7]} {r[3]}'.lower() for r in rows]
+
+        by_name = np.array(sorted(range(len(rows)), key=lambda i: (names[i], ids[i])), dtype=np.int64)
+        orders  = {
+            '-created_at': np.lexsort((-ids, -created)),
+            'base_price':  np.lexsort((ids, prices)),
+            '-base_price': np.lexsort((-ids, -prices)),
+            'name':        by_name,
+            '-name':       by_name[::-1],
+        }
+        return cls(version, ids, bits, masks, prices, orders)
+
+    def _query(self, group, selected):
+        query = np.zeros(self.masks.shape[1], dtype=np.uint64)
+        for value in selected:
+            bit = self.bits[group].get(value)
+            if bit is not None:
+                query[bit >> 6] |= np.uint64(1 << (bit & 63))
+        return query
+
+    def _column(self, bit):
+        return ((self.masks[:, bit >> 6] >> np.uint64(bit & 63)) & np.uint64(1)).astype(bool)
+
+    def select(self, selections, min_price=None, max_price=None, sort=DEFAULT_SORT):
+        """
+        Filter by `selections` ({group: [values]}) and the price range.
+        Returns (ids in `sort` order, {group: {value: count}}).
+        """
+        n        = len(self.ids)
+        in_price = np.ones(n, dtype=bool)
+        if min_price is not None:
+            in_price &= self.prices >= float(min_price)
+        if max_price is not None:
+            in_price &= self.prices <= float(max_price)
+
+        matches = {}
+        for group in GROUPS:
+            selected = selections.get(group)
+            if selected:
+                matches[group] = (self.masks & self._query(group, selected)).any(axis=1)
+
+        keep = in_price.copy()
+        for match in matches.values():
+            keep &= match
+
+        facets = {}
+        for group in GROUPS:
+            base = in_price.copy()
+            for other, match in matches.items():
+                if other != group:
+                    base &= match
+            facets[group] = {
+                value: int(np.count_nonzero(base & self._column(bit)))
+                for value, bit in self.bits[group].items()
+            }
+
+        order = self.orders.get(sort, self.orders[DEFAULT_SORT])
+        return self.ids[order[keep[order]]].tolist(), facets
+
+
+def get_lens_index():
+    """The process-local index, rebuilt when the cached version has moved on."""
+    global _index
+    version = index_version()
+    index   = _index
+    if index is not None and index.version == version:
+        return index
+    with _lock, primary_reads():
+        if _index is None or _index.version != version:
+            _index = LensAttributeIndex.build(version)
+        return _index
@@ -0,0 +1,482 @@
+# catalog/listing.py
+"""
+Faceted listing engine shared by every catalog product grid.
+
+Each grid (sunglasses, eyeglasses, kids, a brand page, ...) declares a
+ListingSpec: the base scope, which filters it accepts, the template and the
+sidebar brands. build_listing() then answers the whole page in a bounded
+number of queries, independent of catalog size:
+
+    1. one GROUP BY over the scoped products ("facet cube") that yields the
+       facet counts, the price buckets, the price range and the total count
+    2. one query for the current page, joined to each product's ProductCard
+       (catalog/cards.py) so tiles need no per-product image/variant queries
+    3. the sidebar brands / categories
+
+The facet cube is grouped by every facet dimension of the spec, so the
+counts for one facet can be derived in Python with all the *other* selected
+filters applied (disjunctive faceting) without re-querying. The total count
+comes from the cube too, so the paginator never runs its own COUNT(*).
+
+Pagination is offset-based (?page=N) by default. An ``after=`` cursor — or
+a cursor in ``page``, which is what the grids' "next" link sends whenever
+the sort supports it — switches to keyset pagination for the (created_at,
+id) and (base_price, id) sorts, so following "next" never walks deep
+OFFSETs. Keyset pages, and any request with ``count=approx``,
+reuse a cached facet summary so deep pages skip the cube query as well.
+"""
+
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q, Case, When, Value, IntegerField, Count, Min, Max
+
+from core.image_derivatives import prefetch_manifests
+from .models import Product, Brand, Category
+from .price_stats import PRICE_BUCKETS, bucket_expression, price_statistic
+from .pagination import (
+    KEYSET_SORTS, APPROXIMATE_COUNT_TIMEOUT, KeysetPaginator, ordering_for, is_cursor, encode_cursor,
+)
+
+
+PAGE_SIZE = 24
+
+SORT_OPTIONS = ['-created_at', 'base_price', '-base_price', 'name', '-name']
+DEFAULT_SORT = '-created_at'
+
+
+class ListingFilter:
+    """One facetable GET filter: the query-string param and the Product lookup it maps to."""
+
+    def __init__(self, param, field, multi=True, all_value=None):
+        self.param     = param
+        self.field     = field
+        self.multi     = multi
+        self.all_value = all_value
+
+    def selected(self, request):
+        if self.multi:
+            values = [v for v in request.GET.getlist(self.param) if v]
+        else:
+            value  = request.GET.get(self.param, '')
+            values = [value] if value else []
+        return [v for v in values if v != self.all_value]
+
+
+FILTERS = {
+    'gender':    ListingFilter('gender',    'gender', multi=False, all_value='all'),
+    'brand':     ListingFilter('brand',     'brand__slug'),
+    'category':  ListingFilter('category',  'category__slug'),
+    'type':      ListingFilter('type',      'product_type', multi=False, all_value='all'),
+    'lens_type': ListingFilter('lens_type', 'contact_lens__lens_type', multi=False),
+    'schedule':  ListingFilter('schedule',  'contact_lens__replacement_schedule', multi=False),
+}
+
+
+class ListingSpec:
+    """
+    Declares one product grid.
+
+        scope       — fixed Product filter kwargs (e.g. product_type='sunglasses')
+        filters     — names from FILTERS this grid accepts, plus optional
+                      'price' and 'search'
+        brands      — Brand filter kwargs for the sidebar, or None for no sidebar
+        categories  — include the category sidebar
+    """
+
+    def __init__(self, template, scope, filters, brands=None, brand_order=('display_order', 'name'),
+                 categories=False, select_related=('brand', 'category', 'card'),
+                 prefetch_related=()):
+        self.template         = template
+        self.scope            = scope
+        self.filters          = tuple(filters)
+        self.brands           = brands
+        self.brand_order      = brand_order
+        self.categories       = categories
+        self.select_related   = select_related
+        self.prefetch_related = prefetch_related
+
+    @property
+    def facets(self):
+        return [name for name in self.filters if name in FILTERS]
+
+    def scoped(self, **extra_scope):
+        """Copy of this spec with extra fixed filters (used by brand / category pages)."""
+        spec       = ListingSpec.__new__(ListingSpec)
+        spec.__dict__.update(self.__dict__)
+        spec.scope = {**self.scope, **extra_scope}
+        return spec
+
+
+# ── Per-grid declarations ─────────────────────────────────────────────────────
+
+LISTINGS = {
+    'sunglasses': ListingSpec(
+        'sunglasses_list.html',
+        scope={'product_type': 'sunglasses'},
+        filters=('gender', 'brand', 'price'),
+        brands={'available_for_sunglasses': True},
+        brand_order=(),
+    ),
+    'eyeglasses': ListingSpec(
+        'eyeglasses_list.html',
+        scope={'product_type': 'eyeglasses'},
+        filters=('gender', 'brand', 'price'),
+        brands={'available_for_eyeglasses': True},
+        brand_order=(),
+    ),
+    'contact_lenses': ListingSpec(
+        'contact_lenses_list.html',
+        scope={'product_type': 'contact_lenses'},
+        filters=('lens_type', 'schedule', 'brand', 'price'),
+        brands={'available_for_contact_lenses': True},
+        brand_order=(),
+        select_related=('brand', 'contact_lens', 'card'),
+    ),
+    'accessories': ListingSpec(
+        'accessories_list.html',
+        scope={'product_type': 'accessories'},
+        filters=('brand', 'category', 'price'),
+        brands={},
+        categories=True,
+    ),
+    'reading_glasses': ListingSpec(
+        'reading_glasses_list.html',
+        scope={'product_type': 'reading_glasses'},
+        filters=('gender', 'brand', 'price'),
+        brands={},
+    ),
+    'kids': ListingSpec(
+        'kids_list.html',
+        scope={'gender': 'kids'},
+        filters=('type', 'brand', 'price'),
+        brands={},
+    ),
+    'brand': ListingSpec(
+        'brand_detail.html',
+        scope={},
+        filters=('type',),
+    ),
+    'category': ListingSpec(
+        'category_detail.html',
+        scope={},
+        filters=('gender',),
+    ),
+}
+
+
+def generic_listing(product_type):
+    """Spec for the catch-all /products/<type>/ grid: every filter is allowed."""
+    scope = {'product_type': product_type} if product_type else {}
+    return ListingSpec(
+        'product_list.html',
+        scope=scope,
+        filters=('gender', 'brand', 'category', 'price', 'search'),
+        brands={},
+        brand_order=(),
+        categories=True,
+    )
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _parse_price(value):
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _price_q(min_price, max_price):
+    q = Q()
+    if min_price is not None:
+        q &= Q(base_price__gte=min_price)
+    if max_price is not None:
+        q &= Q(base_price__lte=max_price)
+    return q
+
+
+class _CountedPaginator(Paginator):
+    """Paginator whose total is already known, so it never issues COUNT(*)."""
+
+    def __init__(self, object_list, per_page, count):
+        super().__init__(object_list, per_page)
+        self.count = count
+
+
+def _facet_cube(queryset, dims, price_q):
+    """
+    One aggregate query grouped by every facet dimension + price bucket.
+    `_in_price` flags the cells that also satisfy the current price filter.
+    """
+    annotations = {'_bucket': bucket_expression()}
+    if price_q:
+        annotations['_in_price'] = Case(
+            When(price_q, then=Value(1)), default=Value(0), output_field=IntegerField()
+        )
+    group_by = list(dims) + list(annotations)
+
+    rows = (
+        queryset
+        .annotate(**annotations)
+        .values(*group_by)
+        .annotate(_n=Count('id'), _min=Min('base_price'), _max=Max('base_price'))
+        .order_by()
+    )
+    cube = list(rows)
+    if not price_q:
+        for row in cube:
+            row['_in_price'] = 1
+    return cube
+
+
+def _summarise_cube(cube, selections):
+    """Derive facet counts, price buckets, price range and total from the cube rows."""
+
+    def matches(row, skip=None):
+        for name, (field, values) in selections.items():
+            if name != skip and values and row[field] not in values:
+                return False
+        return True
+
+    facets = {name: {} for name in selections}
+    total  = 0
+    bucket_counts = [0] * len(PRICE_BUCKETS)
+    min_price = max_price = None
+
+    for row in cube:
+        n = row['_n']
+        if row['_in_price']:
+            for name, (field, _values) in selections.items():
+                if matches(row, skip=name):
+                    key = row[field]
+                    facets[name][key] = facets[name].get(key, 0) + n
+
+        if not matches(row):
+            continue
+
+        # Price facet: every other filter applied, the price filter itself ignored.
+        bucket_counts[row['_bucket']] += n
+        if min_price is None or row['_min'] < min_price:
+            min_price = row['_min']
+        if max_price is None or row['_max'] > max_price:
+            max_price = row['_max']
+
+        if row['_in_price']:
+            total += n
+
+    price_buckets = []
+    for i, lo in enumerate(PRICE_BUCKETS):
+        hi = PRICE_BUCKETS[i + 1] if i + 1 < len(PRICE_BUCKETS) else None
+        price_buckets.append({'min': lo, 'max': hi, 'count': bucket_counts[i]})
+
+    return {
+        'facets':        facets,
+        'price_buckets': price_buckets,
+        'price_range':   {'min_price': min_price, 'max_price': max_price},
+        'total':         total,
+    }
+
+
+def _summary_cache_key(spec, selections, price_q, search):
+    raw = json.dumps(
+        [sorted(spec.scope.items()), spec.filters,
+         sorted((name, sorted(values)) for name, (_f, values) in selections.items()),
+         str(price_q), search],
+        default=str,
+    )
+    return 'listing_summary:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _price_stats_slice(scope):
+    """The PriceStatistic (dimension, key) covering a grid scope, if there is one."""
+    if 'brand' in scope:
+        return 'brand', scope['brand'].pk
+    if 'category' in scope:
+        return 'category', scope['category'].pk
+    if set(scope) == {'product_type'}:
+        return 'product_type', scope['product_type']
+    return None
+
+
+# ── Engine ────────────────────────────────────────────────────────────────────
+
+def build_listing(request, spec):
+    """
+    Run one product grid for `request`.
+
+    Returns a dict with:
+        page_obj       — a Django Page, or a KeysetPage in keyset mode
+        next_page      — what the "next" link sends as ?page=: the keyset
+                         cursor when the sort has one, else the page number
+                         (None on the last page)
+        next_query     — the current query string with ?page=next_page
+        total_count    — number of matching products
+        facets         — {filter_name: {value: count}} for the spec's facets
+        price_buckets  — [{'min', 'max', 'count'}] for the current filter set
+        price_range    — {'min_price', 'max_price'} slider bounds: the whole grid
+                         scope when it has a PriceStatistic slice, else the
+                         current filter set
+        price_stats    — price_stats.price_statistic() for the grid scope (or None)
+        selected       — {filter_name: [values]} parsed from the query string
+        current_sort   — the sort actually applied
+        brands         — sidebar brands annotated with `facet_count` (or None)
+        categories     — sidebar categories annotated with `facet_count` (or None)
+    """
+    base = Product.objects.filter(is_active=True, **spec.scope)
+
+    search = ''
+    if 'search' in spec.filters:
+        search = request.GET.get('search', '').strip()
+        if search:
+            base = base.filter(
+                Q(name__icontains=search) |
+                Q(brand__name__icontains=search) |
+                Q(description__icontains=search)
+            )
+
+    price_q = Q()
+    if 'price' in spec.filters:
+        price_q = _price_q(
+            _parse_price(request.GET.get('min_price')),
+            _parse_price(request.GET.get('max_price')),
+        )
+
+    selections = {}
+    for name in spec.facets:
+        flt = FILTERS[name]
+        selections[name] = (flt.field, set(flt.selected(request)))
+
+    sort = request.GET.get('sort', DEFAULT_SORT)
+    if sort not in SORT_OPTIONS:
+        sort = DEFAULT_SORT
+
+    # `page` first: the grids' "next" link sets it on top of the current URL,
+    # which may still carry the `after` it was reached by.
+    cursor = request.GET.get('page') or request.GET.get('after')
+    keyset = sort in KEYSET_SORTS and is_cursor(cursor)
+    approximate = keyset or request.GET.get('count') == 'approx'
+
+    summary = None
+    if approximate:
+        summary_key = _summary_cache_key(spec, selections, price_q, search)
+        summary     = cache.get(summary_key)
+    if summary is None:
+        cube    = _facet_cube(base, [field for field, _ in selections.values()], price_q)
+        summary = _summarise_cube(cube, selections)
+        if approximate:
+            cache.set(summary_key, summary, APPROXIMATE_COUNT_TIMEOUT)
+
+    # ── Page ──────────────────────────────────────────────────────────────────
+    matched = base
+    for field, values in selections.values():
+        if values:
+            matched = matched.filter(**{f'{field}__in': values})
+    if price_q:
+        matched = matched.filter(price_q)
+
+    if spec.select_related:
+        matched = matched.select_related(*spec.select_related)
+    if spec.prefetch_related:
+        matched = matched.prefetch_related(*spec.prefetch_related)
+
+    if keyset:
+        paginator = KeysetPaginator(matched, PAGE_SIZE, sort, count=summary['total'])
+        page_obj  = paginator.get_page(cursor)
+    else:
+        paginator = _CountedPaginator(matched.order_by(*ordering_for(sort)), PAGE_SIZE, summary['total'])
+        page_obj  = paginator.get_page(request.GET.get('page'))
+        page_obj.next_cursor = None
+        if sort in KEYSET_SORTS and page_obj.has_next():
+            # Lets "next" links / crawlers continue in keyset mode from here.
+            page_obj.next_cursor = encode_cursor(sort, page_obj[len(page_obj) - 1])
+
+    next_page  = None
+    next_query = None
+    if page_obj.has_next():
+        next_page = page_obj.next_cursor or page_obj.next_page_number()
+        params    = request.GET.copy()
+        for name in ('after', 'ajax'):
+            params.pop(name, None)
+        params['page'] = next_page
+        next_query = params.urlencode()
+
+    # ── Price slider ──────────────────────────────────────────────────────────
+    price_range = summary['price_range']
+    price_stats = None
+    stats_slice = _price_stats_slice(spec.scope)
+    if stats_slice and 'price' in spec.filters:
+        price_stats = price_statistic(*stats_slice)
+        if price_stats['count']:
+            price_range = {'min_price': price_stats['min_price'], 'max_price': price_stats['max_price']}
+
+    # ── Sidebars ──────────────────────────────────────────────────────────────
+    brands = None
+    if spec.brands is not None:
+        brand_counts = summary['facets'].get('brand', {})
+        brands = list(Brand.objects.filter(is_active=True, **spec.brands).order_by(*spec.brand_order))
+        for brand in brands:
+            brand.facet_count = brand_counts.get(brand.slug, 0)
+
+    categories = None
+    if spec.categories:
+        category_counts = summary['facets'].get('category', {})
+        categories = list(Category.objects.filter(is_active=True).order_by('name'))
+        for category in categories:
+            category.facet_count = category_counts.get(category.slug, 0)
+
+    return {
+        'page_obj':      page_obj,
+        'next_page':     next_page,
+        'next_query':    next_query,
+        'total_count':   summary['total'],
+        'facets':        summary['facets'],
+        'price_buckets': summary['price_buckets'],
+        'price_range':   price_range,
+        'price_stats':   price_stats,
+        'selected':      {name: sorted(values) for name, (_f, values) in selections.items()},
+        'current_sort':  sort,
+        'brands':        brands,
+        'categories':    categories,
+    }
+
+
+def listing_context(listing, **extra):
+    """Template context keys every grid template already expects, plus the facet data."""
+    page_obj = listing['page_obj']
+    context = {
+        'products':      page_obj,
+        'page_obj':      page_obj,
+        'is_paginated':  page_obj.has_other_pages(),
+        'next_cursor':   page_obj.next_cursor,
+        'next_page':     listing['next_page'],
+        'next_query':    listing['next_query'],
+        'total_count':   listing['total_count'],
+        'facets':        listing['facets'],
+        'price_buckets': listing['price_buckets'],
+        'price_range':   listing['price_range'],
+        'price_stats':   listing['price_stats'],
+        'current_sort':  listing['current_sort'],
+    }
+    if listing['brands'] is not None:
+        context['brands'] = listing['brands']
+    if listing['categories'] is not None:
+        context['categories'] = listing['categories']
+    context.update(extra)
+    context['image_manifests'] = prefetch_manifests(_page_images(context))
+    return context
+
+
+def _page_images(context):
+    """Every image the grid templates pass to the responsive_images tags."""
+    images = [getattr(getattr(product, 'card', None), 'primary_image_url', '') for product in context['page_obj']]
+    for key in ('brands', 'other_brands'):
+        images.extend(brand.logo for brand in context.get(key) or ())
+    if context.get('brand'):
+        images.append(context['brand'].logo)
+    return images
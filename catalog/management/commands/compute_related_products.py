@@ -0,0 +1,22 @@
+# catalog/management/commands/compute_related_products.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog.related import TOP_N, BATCH_SIZE, compute_related_products
+
+
+class Command(BaseCommand):
+    help = 'Recompute the RelatedProduct table (brand, category, price band, specs and co-purchase similarity).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-n', type=int, default=TOP_N, help='Neighbours stored per product.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Products scored per NumPy block (memory ~ batch × products of a type).')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        products, written = compute_related_products(options['top_n'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {written} related-product rows for {products} products in {time.monotonic() - started:.1f}s.'
+        ))
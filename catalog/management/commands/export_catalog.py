@@ -0,0 +1,32 @@
+# catalog/management/commands/export_catalog.py
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.bulk_io import BATCH_SIZE, FORMATS, export_catalog, format_for
+
+
+class Command(BaseCommand):
+    help = 'Stream all products with variants, specifications, tags and image references to CSV or JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='Output file (default: stdout).')
+        parser.add_argument('--format', choices=FORMATS, help='Output format (default: from the file extension, else jsonl).')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Products read per batch.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt  = options['format'] or format_for(path)
+
+        if path == '-':
+            for chunk in export_catalog(fmt, options['batch_size']):
+                sys.stdout.write(chunk)
+            return
+
+        try:
+            with open(path, 'w', encoding='utf-8', newline='') as fh:
+                for chunk in export_catalog(fmt, options['batch_size']):
+                    fh.write(chunk)
+        except OSError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'Exported catalog to {path} ({fmt}).'))
@@ -0,0 +1,40 @@
+# catalog/management/commands/import_catalog.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.bulk_io import BATCH_SIZE, FORMATS, import_catalog, format_for
+
+
+class Command(BaseCommand):
+    help = 'Upsert products, variants, specifications, tags and image references from a CSV or JSONL file (by SKU).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument('--format', choices=FORMATS, help='Input format (default: from the file extension).')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Products written per batch.')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or format_for(options['path'], default=None)
+        if fmt is None:
+            raise CommandError('Cannot tell the format from the file name; pass --format csv|jsonl.')
+
+        started = time.monotonic()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as fh:
+                report = import_catalog(fh, fmt, options['batch_size'])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.monotonic() - started
+
+        for line, sku, message in report['errors']:
+            self.stderr.write(f'  line {line} [{sku}]: {message}')
+        if report['error_count'] > len(report['errors']):
+            self.stderr.write(f'  ... and {report["error_count"] - len(report["errors"])} more errors')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['records']} records in {elapsed:.1f}s: "
+            f"{report['products_created']} products created, {report['products_updated']} updated, "
+            f"{report['variants_created']} variants created, {report['variants_updated']} updated, "
+            f"{report['error_count']} errors."
+        ))
@@ -0,0 +1,24 @@
+# catalog/management/commands/rebuild_home_snapshot.py
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from catalog.home_snapshot import HOME_SNAPSHOT_KEY, is_stale, rebuild_home_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the cached home page snapshot (banners, product tabs, brands).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-only', action='store_true',
+            help='Only rebuild when the snapshot is missing or past its next banner boundary.',
+        )
+
+    def handle(self, *args, **options):
+        if options['stale_only'] and not is_stale(cache.get(HOME_SNAPSHOT_KEY)):
+            self.stdout.write('Home snapshot is current.')
+            return
+
+        snapshot = rebuild_home_snapshot()
+        valid_until = snapshot['valid_until'] or 'next content change'
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt home snapshot (valid until {valid_until}).'))
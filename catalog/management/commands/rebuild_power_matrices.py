@@ -0,0 +1,21 @@
+# catalog/management/commands/rebuild_power_matrices.py
+from django.core.management.base import BaseCommand
+
+from catalog.models import ContactLensProduct
+from catalog.power_matrix import refresh_power_matrices
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the contact lens power availability matrices (all contact lens products, or the given ids).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_ids', nargs='*', type=int)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        ids = options['product_ids'] or list(ContactLensProduct.objects.values_list('product_id', flat=True))
+
+        written, size = 0, options['batch_size']
+        for start in range(0, len(ids), size):
+            written += refresh_power_matrices(ids[start:start + size])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} power matrix(es).'))
@@ -0,0 +1,12 @@
+# catalog/management/commands/rebuild_price_statistics.py
+from django.core.management.base import BaseCommand
+
+from catalog.price_stats import rebuild_price_statistics
+
+
+class Command(BaseCommand):
+    help = 'Recompute the price slider statistics (per product type, category, brand and lens options).'
+
+    def handle(self, *args, **options):
+        written = rebuild_price_statistics()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} price statistic row(s).'))
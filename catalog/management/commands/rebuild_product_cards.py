@@ -0,0 +1,16 @@
+# catalog/management/commands/rebuild_product_cards.py
+from django.core.management.base import BaseCommand
+
+from catalog.cards import refresh_product_cards
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized ProductCard rows (all products, or the given ids).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_ids', nargs='*', type=int)
+
+    def handle(self, *args, **options):
+        ids     = options['product_ids'] or None
+        written = refresh_product_cards(ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} product card(s).'))
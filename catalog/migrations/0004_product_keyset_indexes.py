@@ -0,0 +1,29 @@
+# Generated by Django 4.2.25 on 2026-10-16 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_brand_available_for_accessories_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['product_type', 'is_active', 'created_at', 'id'], name='catalog_pro_product_67cd1b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['product_type', 'is_active', 'base_price', 'id'], name='catalog_pro_product_853b17_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['brand', 'is_active', 'created_at', 'id'], name='catalog_pro_brand_i_e11173_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'is_active', 'created_at', 'id'], name='catalog_pro_categor_e1df56_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.25 on 2026-10-16 19:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='catalog.product')),
+                ('name', models.CharField(max_length=255)),
+                ('slug', models.SlugField()),
+                ('sku', models.CharField(max_length=100)),
+                ('product_type', models.CharField(max_length=50)),
+                ('brand_name', models.CharField(blank=True, max_length=200)),
+                ('primary_image_url', models.CharField(blank=True, max_length=500)),
+                ('secondary_image_url', models.CharField(blank=True, max_length=500)),
+                ('swatches', models.JSONField(blank=True, default=list)),
+                ('base_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('compare_at_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('discount_percentage', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('in_stock', models.BooleanField(default=True)),
+                ('rating_average', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_featured', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'catalog_product_cards',
+                'indexes': [models.Index(fields=['is_active', 'created_at'], name='catalog_pro_is_acti_487f5c_idx'), models.Index(fields=['is_active', 'is_featured', 'base_price'], name='catalog_pro_is_acti_14e95f_idx'), models.Index(fields=['is_active', 'product_type', 'created_at'], name='catalog_pro_is_acti_e93db9_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.25 on 2026-10-16 20:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_product_card'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('product_type', 'Product type'), ('category', 'Category'), ('brand', 'Brand'), ('lens_option', 'Lens options')], max_length=20)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('buckets', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'catalog_price_statistics',
+                'unique_together': {('dimension', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.25 on 2026-10-16 20:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_price_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_products', to='catalog.product')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_to', to='catalog.product')),
+            ],
+            options={
+                'db_table': 'catalog_related_products',
+                'indexes': [models.Index(fields=['product', 'rank'], name='catalog_rel_product_5e99b3_idx')],
+                'unique_together': {('product', 'related')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.25 on 2026-10-16 20:27
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lenses', '0001_initial'),
+        ('catalog', '0007_related_products'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lensoption',
+            name='coatings',
+            field=models.ManyToManyField(blank=True, related_name='medical_lens_options', to='lenses.lensaddon'),
+        ),
+        migrations.AddField(
+            model_name='lensoption',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='lensoption',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+    ]
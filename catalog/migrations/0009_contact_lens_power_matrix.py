@@ -0,0 +1,25 @@
+# Generated by Django 4.2.25 on 2026-10-16 20:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_lens_option_attributes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactLensPowerMatrix',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='power_matrix', serialize=False, to='catalog.product')),
+                ('matrix', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'catalog_contact_lens_power_matrices',
+            },
+        ),
+    ]
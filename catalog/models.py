@@ -113,6 +113,13 @@ class Product(models.Model):
 
     class Meta:
         db_table = 'catalog_products'
+        indexes = [
+            # Keyset pagination: (created_at, id) / (base_price, id) seeks per grid scope
+            models.Index(fields=['product_type', 'is_active', 'created_at', 'id']),
+            models.Index(fields=['product_type', 'is_active', 'base_price', 'id']),
+            models.Index(fields=['brand', 'is_active', 'created_at', 'id']),
+            models.Index(fields=['category', 'is_active', 'created_at', 'id']),
+        ]
 
     @property
     def is_in_stock(self):
@@ -187,6 +194,102 @@ class ProductSpecification(models.Model):
         ]
 
 
+class ProductCard(models.Model):
+    """
+    Denormalized grid card for one product (see catalog/cards.py).
+    Rebuilt by catalog/signals.py whenever the product, its images,
+    variants or approved reviews change.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='card')
+
+    name = models.CharField(max_length=255)
+    slug = models.SlugField()
+    sku = models.CharField(max_length=100)
+    product_type = models.CharField(max_length=50)
+    brand_name = models.CharField(max_length=200, blank=True)
+
+    primary_image_url = models.CharField(max_length=500, blank=True)
+    secondary_image_url = models.CharField(max_length=500, blank=True)
+    swatches = models.JSONField(default=list, blank=True)  # [{'name', 'code'}] of active variants
+
+    base_price = models.DecimalField(max_digits=10, decimal_places=2)
+    compare_at_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+    discount_percentage = models.PositiveSmallIntegerField(null=True, blank=True)
+    in_stock = models.BooleanField(default=True)
+
+    rating_average = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
+    rating_count = models.PositiveIntegerField(default=0)
+
+    is_active = models.BooleanField(default=True)
+    is_featured = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'catalog_product_cards'
+        indexes = [
+            models.Index(fields=['is_active', 'created_at']),
+            models.Index(fields=['is_active', 'is_featured', 'base_price']),
+            models.Index(fields=['is_active', 'product_type', 'created_at']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class RelatedProduct(models.Model):
+    """
+    Precomputed "You may also like" neighbours of a product, best first.
+    Written in bulk by `manage.py compute_related_products` (catalog/related.py).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_products')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_to')
+
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'catalog_related_products'
+        unique_together = [['product', 'related']]
+        indexes = [
+            models.Index(fields=['product', 'rank']),
+        ]
+
+
+class PriceStatistic(models.Model):
+    """
+    Incrementally maintained price statistics for one slice of the catalog
+    (see catalog/price_stats.py). Active products only.
+    """
+    DIMENSIONS = [
+        ('product_type', 'Product type'),
+        ('category', 'Category'),
+        ('brand', 'Brand'),
+        ('lens_option', 'Lens options'),
+    ]
+
+    dimension = models.CharField(max_length=20, choices=DIMENSIONS)
+    key = models.CharField(max_length=100, blank=True)  # product_type value / category id / brand id
+
+    product_count = models.PositiveIntegerField(default=0)
+    price_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    buckets = models.JSONField(default=list, blank=True)  # counts per price_stats.PRICE_BUCKETS
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'catalog_price_statistics'
+        unique_together = [['dimension', 'key']]
+
+    def __str__(self):
+        return f'{self.dimension}:{self.key}'
+
+
 class ContactLensProduct(models.Model):
     product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='contact_lens')
 
@@ -242,6 +345,22 @@ class ContactLensPowerOption(models.Model):
         unique_together = ['color', 'power_value']
 
 
+class ContactLensPowerMatrix(models.Model):
+    """
+    Precomputed colors × power-steps availability grid of one contact lens
+    product (see catalog/power_matrix.py). Rebuilt by catalog/signals.py
+    whenever a color or power option of the product changes.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='power_matrix')
+
+    matrix = models.JSONField(default=dict, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'catalog_contact_lens_power_matrices'
+
+
 
 class ProductTag(models.Model):
     """Tags for products (e.g., "Bestseller", "New Arrival")"""
@@ -291,5 +410,18 @@ class LensOption(models.Model):
     min_power = models.DecimalField(max_digits=4, decimal_places=2)
     max_power = models.DecimalField(max_digits=4, decimal_places=2)
 
+    coatings = models.ManyToManyField('lenses.LensAddOn', blank=True, related_name='medical_lens_options')
+
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
     class Meta:
         db_table = 'catalog_lens_options'
+
+    @property
+    def name(self):
+        return f'{self.lens_brand.name} {self.lens_type.name} {self.index}'
+
+    @property
+    def coating_display(self):
+        return ', '.join(coating.name for coating in self.coatings.all())
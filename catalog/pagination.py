@@ -0,0 +1,174 @@
+# catalog/pagination.py
+"""
+Keyset (seek) pagination for catalog grids.
+
+Offset pagination makes page N cost O(N): the database walks and discards
+every row before the OFFSET. Keyset pagination instead remembers the sort
+key of the last row shown and asks for "rows after (value, id)", which the
+composite (…, created_at, id) / (…, base_price, id) indexes on
+catalog_products answer with a single index seek — page 200 costs the same
+as page 1.
+
+The cursor is an opaque, URL-safe token: base64 of [sort, value, id].
+"""
+
+import base64
+import json
+import math
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+# sort option → (model field, descending)
+KEYSET_SORTS = {
+    '-created_at': ('created_at', True),
+    'base_price':  ('base_price', False),
+    '-base_price': ('base_price', True),
+}
+
+APPROXIMATE_COUNT_TIMEOUT = 300  # seconds a keyset / count=approx facet summary is reused
+
+
+def ordering_for(sort):
+    """ORDER BY for a sort option, with an id tie-breaker matching the sort direction."""
+    if sort in KEYSET_SORTS:
+        field, descending = KEYSET_SORTS[sort]
+        return ('-' + field, '-id') if descending else (field, 'id')
+    return (sort, '-id')
+
+
+# ── Cursor tokens ─────────────────────────────────────────────────────────────
+
+def _serialize(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _deserialize(field, raw):
+    if field == 'created_at':
+        return parse_datetime(raw)
+    return Decimal(raw)
+
+
+def encode_cursor(sort, obj):
+    field, _ = KEYSET_SORTS[sort]
+    payload  = json.dumps([sort, _serialize(getattr(obj, field)), obj.pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort):
+    """Return (value, id) for `token`, or None if it is malformed or for another sort."""
+    if not token or sort not in KEYSET_SORTS:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        token_sort, raw, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if token_sort != sort:
+            return None
+        value = _deserialize(KEYSET_SORTS[sort][0], raw)
+        if value is None:
+            return None
+        return value, int(pk)
+    except (ValueError, TypeError, InvalidOperation, json.JSONDecodeError):
+        return None
+
+
+def is_cursor(token):
+    """True if `token` looks like a cursor rather than a page number."""
+    return bool(token) and not str(token).isdigit() and str(token) != 'last'
+
+
+# ── Paginator ─────────────────────────────────────────────────────────────────
+
+class KeysetPage:
+    """
+    Page of a keyset-paginated queryset.
+
+    Mirrors the parts of django.core.paginator.Page the grid templates use;
+    next_page_number() returns the cursor token for the next page, so the
+    existing "next" links keep paginating by seek.
+    """
+
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, next_cursor, after):
+        self.object_list = object_list
+        self.paginator   = paginator
+        self.next_cursor = next_cursor
+        self.after       = after
+        self.number      = None
+
+    def __repr__(self):
+        return f'<KeysetPage after={self.after!r}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return False
+
+    def has_other_pages(self):
+        return self.has_next()
+
+    def next_page_number(self):
+        return self.next_cursor
+
+
+class KeysetPaginator:
+    """
+    Seek-based paginator over `queryset` for one of KEYSET_SORTS.
+
+    `count` is optional and only informational (typically an approximate
+    total); keyset pages never need it to fetch rows.
+    """
+
+    def __init__(self, queryset, per_page, sort, count=None):
+        if sort not in KEYSET_SORTS:
+            raise ValueError(f'Sort {sort!r} does not support keyset pagination')
+        self.queryset = queryset.order_by(*ordering_for(sort))
+        self.per_page = per_page
+        self.sort     = sort
+        self.count    = count
+
+    @property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(1, math.ceil(self.count / self.per_page))
+
+    @property
+    def page_range(self):
+        return []
+
+    def get_page(self, token=None):
+        field, descending = KEYSET_SORTS[self.sort]
+        queryset = self.queryset
+
+        position = decode_cursor(token, self.sort)
+        if position:
+            value, pk = position
+            if descending:
+                seek = Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk})
+            else:
+                seek = Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk})
+            queryset = queryset.filter(seek)
+
+        rows = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            next_cursor = encode_cursor(self.sort, rows[-1])
+
+        return KeysetPage(rows, self, next_cursor, token if position else None)
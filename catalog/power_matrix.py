@@ -0,0 +1,187 @@
+# catalog/power_matrix.py
+"""
+Per-product contact lens power availability matrix.
+
+The power picker and add_contact_lens_to_cart used to walk
+ContactLensColor → ContactLensPowerOption one color at a time. Instead,
+every contact lens product gets one ContactLensPowerMatrix row holding its
+colors × power-steps grid as a compact JSON blob:
+
+    {
+      "min":    "-12.00",           # power of step 0
+      "step":   "0.25",
+      "steps":  97,
+      "colors": {
+        "<color id>": {
+          "name":          "Hazel",
+          "power_enabled": true,
+          "available":     "1f3c…",  # hex bitmask, bit i ⇔ min + i·step is offered
+          "stock":         [0, 4, …] # stock_quantity per step (0 where there is no option)
+        }
+      }
+    }
+
+The same blob is embedded in the detail page for the picker and served by
+`contact_lens_power_matrix`; cart validation reads it through the cache.
+catalog/signals.py rebuilds a product's matrix after commit whenever one of
+its colors or power options changes.
+"""
+
+import threading
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.db_router import primary_reads
+from .bulk_sql import insert_rows
+from .models import ContactLensProduct, ContactLensColor, ContactLensPowerOption, ContactLensPowerMatrix
+
+
+POWER_STEP           = Decimal('0.25')
+MATRIX_CACHE_TIMEOUT = 60 * 60  # seconds
+
+
+# ── Building ──────────────────────────────────────────────────────────────────
+
+def _build_matrix(colors, options):
+    """colors: [(id, name, power_enabled)]; options: [(color_id, power, stock, is_available)]."""
+    powers = [power for _color, power, _stock, _available in options if power % POWER_STEP == 0]
+    low    = min(powers) if powers else Decimal('0')
+    steps  = int((max(powers) - low) / POWER_STEP) + 1 if powers else 0
+
+    grid = {color_id: (0, [0] * steps) for color_id, _name, _enabled in colors}
+    for color_id, power, stock, available in options:
+        if color_id not in grid or power % POWER_STEP:
+            continue
+        i = int((power - low) / POWER_STEP)
+        bits, stocks = grid[color_id]
+        stocks[i] = max(stock, 0)
+        if available:
+            grid[color_id] = (bits | (1 << i), stocks)
+
+    return {
+        'min':    f'{low:.2f}',
+        'step':   str(POWER_STEP),
+        'steps':  steps,
+        'colors': {
+            str(color_id): {
+                'name':          name,
+                'power_enabled': enabled,
+                'available':     format(grid[color_id][0], 'x'),
+                'stock':         grid[color_id][1],
+            }
+            for color_id, name, enabled in colors
+        },
+    }
+
+
+def refresh_power_matrices(product_ids):
+    """Rebuild the matrices of `product_ids` with two reads and one upsert. Returns the number written."""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return 0
+
+    colors = defaultdict(list)
+    color_product = {}
+    for product_id, color_id, name, enabled in (
+        ContactLensColor.objects.filter(contact_lens__product_id__in=product_ids, is_active=True)
+        .order_by('id').values_list('contact_lens__product_id', 'id', 'name', 'power_enabled')
+    ):
+        colors[product_id].append((color_id, name, enabled))
+        color_product[color_id] = product_id
+
+    options = defaultdict(list)
+    for row in (
+        ContactLensPowerOption.objects.filter(color_id__in=color_product.keys())
+        .values_list('color_id', 'power_value', 'stock_quantity', 'is_available')
+    ):
+        options[color_product[row[0]]].append(row)
+
+    existing = set(ContactLensProduct.objects.filter(product_id__in=product_ids).values_list('product_id', flat=True))
+    ContactLensPowerMatrix.objects.filter(product_id__in=product_ids - existing).delete()
+
+    now = timezone.now()
+    insert_rows(
+        ContactLensPowerMatrix,
+        ['product_id', 'matrix', 'updated_at'],
+        [[pid, _build_matrix(colors[pid], options[pid]), now] for pid in sorted(existing)],
+        conflict_field='product_id',
+        update_fields=['matrix', 'updated_at'],
+    )
+    cache.delete_many([_matrix_key(pid) for pid in product_ids])
+    return len(existing)
+
+
+# ── Deferred refresh ──────────────────────────────────────────────────────────
+
+_pending = threading.local()
+
+
+def _flush_pending():
+    ids = getattr(_pending, 'ids', None)
+    if ids:
+        _pending.ids = set()
+        refresh_power_matrices(ids)
+
+
+def schedule_power_matrix_refresh(product_id):
+    if not hasattr(_pending, 'ids'):
+        _pending.ids = set()
+    _pending.ids.add(product_id)
+    transaction.on_commit(_flush_pending)
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+def _matrix_key(product_id):
+    return f'power_matrix:{product_id}'
+
+
+def get_power_matrix(product_id):
+    """The product's matrix (built on first use if it has no row yet)."""
+    key    = _matrix_key(product_id)
+    matrix = cache.get(key)
+    if matrix is None:
+        # From the primary: refreshes invalidate this key right after they commit there.
+        with primary_reads():
+            matrix = ContactLensPowerMatrix.objects.filter(product_id=product_id).values_list('matrix', flat=True).first()
+            if matrix is None:
+                refresh_power_matrices([product_id])
+                matrix = ContactLensPowerMatrix.objects.filter(product_id=product_id).values_list('matrix', flat=True).first() or {}
+        cache.set(key, matrix, MATRIX_CACHE_TIMEOUT)
+    return matrix
+
+
+def _step(matrix, power):
+    try:
+        offset = (Decimal(str(power)) - Decimal(matrix['min'])) / Decimal(matrix['step'])
+    except (InvalidOperation, KeyError, TypeError, ValueError):
+        return None
+    if offset != offset.to_integral_value() or not 0 <= offset < matrix['steps']:
+        return None
+    return int(offset)
+
+
+def power_status(matrix, color_id, power):
+    """(available, stock) of `power` for a color; (False, 0) off the grid."""
+    color = matrix.get('colors', {}).get(str(color_id))
+    i     = _step(matrix, power) if color else None
+    if i is None:
+        return False, 0
+    return bool(int(color['available'], 16) >> i & 1), color['stock'][i]
+
+
+def available_powers(matrix, color_id):
+    """[{'power_value', 'stock_quantity'}] of the powers offered for a color, lowest first."""
+    color = matrix.get('colors', {}).get(str(color_id))
+    if not color:
+        return []
+    bits, low, step = int(color['available'], 16), Decimal(matrix['min']), Decimal(matrix['step'])
+    return [
+        {'power_value': low + i * step, 'stock_quantity': stock}
+        for i, stock in enumerate(color['stock'])
+        if bits >> i & 1
+    ]
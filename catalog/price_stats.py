@@ -0,0 +1,220 @@
+# catalog/price_stats.py
+"""
+Incrementally maintained price statistics for the listing price sliders.
+
+One PriceStatistic row per slice of the catalog — every product_type,
+category and brand, plus the lens options — over active rows only, holding
+count, sum, min, max and a histogram over PRICE_BUCKETS. Reading a slider's
+bounds and bucket counts is a single unique-key lookup instead of a
+MIN/MAX aggregate over the catalog.
+
+catalog/signals.py keeps the rows current: a save moves the product's
+price out of the slices it used to belong to and into the new ones, in the
+same transaction as the write. Count, sum and buckets are adjusted in
+place; min/max are only re-aggregated (one index seek) when the price that
+left a slice was its current min or max.
+
+`manage.py rebuild_price_statistics` recomputes everything from scratch,
+e.g. after bulk updates that bypass signals.
+"""
+
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, When, Value, IntegerField, Count, Sum, Min, Max
+
+from .models import Product, LensOption, PriceStatistic
+
+
+# Lower bounds (QAR) of the price-distribution buckets; the last one is open-ended.
+PRICE_BUCKETS = [Decimal('0'), Decimal('100'), Decimal('250'), Decimal('500'),
+                 Decimal('1000'), Decimal('2000')]
+
+# dimension → Product field the slice key is taken from
+PRODUCT_DIMENSIONS = {
+    'product_type': 'product_type',
+    'category':     'category_id',
+    'brand':        'brand_id',
+}
+LENS_OPTION_DIMENSION = 'lens_option'
+
+PRODUCT_PRICE_FIELDS = ['is_active', 'base_price'] + list(PRODUCT_DIMENSIONS.values())
+LENS_OPTION_PRICE_FIELDS = ['is_active', 'base_price']
+
+
+def bucket_index(price):
+    return min(max(bisect_right(PRICE_BUCKETS, price) - 1, 0), len(PRICE_BUCKETS) - 1)
+
+
+def bucket_expression(field='base_price'):
+    """SQL CASE mapping `field` to its PRICE_BUCKETS index."""
+    whens = [
+        When(**{f'{field}__gte': lo, f'{field}__lt': hi}, then=Value(i))
+        for i, (lo, hi) in enumerate(zip(PRICE_BUCKETS, PRICE_BUCKETS[1:]))
+    ]
+    return Case(*whens, default=Value(len(PRICE_BUCKETS) - 1), output_field=IntegerField())
+
+
+def _source(dimension, key):
+    if dimension == LENS_OPTION_DIMENSION:
+        return LensOption.objects.filter(is_active=True)
+    return Product.objects.filter(is_active=True, **{PRODUCT_DIMENSIONS[dimension]: key})
+
+
+# ── Incremental updates ───────────────────────────────────────────────────────
+
+def product_price_row(product_id):
+    """The stored values a product's statistics depend on (None if unsaved)."""
+    if product_id is None:
+        return None
+    return Product.objects.filter(pk=product_id).values(*PRODUCT_PRICE_FIELDS).first()
+
+
+def product_price_values(product):
+    """Same shape as product_price_row(), taken from an instance in memory."""
+    return {field: getattr(product, field) for field in PRODUCT_PRICE_FIELDS}
+
+
+def _product_slices(row):
+    """{(dimension, key): price} for the slices an active product counts towards."""
+    if not row or not row['is_active']:
+        return {}
+    slices = {}
+    for dimension, field in PRODUCT_DIMENSIONS.items():
+        if row[field] is not None:
+            slices[(dimension, str(row[field]))] = row['base_price']
+    return slices
+
+
+def _adjust(dimension, key, price, delta):
+    price = Decimal(price)
+    stat, _ = PriceStatistic.objects.select_for_update().get_or_create(dimension=dimension, key=key)
+
+    buckets = list(stat.buckets or [])
+    buckets += [0] * (len(PRICE_BUCKETS) - len(buckets))
+    i = bucket_index(price)
+    buckets[i] = max(buckets[i] + delta, 0)
+
+    stat.buckets       = buckets
+    stat.product_count = max(stat.product_count + delta, 0)
+    stat.price_sum    += price * delta
+
+    if stat.product_count == 0:
+        stat.price_sum = 0
+        stat.min_price = stat.max_price = None
+    elif delta > 0:
+        stat.min_price = price if stat.min_price is None else min(stat.min_price, price)
+        stat.max_price = price if stat.max_price is None else max(stat.max_price, price)
+    elif price in (stat.min_price, stat.max_price):
+        bounds = _source(dimension, key).aggregate(min_price=Min('base_price'), max_price=Max('base_price'))
+        stat.min_price, stat.max_price = bounds['min_price'], bounds['max_price']
+
+    stat.save()
+
+
+def apply_product_change(old_row, new_row):
+    """Move a product's price from the slices of `old_row` to those of `new_row`."""
+    old = _product_slices(old_row)
+    new = _product_slices(new_row)
+    if old == new:
+        return
+    with transaction.atomic():
+        for (dimension, key), price in old.items():
+            if new.get((dimension, key)) != price:
+                _adjust(dimension, key, price, -1)
+        for (dimension, key), price in new.items():
+            if old.get((dimension, key)) != price:
+                _adjust(dimension, key, price, +1)
+
+
+def lens_option_price_row(lens_option_id):
+    """The stored values a lens option's statistics depend on (None if unsaved)."""
+    if lens_option_id is None:
+        return None
+    return LensOption.objects.filter(pk=lens_option_id).values(*LENS_OPTION_PRICE_FIELDS).first()
+
+
+def lens_option_price_values(lens_option):
+    """Same shape as lens_option_price_row(), taken from an instance in memory."""
+    return {field: getattr(lens_option, field) for field in LENS_OPTION_PRICE_FIELDS}
+
+
+def apply_lens_option_change(old_row, new_row):
+    """Move a lens option's price out of / into the slice; inactive options count as absent."""
+    old_price = old_row['base_price'] if old_row and old_row['is_active'] else None
+    new_price = new_row['base_price'] if new_row and new_row['is_active'] else None
+    if old_price == new_price:
+        return
+    with transaction.atomic():
+        if old_price is not None:
+            _adjust(LENS_OPTION_DIMENSION, '', old_price, -1)
+        if new_price is not None:
+            _adjust(LENS_OPTION_DIMENSION, '', new_price, +1)
+
+
+# ── Full rebuild ──────────────────────────────────────────────────────────────
+
+def _grouped_stats(queryset, dimension, field):
+    group_by = [field, '_bucket'] if field else ['_bucket']
+    rows = (
+        queryset
+        .annotate(_bucket=bucket_expression())
+        .values(*group_by)
+        .annotate(_n=Count('id'), _sum=Sum('base_price'), _min=Min('base_price'), _max=Max('base_price'))
+        .order_by()
+    )
+    stats = {}
+    for row in rows:
+        key = str(row[field]) if field else ''
+        stat = stats.get(key)
+        if stat is None:
+            stat = stats[key] = PriceStatistic(
+                dimension=dimension, key=key, price_sum=0, buckets=[0] * len(PRICE_BUCKETS),
+            )
+        stat.product_count += row['_n']
+        stat.price_sum     += row['_sum']
+        stat.buckets[row['_bucket']] += row['_n']
+        stat.min_price = row['_min'] if stat.min_price is None else min(stat.min_price, row['_min'])
+        stat.max_price = row['_max'] if stat.max_price is None else max(stat.max_price, row['_max'])
+    return list(stats.values())
+
+
+def rebuild_price_statistics():
+    """Recompute every PriceStatistic row; one GROUP BY per dimension."""
+    stats = []
+    active = Product.objects.filter(is_active=True)
+    for dimension, field in PRODUCT_DIMENSIONS.items():
+        stats += _grouped_stats(active.filter(**{f'{field}__isnull': False}), dimension, field)
+    stats += _grouped_stats(LensOption.objects.filter(is_active=True), LENS_OPTION_DIMENSION, None)
+
+    with transaction.atomic():
+        PriceStatistic.objects.all().delete()
+        PriceStatistic.objects.bulk_create(stats)
+    return len(stats)
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+def price_statistic(dimension, key=''):
+    """
+    Slider data for one slice:
+        {'count', 'min_price', 'max_price', 'average', 'buckets': [{'min', 'max', 'count'}]}
+    """
+    stat   = PriceStatistic.objects.filter(dimension=dimension, key=str(key)).first()
+    counts = list(stat.buckets) if stat and stat.buckets else []
+    counts += [0] * (len(PRICE_BUCKETS) - len(counts))
+
+    buckets = []
+    for i, lo in enumerate(PRICE_BUCKETS):
+        hi = PRICE_BUCKETS[i + 1] if i + 1 < len(PRICE_BUCKETS) else None
+        buckets.append({'min': lo, 'max': hi, 'count': counts[i]})
+
+    count = stat.product_count if stat else 0
+    return {
+        'count':     count,
+        'min_price': stat.min_price if stat else None,
+        'max_price': stat.max_price if stat else None,
+        'average':   (stat.price_sum / count).quantize(Decimal('0.01')) if count else None,
+        'buckets':   buckets,
+    }
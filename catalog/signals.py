@@ -0,0 +1,173 @@
+# catalog/signals.py
+"""
+Signal handlers for catalog functionality.
+Keeps the ProductCard projection (catalog/cards.py) in step with its sources,
+bumps the per-product detail cache version (catalog/detail_cache.py),
+rebuilds the home page snapshot (catalog/home_snapshot.py), maintains the
+price slider statistics (catalog/price_stats.py), rebuilds contact lens power
+matrices (catalog/power_matrix.py), invalidates the medical lens attribute
+index (catalog/lens_attributes.py) and bumps the catalog-wide version
+(catalog/catalog_version.py).
+"""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from content.models import Banner
+from lenses.models import LensAddOn
+from reviews.models import Review, ReviewImage
+from .cards import schedule_card_refresh
+from .catalog_version import bump_catalog_version
+from .detail_cache import bump_product_version
+from .home_snapshot import schedule_home_snapshot_rebuild
+from .models import (
+    Product, ProductImage, ProductVariant, ProductSpecification,
+    ContactLensProduct, ContactLensColor, ContactLensPowerOption, Brand, Category, LensOption, LensBrand, LensType,
+)
+from .lens_attributes import bump_index_version
+from .power_matrix import schedule_power_matrix_refresh
+from .price_stats import (
+    product_price_row, product_price_values, apply_product_change,
+    lens_option_price_row, lens_option_price_values, apply_lens_option_change,
+)
+
+
+def _product_changed(product_id, card=True):
+    if card:
+        # Home tabs show cards, so rebuild the snapshot after the card refresh.
+        schedule_card_refresh(product_id)
+        schedule_home_snapshot_rebuild()
+    transaction.on_commit(lambda: bump_product_version(product_id))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_card_for_product(sender, instance, **kwargs):
+    _product_changed(instance.pk)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_card_for_child(sender, instance, **kwargs):
+    """Images, variants and reviews all change what the product's card shows."""
+    _product_changed(instance.product_id)
+
+
+@receiver(post_save, sender=ProductSpecification)
+@receiver(post_delete, sender=ProductSpecification)
+@receiver(post_save, sender=ContactLensProduct)
+@receiver(post_delete, sender=ContactLensProduct)
+def bump_version_for_detail_child(sender, instance, **kwargs):
+    _product_changed(instance.product_id, card=False)
+
+
+@receiver(post_save, sender=ContactLensColor)
+@receiver(post_delete, sender=ContactLensColor)
+def bump_version_for_lens_color(sender, instance, **kwargs):
+    product_id = ContactLensProduct.objects.filter(pk=instance.contact_lens_id).values_list('product_id', flat=True).first()
+    if product_id:
+        _product_changed(product_id, card=False)
+        schedule_power_matrix_refresh(product_id)
+
+
+@receiver(post_save, sender=ReviewImage)
+@receiver(post_delete, sender=ReviewImage)
+def bump_version_for_review_image(sender, instance, **kwargs):
+    product_id = Review.objects.filter(pk=instance.review_id).values_list('product_id', flat=True).first()
+    if product_id:
+        _product_changed(product_id, card=False)
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def rebuild_home_snapshot_on_change(sender, instance, **kwargs):
+    schedule_home_snapshot_rebuild()
+
+
+# ── Catalog version ───────────────────────────────────────────────────────────
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalog_version_on_change(sender, instance, **kwargs):
+    transaction.on_commit(bump_catalog_version)
+
+
+# ── Price statistics ──────────────────────────────────────────────────────────
+
+@receiver(pre_save, sender=Product)
+def remember_product_price(sender, instance, **kwargs):
+    instance._price_stats_before = product_price_row(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def update_price_stats_on_save(sender, instance, **kwargs):
+    apply_product_change(getattr(instance, '_price_stats_before', None), product_price_values(instance))
+
+
+@receiver(post_delete, sender=Product)
+def update_price_stats_on_delete(sender, instance, **kwargs):
+    apply_product_change(product_price_values(instance), None)
+
+
+@receiver(pre_save, sender=LensOption)
+def remember_lens_option_price(sender, instance, **kwargs):
+    instance._price_stats_before = lens_option_price_row(instance.pk)
+
+
+@receiver(post_save, sender=LensOption)
+def update_lens_price_stats_on_save(sender, instance, **kwargs):
+    apply_lens_option_change(getattr(instance, '_price_stats_before', None), lens_option_price_values(instance))
+
+
+@receiver(post_delete, sender=LensOption)
+def update_lens_price_stats_on_delete(sender, instance, **kwargs):
+    apply_lens_option_change(lens_option_price_values(instance), None)
+
+
+# ── Lens attribute index ──────────────────────────────────────────────────────
+
+@receiver(post_save, sender=LensOption)
+@receiver(post_delete, sender=LensOption)
+@receiver(post_save, sender=LensBrand)
+@receiver(post_delete, sender=LensBrand)
+@receiver(post_save, sender=LensType)
+@receiver(post_delete, sender=LensType)
+@receiver(post_save, sender=LensAddOn)
+@receiver(post_delete, sender=LensAddOn)
+def invalidate_lens_index(sender, instance, **kwargs):
+    transaction.on_commit(bump_index_version)
+
+
+@receiver(m2m_changed, sender=LensOption.coatings.through)
+def invalidate_lens_index_on_coatings(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_index_version)
+
+
+# ── Contact lens power matrices ───────────────────────────────────────────────
+
+@receiver(post_save, sender=ContactLensPowerOption)
+@receiver(post_delete, sender=ContactLensPowerOption)
+def refresh_power_matrix_for_option(sender, instance, **kwargs):
+    product_id = (
+        ContactLensColor.objects.filter(pk=instance.color_id)
+        .values_list('contact_lens__product_id', flat=True).first()
+    )
+    if product_id:
+        schedule_power_matrix_refresh(product_id)
+
+
+@receiver(post_save, sender=ContactLensProduct)
+@receiver(post_delete, sender=ContactLensProduct)
+def refresh_power_matrix_for_contact_lens(sender, instance, **kwargs):
+    schedule_power_matrix_refresh(instance.product_id)
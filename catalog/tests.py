@@ -1,3 +1,211 @@
+import json
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from .bulk_io import export_catalog, import_catalog
+from .models import (
+    Brand, Category, LensBrand, LensOption, LensType, PriceStatistic, Product, ProductVariant,
+)
+from .price_stats import price_statistic, rebuild_price_statistics
+
+
+def jsonl(*records):
+    return [json.dumps(record) + '\n' for record in records]
+
+
+class CatalogImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.create(name='Sunglasses', slug='sunglasses')
+        Brand.objects.create(name='Ray-Ban', slug='ray-ban', logo='brands/ray-ban.png')
+
+    def record(self, sku, **fields):
+        return {
+            'sku': sku, 'name': f'Frame {sku}', 'product_type': 'sunglasses', 'category': 'sunglasses',
+            'brand': 'ray-ban', 'base_price': '650.00', 'stock_quantity': 4,
+            'tags': ['Bestseller'], 'images': [f'products/{sku.lower()}.jpg'],
+            'specifications': [{'key': 'Frame Material', 'value': 'Metal'}],
+            'variants': [{'variant_sku': f'{sku}-GLD', 'color_name': 'Gold', 'price_adjustment': '20.00'}],
+            **fields,
+        }
+
+    def export(self, fmt):
+        return ''.join(export_catalog(fmt)).splitlines(keepends=True)
+
+    def test_jsonl_round_trip(self):
+        report = import_catalog(jsonl(self.record('RB-1'), self.record('RB-2', base_price='700')), 'jsonl')
+        self.assertEqual((report['products_created'], report['variants_created'], report['error_count']), (2, 2, 0))
+
+        exported = {record['sku']: record for record in map(json.loads, self.export('jsonl'))}
+        self.assertEqual(set(exported), {'RB-1', 'RB-2'})
+        record = exported['RB-2']
+        self.assertEqual((record['category'], record['brand'], record['base_price']), ('sunglasses', 'ray-ban', '700.00'))
+        self.assertEqual(record['tags'], ['Bestseller'])
+        self.assertEqual(record['images'], ['products/rb-2.jpg'])
+        self.assertEqual(record['specifications'], [{'key': 'Frame Material', 'value': 'Metal'}])
+        self.assertEqual([(v['variant_sku'], v['color_name'], v['price_adjustment']) for v in record['variants']],
+                         [('RB-2-GLD', 'Gold', '20.00')])
+
+    def test_reimporting_an_export_changes_nothing(self):
+        import_catalog(jsonl(self.record('RB-1'), self.record('RB-2')), 'jsonl')
+        for fmt in ('jsonl', 'csv'):
+            with self.subTest(fmt=fmt):
+                report = import_catalog(self.export(fmt), fmt)
+                self.assertEqual(report['records'], 2)
+                self.assertEqual(
+                    [report[key] for key in ('products_created', 'products_updated',
+                                             'variants_created', 'variants_updated', 'error_count')],
+                    [0, 0, 0, 0, 0],
+                )
+
+    def test_update_writes_only_changed_products(self):
+        import_catalog(jsonl(self.record('RB-1'), self.record('RB-2')), 'jsonl')
+        report = import_catalog(jsonl({'sku': 'RB-1', 'base_price': '600'}, {'sku': 'RB-2', 'base_price': '650'}), 'jsonl')
+        self.assertEqual((report['products_created'], report['products_updated']), (0, 1))
+        self.assertEqual(Product.objects.get(sku='RB-1').base_price, Decimal('600.00'))
+        self.assertEqual(Product.objects.get(sku='RB-1').name, 'Frame RB-1')  # fields not in the input are kept
+
+    def test_variant_sku_of_another_product_is_rejected(self):
+        import_catalog(jsonl(self.record('RB-1')), 'jsonl')
+        report = import_catalog(jsonl(
+            self.record('RB-2', variants=[{'variant_sku': 'RB-1-GLD', 'color_name': 'Silver'}]),
+            self.record('RB-3'),
+        ), 'jsonl')
+        self.assertEqual(report['error_count'], 1)
+        line, sku, message = report['errors'][0]
+        self.assertEqual((line, sku), (1, 'RB-2'))
+        self.assertIn('RB-1-GLD', message)
+        self.assertFalse(Product.objects.filter(sku='RB-2').exists())
+        self.assertTrue(Product.objects.filter(sku='RB-3').exists())
+        self.assertEqual(ProductVariant.objects.get(variant_sku='RB-1-GLD').color_name, 'Gold')
+
+    def test_bad_rows_inside_a_good_batch(self):
+        report = import_catalog(jsonl(
+            self.record('RB-1', slug='aviator'),
+            self.record('RB-2', base_price='cheap'),  # fails validation
+            self.record('RB-3', slug='aviator'),      # fails in the database: the slug is taken
+            self.record('RB-4'),
+        ), 'jsonl')
+        self.assertEqual(report['products_created'], 2)
+        self.assertEqual([(line, sku) for line, sku, _message in report['errors']], [(2, 'RB-2'), (3, 'RB-3')])
+        self.assertIn('database error', report['errors'][1][2])
+        self.assertEqual(set(Product.objects.values_list('sku', flat=True)), {'RB-1', 'RB-4'})
+        self.assertEqual(set(ProductVariant.objects.values_list('variant_sku', flat=True)), {'RB-1-GLD', 'RB-4-GLD'})
+
+    def test_import_rebuilds_price_statistics(self):
+        import_catalog(jsonl(self.record('RB-1'), self.record('RB-2', base_price='700')), 'jsonl')
+        stat = PriceStatistic.objects.get(dimension='product_type', key='sunglasses')
+        self.assertEqual((stat.product_count, stat.min_price, stat.max_price),
+                         (2, Decimal('650.00'), Decimal('700.00')))
+
+
+class PriceStatisticsTests(TestCase):
+    """The rows the signals maintain must always equal a fresh rebuild_price_statistics()."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.frames     = Category.objects.create(name='Frames', slug='frames')
+        cls.sunglasses = Category.objects.create(name='Sunglasses', slug='sunglasses')
+        cls.rayban     = Brand.objects.create(name='Ray-Ban', slug='ray-ban', logo='brands/ray-ban.png')
+        cls.oakley     = Brand.objects.create(name='Oakley', slug='oakley', logo='brands/oakley.png')
+        cls.lens_brand = LensBrand.objects.create(name='Essilor', slug='essilor')
+        cls.lens_type  = LensType.objects.create(name='Single vision', slug='single-vision')
+
+    def product(self, sku, price, category=None, brand=None, **fields):
+        return Product.objects.create(
+            sku=sku, name=sku, slug=sku.lower(), product_type=fields.pop('product_type', 'eyeglasses'),
+            category=category or self.frames, brand=brand, base_price=Decimal(price), **fields,
+        )
+
+    def lens_option(self, price, **fields):
+        return LensOption.objects.create(lens_brand=self.lens_brand, lens_type=self.lens_type, index='1.56',
+                                         base_price=Decimal(price), min_power=-6, max_power=6, **fields)
+
+    def stored(self):
+        return {
+            (stat.dimension, stat.key): (stat.product_count, stat.price_sum, stat.min_price, stat.max_price,
+                                         list(stat.buckets))
+            for stat in PriceStatistic.objects.filter(product_count__gt=0)
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self.stored()
+        rebuild_price_statistics()
+        self.assertEqual(incremental, self.stored())
+
+    def test_creates(self):
+        self.product('A', '80', brand=self.rayban)
+        self.product('B', '300', brand=self.rayban)
+        self.product('C', '2500', category=self.sunglasses, product_type='sunglasses')
+        self.assertMatchesRebuild()
+
+    def test_removing_the_bounds_reaggregates(self):
+        low  = self.product('A', '80')
+        self.product('B', '300')
+        high = self.product('C', '900')
+        low.base_price = Decimal('400')
+        low.save()
+        high.delete()
+        self.assertEqual(price_statistic('category', self.frames.pk)['min_price'], Decimal('300.00'))
+        self.assertEqual(price_statistic('category', self.frames.pk)['max_price'], Decimal('400.00'))
+        self.assertMatchesRebuild()
+
+    def test_move_at_the_same_price(self):
+        product = self.product('A', '300', brand=self.rayban)
+        self.product('B', '500', brand=self.rayban)
+        product.category, product.brand = self.sunglasses, self.oakley
+        product.save()
+        self.assertEqual(price_statistic('brand', self.oakley.pk)['count'], 1)
+        self.assertEqual(price_statistic('brand', self.rayban.pk)['min_price'], Decimal('500.00'))
+        self.assertMatchesRebuild()
+
+    def test_deactivate_and_reactivate(self):
+        product = self.product('A', '300', brand=self.rayban)
+        self.product('B', '150', brand=self.rayban)
+        product.is_active = False
+        product.save()
+        self.assertEqual(price_statistic('brand', self.rayban.pk)['count'], 1)
+        self.assertMatchesRebuild()
+        product.is_active, product.base_price = True, Decimal('60')
+        product.save()
+        self.assertMatchesRebuild()
+
+    def test_delete_last_product_of_a_slice(self):
+        self.product('A', '300', brand=self.rayban).delete()
+        self.assertEqual(price_statistic('brand', self.rayban.pk)['count'], 0)
+        self.assertIsNone(price_statistic('brand', self.rayban.pk)['min_price'])
+        self.assertMatchesRebuild()
+
+    def test_sequence(self):
+        products = [self.product(f'P{i}', str(50 + 175 * i), brand=[self.rayban, self.oakley][i % 2]) for i in range(8)]
+        for i, product in enumerate(products):
+            if i % 3 == 0:
+                product.base_price += 120
+            if i % 4 == 1:
+                product.category = self.sunglasses
+            if i == 5:
+                product.is_active = False
+            product.save()
+        products[2].delete()
+        products[7].delete()
+        products[4].brand = None
+        products[4].save()
+        self.assertMatchesRebuild()
+
+    def test_lens_options(self):
+        cheap  = self.lens_option('90')
+        self.lens_option('250')
+        costly = self.lens_option('1200')
+        cheap.is_active = False
+        cheap.save()
+        costly.base_price = Decimal('700')
+        costly.save()
+        self.assertEqual(price_statistic('lens_option')['count'], 2)
+        self.assertEqual(price_statistic('lens_option')['max_price'], Decimal('700.00'))
+        self.assertMatchesRebuild()
+        cheap.is_active = True
+        cheap.save()
+        costly.delete()
+        self.assertMatchesRebuild()
@@ -40,4 +40,5 @@ urlpatterns = [
     # AJAX endpoints
     path('api/lens-options/',         views.get_lens_options,       name='get_lens_options'),
     path('api/contact-lens-powers/',  views.get_contact_lens_powers, name='get_contact_lens_powers'),
+    path('api/contact-lens/<int:product_id>/power-matrix/', views.contact_lens_power_matrix, name='contact_lens_power_matrix'),
 ]
\ No newline at end of file
@@ -1,561 +1,385 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.generic import ListView, DetailView
-from django.db.models import Q, Min, Max
+from django.views import View
+from django.db.models import Prefetch
 from django.contrib.auth.decorators import login_required
-from reviews.reviews_context import get_review_context
+from reviews.models import Review
+from reviews.reviews_context import get_rating_summary, get_user_review_context
 from cart import models
 from .models import (
     Product, Category, Brand, ProductVariant,
     ContactLensProduct, ContactLensColor, LensBrand,
     LensType, LensOption
 )
-from django.utils import timezone
-from content.models import Banner
-from django.core.paginator import Paginator
+from django.core.paginator import Page, Paginator
 from django.db import models as db_models
+from .lens_attributes import LENS_SORTS, get_lens_index
+from .listing import LISTINGS, _CountedPaginator, _parse_price, build_listing, generic_listing, listing_context
+from .detail_cache import cached_detail_context
+from .home_snapshot import get_home_snapshot
+from .price_stats import LENS_OPTION_DIMENSION, price_statistic
+from .power_matrix import available_powers, get_power_matrix
+from core.image_derivatives import prefetch_manifests
+from search.engine import products_in_order
+from search.result_cache import search_page
 
 
 # ── Home Page ─────────────────────────────────────────────────────────────────
 def home_view(request):
-    now = timezone.now()
-
-    hero_slides = Banner.objects.filter(
-        placement='main_slider',
-        is_active=True,
-    ).filter(
-        Q(start_date__isnull=True) | Q(start_date__lte=now)
-    ).filter(
-        Q(end_date__isnull=True) | Q(end_date__gte=now)
-    ).order_by('display_order')
-
-    sale_banner = Banner.objects.filter(
-        placement='sale_banner',
-        is_active=True,
-    ).filter(
-        Q(start_date__isnull=True) | Q(start_date__lte=now)
-    ).filter(
-        Q(end_date__isnull=True) | Q(end_date__gte=now)
-    ).order_by('display_order').first()
-
-    featured_products   = Product.objects.filter(is_featured=True, is_active=True).select_related('brand').prefetch_related('images')[:8]
-    new_arrivals        = Product.objects.filter(is_active=True).select_related('brand').prefetch_related('images').order_by('-created_at')[:8]
-    eyeglasses_preview  = Product.objects.filter(product_type='eyeglasses', is_active=True).select_related('brand').prefetch_related('images', 'variants')[:3]
-    top_brands          = Brand.objects.filter(is_active=True).order_by('display_order')[:3]
-    brands              = Brand.objects.filter(is_active=True).order_by('display_order')[:12]
+    snapshot = get_home_snapshot()
 
     return render(request, 'home.html', {
-        'hero_slides':        hero_slides,
-        'featured_products':  featured_products,
-        'new_arrivals':       new_arrivals,
-        'eyeglasses_preview': eyeglasses_preview,
-        'top_brands':         top_brands,
-        'brands':             brands,
-        'sale_banner':        sale_banner,
+        'hero_slides':        snapshot['hero_slides'],
+        'featured_products':  snapshot['featured_products'],
+        'new_arrivals':       snapshot['new_arrivals'],
+        'eyeglasses_preview': snapshot['eyeglasses_preview'],
+        'top_brands':         snapshot['top_brands'],
+        'brands':             snapshot['brands'],
+        'sale_banner':        snapshot['sale_banner'],
+        'image_manifests':    prefetch_manifests(
+            [slide.image_desktop for slide in snapshot['hero_slides']]
+            + [brand.logo for brand in snapshot['brands']]
+            + ([snapshot['sale_banner'].image_desktop] if snapshot['sale_banner'] else [])
+        ),
     })
 
 
 # ── Generic Product List View ──────────────────────────────────────────────────
-class ProductListView(ListView):
+class ProductListView(View):
     """Generic product listing view"""
-    model = Product
-    template_name = 'product_list.html'
-    context_object_name = 'products'
-    paginate_by = 24
-
-    def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True).select_related('brand', 'category')
-
-        product_type = self.kwargs.get('product_type')
-        if product_type:
-            queryset = queryset.filter(product_type=product_type)
-
-        category_slug = self.request.GET.get('category')
-        if category_slug:
-            queryset = queryset.filter(category__slug=category_slug)
-
-        brand_slug = self.request.GET.get('brand')
-        if brand_slug:
-            queryset = queryset.filter(brand__slug=brand_slug)
-
-        gender = self.request.GET.get('gender')
-        if gender and gender != 'all':
-            queryset = queryset.filter(gender=gender)
-
-        min_price = self.request.GET.get('min_price')
-        max_price = self.request.GET.get('max_price')
-        if min_price:
-            queryset = queryset.filter(base_price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(base_price__lte=max_price)
-
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(brand__name__icontains=search) |
-                Q(description__icontains=search)
-            )
-
-        sort = self.request.GET.get('sort', '-created_at')
-        queryset = queryset.order_by(sort)
-
-        return queryset
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        product_type = self.kwargs.get('product_type')
-
-        context['brands'] = Brand.objects.filter(is_active=True)
-        context['categories'] = Category.objects.filter(is_active=True)
-        context['product_type'] = product_type
-        context['selected_gender'] = self.request.GET.get('gender', 'all')
-
-        price_range = Product.objects.filter(is_active=True).aggregate(
-            min_price=Min('base_price'),
-            max_price=Max('base_price')
-        )
-        context['price_range'] = price_range
 
-        return context
+    def get(self, request, product_type=None):
+        listing = build_listing(request, generic_listing(product_type))
+        context = listing_context(
+            listing,
+            product_type=product_type,
+            selected_gender=request.GET.get('gender', 'all'),
+        )
+        return render(request, 'product_list.html', context)
 
 
 # ── Sunglasses List ────────────────────────────────────────────────────────────
 def sunglasses_list(request):
     """Sunglasses listing page with advanced filtering"""
-    queryset = Product.objects.filter(
-        product_type='sunglasses',
-        is_active=True
-    ).select_related('brand', 'category')
-
-    gender = request.GET.get('gender', 'all')
-    if gender != 'all':
-        queryset = queryset.filter(gender=gender)
-
-    selected_brands = request.GET.getlist('brand')
-    if selected_brands:
-        queryset = queryset.filter(brand__slug__in=selected_brands)
-
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
-    if min_price:
-        queryset = queryset.filter(base_price__gte=min_price)
-    if max_price:
-        queryset = queryset.filter(base_price__lte=max_price)
-
-    sort_option = request.GET.get('sort', '-created_at')
-    valid_sorts = ['-created_at', 'base_price', '-base_price', 'name']
-    queryset = queryset.order_by(sort_option if sort_option in valid_sorts else '-created_at')
-
-    paginator = Paginator(queryset, 24)
-    page_obj = paginator.get_page(request.GET.get('page'))
-
-    context = {
-        'products':        page_obj,
-        'is_paginated':    page_obj.has_other_pages(),
-        'page_obj':        page_obj,
-        'brands':          Brand.objects.filter(available_for_sunglasses=True, is_active=True),
-        'selected_gender': gender,
-        'selected_brands': selected_brands,
-        'current_sort':    sort_option,
-    }
+    listing = build_listing(request, LISTINGS['sunglasses'])
+    context = listing_context(
+        listing,
+        selected_gender=request.GET.get('gender', 'all'),
+        selected_brands=listing['selected']['brand'],
+    )
     return render(request, 'sunglasses_list.html', context)
 
 
 # ── Eyeglasses List ────────────────────────────────────────────────────────────
 def eyeglasses_list(request):
     """Eyeglasses listing page"""
-    queryset = Product.objects.filter(
-        product_type='eyeglasses',
-        is_active=True
-    ).select_related('brand', 'category')
-
-    gender = request.GET.get('gender', 'all')
-    if gender != 'all':
-        queryset = queryset.filter(gender=gender)
-
-    selected_brands = request.GET.getlist('brand')
-    if selected_brands:
-        queryset = queryset.filter(brand__slug__in=selected_brands)
-
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
-    if min_price:
-        queryset = queryset.filter(base_price__gte=min_price)
-    if max_price:
-        queryset = queryset.filter(base_price__lte=max_price)
-
-    sort_option = request.GET.get('sort', '-created_at')
-    valid_sorts = ['-created_at', 'base_price', '-base_price', 'name', '-name']
-    queryset = queryset.order_by(sort_option if sort_option in valid_sorts else '-created_at')
-
-    paginator = Paginator(queryset, 24)
-    page_obj = paginator.get_page(request.GET.get('page'))
-
-    price_range = Product.objects.filter(
-        product_type='eyeglasses', is_active=True
-    ).aggregate(min_price=Min('base_price'), max_price=Max('base_price'))
-
-    context = {
-        'products':        page_obj,
-        'is_paginated':    page_obj.has_other_pages(),
-        'page_obj':        page_obj,
-        'brands':          Brand.objects.filter(available_for_eyeglasses=True, is_active=True),
-        'price_range':     price_range,
-        'selected_gender': gender,
-        'selected_brands': selected_brands,
-        'current_sort':    sort_option,
-    }
+    listing = build_listing(request, LISTINGS['eyeglasses'])
+    context = listing_context(
+        listing,
+        selected_gender=request.GET.get('gender', 'all'),
+        selected_brands=listing['selected']['brand'],
+    )
     return render(request, 'eyeglasses_list.html', context)
 
 
 # ── Contact Lenses List ────────────────────────────────────────────────────────
 def contact_lenses_list(request):
     """Contact lenses listing page"""
-    queryset = Product.objects.filter(
-        product_type='contact_lenses',
-        is_active=True
-    ).select_related('brand', 'contact_lens')
+    listing = build_listing(request, LISTINGS['contact_lenses'])
+    context = listing_context(
+        listing,
+        selected_lens_type=request.GET.get('lens_type'),
+        selected_schedule=request.GET.get('schedule'),
+        selected_brands=listing['selected']['brand'],
+    )
+    return render(request, 'contact_lenses_list.html', context)
+
 
-    lens_type = request.GET.get('lens_type')
-    if lens_type:
-        queryset = queryset.filter(contact_lens__lens_type=lens_type)
+# ── Detail page helpers ───────────────────────────────────────────────────────
+# Builders return only product-dependent context; cached_detail_context()
+# reuses it until the product's version is bumped (see catalog/signals.py).
 
-    schedule = request.GET.get('schedule')
-    if schedule:
-        queryset = queryset.filter(contact_lens__replacement_schedule=schedule)
+REVIEW_LIST_FIELDS = (
+    'product', 'customer', 'rating', 'title', 'comment', 'is_verified_purchase',
+    'is_approved', 'is_featured', 'helpful_count', 'not_helpful_count', 'created_at',
+    'customer__username', 'customer__first_name', 'customer__last_name',
+)
 
-    selected_brands = request.GET.getlist('brand')
-    if selected_brands:
-        queryset = queryset.filter(brand__slug__in=selected_brands)
 
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
-    if min_price:
-        queryset = queryset.filter(base_price__gte=min_price)
-    if max_price:
-        queryset = queryset.filter(base_price__lte=max_price)
+def _detail_queryset():
+    return Product.objects.select_related('brand', 'category').prefetch_related(
+        'images',
+        'specifications',
+        Prefetch('variants', queryset=ProductVariant.objects.filter(is_active=True).prefetch_related('images'),
+                 to_attr='active_variants'),
+        Prefetch('reviews', queryset=Review.objects.select_related('customer').only(*REVIEW_LIST_FIELDS)
+                                                   .prefetch_related('images')),
+    )
 
-    sort_option = request.GET.get('sort', '-created_at')
-    valid_sorts = ['-created_at', 'base_price', '-base_price', 'name', '-name']
-    queryset = queryset.order_by(sort_option if sort_option in valid_sorts else '-created_at')
 
-    paginator = Paginator(queryset, 24)
-    page_obj = paginator.get_page(request.GET.get('page'))
+def _related(queryset, product, limit=4):
+    """
+    Precomputed neighbours (manage.py compute_related_products) within `queryset`,
+    best first; products the last batch run has not seen fall back to `queryset`.
+    """
+    queryset = queryset.exclude(id=product.id).select_related('brand').prefetch_related('images')
+    related  = list(queryset.filter(related_to__product=product).order_by('related_to__rank')[:limit])
+    if not related:
+        related = list(queryset[:limit])
+    return related
+
 
-    price_range = Product.objects.filter(
-        product_type='contact_lenses', is_active=True
-    ).aggregate(min_price=Min('base_price'), max_price=Max('base_price'))
+def _product_context(product):
+    all_images    = list(product.images.all())
+    primary_image = next((img for img in all_images if img.is_primary), all_images[0] if all_images else None)
 
     context = {
-        'products':          page_obj,
-        'is_paginated':      page_obj.has_other_pages(),
-        'page_obj':          page_obj,
-        'brands':            Brand.objects.filter(available_for_contact_lenses=True, is_active=True),
-        'price_range':       price_range,
-        'selected_lens_type': lens_type,
-        'selected_schedule': schedule,
-        'selected_brands':   selected_brands,
-        'current_sort':      sort_option,
+        'product':        product,
+        'primary_image':  primary_image,
+        'images':         [img for img in all_images if img != primary_image],
+        'variants':       product.active_variants,
+        'specifications': list(product.specifications.all()),
+    }
+    context.update(get_rating_summary(product))
+    return context
+
+
+def _lens_context():
+    return {
+        'lens_brands': list(LensBrand.objects.filter(is_active=True)),
+        'lens_types':  list(LensType.objects.filter(is_active=True)),
     }
-    return render(request, 'contact_lenses_list.html', context)
+
+
+def _render_detail(request, template, kind, slug, build):
+    context = cached_detail_context(kind, slug, build)
+    context.update(get_user_review_context(request, context['product']))
+    return render(request, template, context)
 
 
 # ── Sunglass Detail ────────────────────────────────────────────────────────────
-def sunglass_detail(request, slug):
+def _sunglass_context(slug):
     product = get_object_or_404(
-        Product.objects.select_related('brand', 'category'),
+        _detail_queryset(),
         slug=slug,
         product_type='sunglasses',
         is_active=True
     )
+    context = _product_context(product)
+    context['related_products'] = _related(Product.objects.filter(
+        category=product.category,
+        product_type='sunglasses',
+        is_active=True
+    ), product)
+    return context
 
-    all_images    = product.images.all().order_by('display_order')
-    primary_image = all_images.filter(is_primary=True).first() or all_images.first()
-    extra_images  = all_images.exclude(id=primary_image.id) if primary_image else all_images
 
-    context = {
-        'product':          product,
-        'primary_image':    primary_image,
-        'images':           extra_images,
-        'variants':         product.variants.filter(is_active=True),
-        'specifications':   product.specifications.all(),
-        'related_products': Product.objects.filter(
-            category=product.category,
-            product_type='sunglasses',
-            is_active=True
-        ).exclude(id=product.id).prefetch_related('images')[:4]
-    }
-    context.update(get_review_context(request, product))
-    return render(request, 'sunglass_detail.html', context)
+def sunglass_detail(request, slug):
+    return _render_detail(request, 'sunglass_detail.html', 'sunglasses', slug, _sunglass_context)
 
 
 # ── Eyeglass Detail ────────────────────────────────────────────────────────────
-def eyeglass_detail(request, slug):
+def _eyeglass_context(slug):
     product = get_object_or_404(
-        Product.objects.select_related('brand', 'category'),
+        _detail_queryset(),
         slug=slug, product_type='eyeglasses', is_active=True
     )
-    all_images    = product.images.all().order_by('display_order')
-    primary_image = all_images.filter(is_primary=True).first() or all_images.first()
-    extra_images  = all_images.exclude(id=primary_image.id) if primary_image else all_images
+    context = _product_context(product)
+    context.update(_lens_context())
+    context['related_products'] = _related(Product.objects.filter(
+        category=product.category, product_type='eyeglasses', is_active=True
+    ), product)
+    return context
 
-    lens_brands = LensBrand.objects.filter(is_active=True)
-    lens_types  = LensType.objects.filter(is_active=True)
 
-    context = {
-        'product':          product,
-        'primary_image':    primary_image,
-        'images':           extra_images,
-        'variants':         product.variants.filter(is_active=True),
-        'specifications':   product.specifications.all(),
-        'lens_brands':      lens_brands,
-        'lens_types':       lens_types,
-        'related_products': Product.objects.filter(
-            category=product.category, product_type='eyeglasses', is_active=True
-        ).exclude(id=product.id).prefetch_related('images')[:4]
-    }
-    context.update(get_review_context(request, product))
-    return render(request, 'eyeglass_detail.html', context)
+def eyeglass_detail(request, slug):
+    return _render_detail(request, 'eyeglass_detail.html', 'eyeglasses', slug, _eyeglass_context)
 
 
 # ── Contact Lens Detail ────────────────────────────────────────────────────────
-def contact_lens_detail(request, slug):
+def _contact_lens_context(slug):
     product = get_object_or_404(
-        Product.objects.select_related('brand', 'category', 'contact_lens'),
+        _detail_queryset().select_related('contact_lens'),
         slug=slug, product_type='contact_lenses', is_active=True
     )
     contact_lens = product.contact_lens
-    colors       = contact_lens.colors.filter(is_active=True)
-
-    all_images    = product.images.all().order_by('display_order')
-    primary_image = all_images.filter(is_primary=True).first() or all_images.first()
-    extra_images  = all_images.exclude(id=primary_image.id) if primary_image else all_images
 
     power_ranges = [
         -1.00, -1.25, -1.50, -1.75, -2.00, -2.25, -2.50,
         -2.75, -3.00, -3.25, -3.50, -3.75, -4.00
     ]
 
-    context = {
-        'product':          product,
-        'primary_image':    primary_image,
-        'images':           extra_images,
+    context = _product_context(product)
+    context.update({
         'contact_lens':     contact_lens,
-        'colors':           colors,
+        'colors':           list(contact_lens.colors.filter(is_active=True)),
         'power_ranges':     power_ranges,
-        'related_products': Product.objects.filter(
+        'related_products': _related(Product.objects.filter(
             product_type='contact_lenses', is_active=True
-        ).exclude(id=product.id).prefetch_related('images')[:4]
-    }
-    context.update(get_review_context(request, product))
+        ), product),
+    })
+    return context
+
+
+def contact_lens_detail(request, slug):
+    context = cached_detail_context('contact_lenses', slug, _contact_lens_context)
+    context.update(get_user_review_context(request, context['product']))
+    # Stock moves more often than the rest of the page, so the matrix has its own cache entry.
+    context['power_matrix'] = get_power_matrix(context['product'].pk)
     return render(request, 'contact_lens_detail.html', context)
 
 
 # ── Accessory Detail ───────────────────────────────────────────────────────────
-def accessory_detail(request, slug):
+def _accessory_context(slug):
     product = get_object_or_404(
-        Product.objects.select_related('brand', 'category'),
+        _detail_queryset(),
         slug=slug, product_type='accessories', is_active=True
     )
-    all_images    = product.images.all().order_by('display_order')
-    primary_image = all_images.filter(is_primary=True).first() or all_images.first()
-    extra_images  = all_images.exclude(id=primary_image.id) if primary_image else all_images
+    context = _product_context(product)
+    context['related_products'] = _related(Product.objects.filter(
+        category=product.category, product_type='accessories', is_active=True
+    ), product)
+    return context
 
-    context = {
-        'product':          product,
-        'primary_image':    primary_image,
-        'images':           extra_images,
-        'variants':         product.variants.filter(is_active=True),
-        'specifications':   product.specifications.all(),
-        'related_products': Product.objects.filter(
-            category=product.category, product_type='accessories', is_active=True
-        ).exclude(id=product.id).prefetch_related('images')[:4]
-    }
-    context.update(get_review_context(request, product))
-    return render(request, 'accessory_detail.html', context)
+
+def accessory_detail(request, slug):
+    return _render_detail(request, 'accessory_detail.html', 'accessories', slug, _accessory_context)
 
 
 # ── Kids Detail ───────────────────────────────────────────────────────────────
-def kids_detail(request, slug):
-    """
-    Kids product detail page.
-    Supports both eyeglasses and sunglasses with gender='kids'.
-    - Eyeglasses: mandatory lens selection modal (same as eyeglass_detail)
-    - Sunglasses: optional prescription power modal (same as sunglass_detail)
-    """
+def _kids_context(slug):
     product = get_object_or_404(
-        Product.objects.select_related('brand', 'category'),
+        _detail_queryset(),
         slug=slug,
         gender='kids',
         product_type__in=['eyeglasses', 'sunglasses'],
         is_active=True
     )
-
-    all_images    = product.images.all().order_by('display_order')
-    primary_image = all_images.filter(is_primary=True).first() or all_images.first()
-    extra_images  = all_images.exclude(id=primary_image.id) if primary_image else all_images
+    context = _product_context(product)
 
     # Lens data for eyeglasses type
-    lens_brands = LensBrand.objects.filter(is_active=True)
-    lens_types  = LensType.objects.filter(is_active=True)
+    context.update(_lens_context())
 
     # Related kids products
-    related_products = Product.objects.filter(
+    context['related_products'] = _related(Product.objects.filter(
         gender='kids',
         product_type=product.product_type,
         is_active=True
-    ).exclude(id=product.id).prefetch_related('images')[:4]
+    ), product)
+    return context
 
-    context = {
-        'product':          product,
-        'primary_image':    primary_image,
-        'images':           extra_images,
-        'variants':         product.variants.filter(is_active=True),
-        'specifications':   product.specifications.all(),
-        'lens_brands':      lens_brands,
-        'lens_types':       lens_types,
-        'related_products': related_products,
-    }
-    context.update(get_review_context(request, product))
-    return render(request, 'kids_detail.html', context)
+
+def kids_detail(request, slug):
+    """
+    Kids product detail page.
+    Supports both eyeglasses and sunglasses with gender='kids'.
+    - Eyeglasses: mandatory lens selection modal (same as eyeglass_detail)
+    - Sunglasses: optional prescription power modal (same as sunglass_detail)
+    """
+    return _render_detail(request, 'kids_detail.html', 'kids', slug, _kids_context)
 
 
 # ── Brand Pages ────────────────────────────────────────────────────────────────
 def brand_list(request):
     """All brands listing page"""
-    brands = Brand.objects.filter(is_active=True).order_by('display_order', 'name')
-    return render(request, 'brand_list.html', {'brands': brands})
+    brands = list(Brand.objects.filter(is_active=True).order_by('display_order', 'name'))
+    return render(request, 'brand_list.html', {
+        'brands':          brands,
+        'image_manifests': prefetch_manifests(brand.logo for brand in brands),
+    })
 
 
 def brand_detail(request, slug):
-    brand    = get_object_or_404(Brand, slug=slug, is_active=True)
-    products = Product.objects.filter(brand=brand, is_active=True)
+    brand   = get_object_or_404(Brand, slug=slug, is_active=True)
+    listing = build_listing(request, LISTINGS['brand'].scoped(brand=brand))
 
-    product_type = request.GET.get('type')
-    if product_type:
-        products = products.filter(product_type=product_type)
-
-    sort = request.GET.get('sort', '-created_at')
-    valid_sorts = ['-created_at', 'base_price', '-base_price', 'name', '-name']
-    products = products.order_by(sort if sort in valid_sorts else '-created_at')
-
-    paginator = Paginator(products.select_related('brand', 'category').prefetch_related('images', 'variants'), 24)
-    page_obj  = paginator.get_page(request.GET.get('page'))
-
-    context = {
-        'brand':        brand,
-        'products':     page_obj,
-        'page_obj':     page_obj,
-        'is_paginated': page_obj.has_other_pages(),
-        'other_brands': Brand.objects.filter(is_active=True).exclude(id=brand.id).order_by('display_order')[:10],
-        'current_sort': sort,
-    }
+    context = listing_context(
+        listing,
+        brand=brand,
+        other_brands=Brand.objects.filter(is_active=True).exclude(id=brand.id).order_by('display_order')[:10],
+    )
     return render(request, 'brand_detail.html', context)
 
 
 # ── Category Pages ─────────────────────────────────────────────────────────────
 def category_detail(request, slug):
     category = get_object_or_404(Category, slug=slug, is_active=True)
-    products = Product.objects.filter(category=category, is_active=True).select_related('brand').prefetch_related('images', 'variants')
+    listing  = build_listing(request, LISTINGS['category'].scoped(category=category))
 
-    gender = request.GET.get('gender', 'all')
-    if gender != 'all':
-        products = products.filter(gender=gender)
-
-    sort  = request.GET.get('sort', '-created_at')
-    valid = ['-created_at', 'base_price', '-base_price', 'name', '-name']
-    products = products.order_by(sort if sort in valid else '-created_at')
-
-    paginator = Paginator(products, 24)
-    page_obj  = paginator.get_page(request.GET.get('page'))
-
-    return render(request, 'category_detail.html', {
-        'category':        category,
-        'products':        page_obj,
-        'page_obj':        page_obj,
-        'is_paginated':    page_obj.has_other_pages(),
-        'selected_gender': gender,
-        'current_sort':    sort,
-    })
+    return render(request, 'category_detail.html', listing_context(
+        listing,
+        category=category,
+        selected_gender=request.GET.get('gender', 'all'),
+    ))
 
 
 # ── Search ─────────────────────────────────────────────────────────────────────
 def search_view(request):
     """Search functionality"""
-    query    = request.GET.get('q', '')
-    products = Product.objects.none()
-
-    if query:
-        products = Product.objects.filter(
-            Q(name__icontains=query) |
-            Q(brand__name__icontains=query) |
-            Q(description__icontains=query) |
-            Q(category__name__icontains=query),
-            is_active=True
-        ).select_related('brand', 'category').distinct()
-
-    paginator = Paginator(products, 24)
-    page_obj  = paginator.get_page(request.GET.get('page'))
+    query  = request.GET.get('q', '')
+    result = (search_page(query, {}, 'relevance', request.GET.get('page'), 24) if query
+              else {'ids': [], 'total': 0, 'page': 1, 'corrected_query': None})
+    corrected = result['corrected_query']
+
+    paginator = _CountedPaginator([], 24, result['total'])
+    page_obj  = Page(
+        products_in_order(result['ids'], Product.objects.select_related('brand', 'category', 'card')),
+        result['page'],
+        paginator,
+    )
 
     context = {
         'query':        query,
+        'corrected':    corrected,
         'products':     page_obj,
         'page_obj':     page_obj,
         'is_paginated': page_obj.has_other_pages(),
-        'count':        products.count(),
+        'count':        result['total'],
+        'image_manifests': prefetch_manifests(
+            getattr(getattr(product, 'card', None), 'primary_image_url', '') for product in page_obj
+        ),
     }
     return render(request, 'search_results.html', context)
 
 
 # ── Medical Lenses List ────────────────────────────────────────────────────────
 def medical_lenses_list(request):
-    """Medical lenses listing page."""
-    queryset = LensOption.objects.filter(is_active=True).select_related(
-        'lens_brand', 'lens_type'
-    ).prefetch_related('coatings')
-
+    """Medical lenses listing page, filtered and faceted through the lens attribute index."""
     selected_lens_brands = request.GET.getlist('lens_brand')
-    if selected_lens_brands:
-        queryset = queryset.filter(lens_brand__slug__in=selected_lens_brands)
-
-    selected_lens_types = request.GET.getlist('lens_type')
-    if selected_lens_types:
-        queryset = queryset.filter(lens_type__slug__in=selected_lens_types)
-
-    selected_indexes = request.GET.getlist('index')
-    if selected_indexes:
-        queryset = queryset.filter(index__in=selected_indexes)
-
-    selected_coatings = request.GET.getlist('coating')
-    if selected_coatings:
-        queryset = queryset.filter(coatings__code__in=selected_coatings).distinct()
-
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
-    if min_price:
-        queryset = queryset.filter(base_price__gte=min_price)
-    if max_price:
-        queryset = queryset.filter(base_price__lte=max_price)
+    selected_lens_types  = request.GET.getlist('lens_type')
+    selected_indexes     = request.GET.getlist('index')
+    selected_coatings    = request.GET.getlist('coating')
 
     sort_option = request.GET.get('sort', '-created_at')
-    valid_sorts = ['-created_at', 'base_price', '-base_price', 'name', '-name']
-    queryset = queryset.order_by(sort_option if sort_option in valid_sorts else '-created_at')
-
-    paginator  = Paginator(queryset, 24)
-    page_obj   = paginator.get_page(request.GET.get('page'))
-
-    price_range = LensOption.objects.filter(is_active=True).aggregate(
-        min_price=Min('base_price'),
-        max_price=Max('base_price')
+    if sort_option not in LENS_SORTS:
+        sort_option = '-created_at'
+
+    index       = get_lens_index()
+    ids, facets = index.select(
+        {
+            'lens_brand': selected_lens_brands,
+            'lens_type':  selected_lens_types,
+            'index':      selected_indexes,
+            'coating':    selected_coatings,
+        },
+        min_price=_parse_price(request.GET.get('min_price')),
+        max_price=_parse_price(request.GET.get('max_price')),
+        sort=sort_option,
     )
 
-    index_options = (
-        LensOption.objects
-        .filter(is_active=True)
-        .values_list('index', flat=True)
-        .distinct()
-        .order_by('index')
+    paginator = Paginator(ids, 24)
+    page_obj  = paginator.get_page(request.GET.get('page'))
+    page_rows = (
+        LensOption.objects.filter(id__in=page_obj.object_list)
+        .select_related('lens_brand', 'lens_type')
+        .prefetch_related('coatings')
+        .in_bulk()
     )
+    page_obj.object_list = [page_rows[pk] for pk in page_obj.object_list if pk in page_rows]
+
+    price_stats = price_statistic(LENS_OPTION_DIMENSION)
+    price_range = {'min_price': price_stats['min_price'], 'max_price': price_stats['max_price']}
+
+    index_options = sorted(facets['index'])
 
     context = {
         'lens_options':         page_obj,
@@ -565,11 +389,14 @@ def medical_lenses_list(request):
         'lens_types':           LensType.objects.filter(is_active=True).order_by('name'),
         'index_options':        index_options,
         'price_range':          price_range,
+        'price_stats':          price_stats,
         'selected_lens_brands': selected_lens_brands,
         'selected_lens_types':  selected_lens_types,
         'selected_indexes':     selected_indexes,
         'selected_coatings':    selected_coatings,
         'current_sort':         sort_option,
+        'facet_counts':         facets,
+        'total_count':          paginator.count,
     }
     return render(request, 'medical_lenses_list.html', context)
 
@@ -604,95 +431,24 @@ def medical_lens_detail(request, pk):
 # ── Accessories List ───────────────────────────────────────────────────────────
 def accessories_list(request):
     """Accessories listing page with filtering"""
-    queryset = Product.objects.filter(
-        product_type='accessories',
-        is_active=True
-    ).select_related('brand', 'category').prefetch_related('images', 'variants')
-
-    selected_brands = request.GET.getlist('brand')
-    if selected_brands:
-        queryset = queryset.filter(brand__slug__in=selected_brands)
-
-    selected_categories = request.GET.getlist('category')
-    if selected_categories:
-        queryset = queryset.filter(category__slug__in=selected_categories)
-
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
-    if min_price:
-        queryset = queryset.filter(base_price__gte=min_price)
-    if max_price:
-        queryset = queryset.filter(base_price__lte=max_price)
-
-    sort_option = request.GET.get('sort', '-created_at')
-    valid_sorts = ['-created_at', 'base_price', '-base_price', 'name', '-name']
-    queryset = queryset.order_by(sort_option if sort_option in valid_sorts else '-created_at')
-
-    paginator = Paginator(queryset, 24)
-    page_obj  = paginator.get_page(request.GET.get('page'))
-
-    price_range = Product.objects.filter(
-        product_type='accessories', is_active=True
-    ).aggregate(min_price=Min('base_price'), max_price=Max('base_price'))
-
-    context = {
-        'products':            page_obj,
-        'page_obj':            page_obj,
-        'is_paginated':        page_obj.has_other_pages(),
-        'brands':              Brand.objects.filter(is_active=True).order_by('display_order', 'name'),
-        'categories':          Category.objects.filter(is_active=True).order_by('name'),
-        'price_range':         price_range,
-        'selected_brands':     selected_brands,
-        'selected_categories': selected_categories,
-        'current_sort':        sort_option,
-    }
+    listing = build_listing(request, LISTINGS['accessories'])
+    context = listing_context(
+        listing,
+        selected_brands=listing['selected']['brand'],
+        selected_categories=listing['selected']['category'],
+    )
     return render(request, 'accessories_list.html', context)
 
 
 # ── Reading Glasses List ───────────────────────────────────────────────────────
 def reading_glasses_list(request):
     """Reading glasses listing page with filtering"""
-    queryset = Product.objects.filter(
-        product_type='reading_glasses',
-        is_active=True
-    ).select_related('brand', 'category').prefetch_related('images', 'variants')
-
-    gender = request.GET.get('gender', 'all')
-    if gender != 'all':
-        queryset = queryset.filter(gender=gender)
-
-    selected_brands = request.GET.getlist('brand')
-    if selected_brands:
-        queryset = queryset.filter(brand__slug__in=selected_brands)
-
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
-    if min_price:
-        queryset = queryset.filter(base_price__gte=min_price)
-    if max_price:
-        queryset = queryset.filter(base_price__lte=max_price)
-
-    sort_option = request.GET.get('sort', '-created_at')
-    valid_sorts = ['-created_at', 'base_price', '-base_price', 'name', '-name']
-    queryset = queryset.order_by(sort_option if sort_option in valid_sorts else '-created_at')
-
-    paginator = Paginator(queryset, 24)
-    page_obj  = paginator.get_page(request.GET.get('page'))
-
-    price_range = Product.objects.filter(
-        product_type='reading_glasses', is_active=True
-    ).aggregate(min_price=Min('base_price'), max_price=Max('base_price'))
-
-    context = {
-        'products':        page_obj,
-        'page_obj':        page_obj,
-        'is_paginated':    page_obj.has_other_pages(),
-        'brands':          Brand.objects.filter(is_active=True).order_by('display_order', 'name'),
-        'price_range':     price_range,
-        'selected_gender': gender,
-        'selected_brands': selected_brands,
-        'current_sort':    sort_option,
-    }
+    listing = build_listing(request, LISTINGS['reading_glasses'])
+    context = listing_context(
+        listing,
+        selected_gender=request.GET.get('gender', 'all'),
+        selected_brands=listing['selected']['brand'],
+    )
     return render(request, 'reading_glasses_list.html', context)
 
 
@@ -702,47 +458,12 @@ def kids_list(request):
     Kids eyeglasses/sunglasses listing page.
     Filters products where gender='kids' across eyeglasses and sunglasses.
     """
-    queryset = Product.objects.filter(
-        gender='kids',
-        is_active=True
-    ).select_related('brand', 'category').prefetch_related('images', 'variants')
-
-    product_type = request.GET.get('type', 'all')
-    if product_type != 'all':
-        queryset = queryset.filter(product_type=product_type)
-
-    selected_brands = request.GET.getlist('brand')
-    if selected_brands:
-        queryset = queryset.filter(brand__slug__in=selected_brands)
-
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
-    if min_price:
-        queryset = queryset.filter(base_price__gte=min_price)
-    if max_price:
-        queryset = queryset.filter(base_price__lte=max_price)
-
-    sort_option = request.GET.get('sort', '-created_at')
-    valid_sorts = ['-created_at', 'base_price', '-base_price', 'name', '-name']
-    queryset = queryset.order_by(sort_option if sort_option in valid_sorts else '-created_at')
-
-    paginator = Paginator(queryset, 24)
-    page_obj  = paginator.get_page(request.GET.get('page'))
-
-    price_range = Product.objects.filter(
-        gender='kids', is_active=True
-    ).aggregate(min_price=Min('base_price'), max_price=Max('base_price'))
-
-    context = {
-        'products':        page_obj,
-        'page_obj':        page_obj,
-        'is_paginated':    page_obj.has_other_pages(),
-        'brands':          Brand.objects.filter(is_active=True).order_by('display_order', 'name'),
-        'price_range':     price_range,
-        'selected_type':   product_type,
-        'selected_brands': selected_brands,
-        'current_sort':    sort_option,
-    }
+    listing = build_listing(request, LISTINGS['kids'])
+    context = listing_context(
+        listing,
+        selected_type=request.GET.get('type', 'all'),
+        selected_brands=listing['selected']['brand'],
+    )
     return render(request, 'kids_list.html', context)
 
 
@@ -766,22 +487,27 @@ def get_contact_lens_powers(request):
     """Get available powers for a contact lens color"""
     from django.http import JsonResponse
 
-    color_id = request.GET.get('color_id')
-
-    try:
-        color = ContactLensColor.objects.get(id=color_id)
-        if color.power_enabled:
-            powers = color.power_options.filter(is_available=True).values(
-                'power_value', 'stock_quantity'
-            )
-            return JsonResponse({
-                'power_enabled': True,
-                'powers':        list(powers)
-            })
-        else:
-            return JsonResponse({
-                'power_enabled': False,
-                'message':       'Power not available for this color'
-            })
-    except ContactLensColor.DoesNotExist:
-        return JsonResponse({'error': 'Color not found'}, status=404)
\ No newline at end of file
+    color_id = request.GET.get('color_id', '')
+    color    = None
+    if color_id.isdigit():
+        color = ContactLensColor.objects.filter(id=color_id).values('contact_lens__product_id', 'power_enabled').first()
+    if color is None:
+        return JsonResponse({'error': 'Color not found'}, status=404)
+
+    if not color['power_enabled']:
+        return JsonResponse({
+            'power_enabled': False,
+            'message':       'Power not available for this color'
+        })
+    matrix = get_power_matrix(color['contact_lens__product_id'])
+    return JsonResponse({
+        'power_enabled': True,
+        'powers':        available_powers(matrix, color_id)
+    })
+
+
+def contact_lens_power_matrix(request, product_id):
+    """The whole colors × powers availability matrix of a contact lens product."""
+    from django.http import JsonResponse
+
+    return JsonResponse(get_power_matrix(product_id))
\ No newline at end of file
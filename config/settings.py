@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 import os
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 SECRET_KEY = config("SECRET_KEY")
 DEBUG = config("DEBUG", cast=bool)
 
@@ -62,6 +62,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -118,6 +119,37 @@ DATABASES = {
     }
 }
 
+# Read replicas of `default` (same database name and credentials), e.g.
+# DB_REPLICA_HOSTS=10.0.0.12,10.0.0.13. See core/db_router.py.
+for _i, _host in enumerate(config("DB_REPLICA_HOSTS", default="", cast=Csv()), 1):
+    DATABASES[f"replica_{_i}"] = {**DATABASES["default"], "HOST": _host, "TEST": {"MIRROR": "default"}}
+
+DATABASE_REPLICAS   = [alias for alias in DATABASES if alias.startswith("replica_")]
+DATABASE_ROUTERS    = ["core.db_router.ReplicaRouter"]
+REPLICA_READ_VIEWS  = [
+    "catalog.",
+    "search.",
+    "content.",
+    "reviews.",
+    "adminpanel.views.dashboard",
+]
+REPLICA_MAX_LAG     = config("DB_REPLICA_MAX_LAG", default=5, cast=int)      # seconds
+REPLICA_PIN_SECONDS = config("DB_REPLICA_PIN_SECONDS", default=30, cast=int)  # read-your-writes window
+
+
+# Cache
+# Shared by every worker: product / search / catalog version stamps and guest
+# carts live here (core/checks.py fails on a process-local backend).
+# e.g. CACHE_URL=redis://10.0.0.20:6379/1
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config("CACHE_URL", default="redis://127.0.0.1:6379/1"),
+        "KEY_PREFIX": "optical",
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -0,0 +1,36 @@
+# core/checks.py
+"""
+System checks for settings the rest of the tree relies on.
+
+Version stamps (catalog/detail_cache.py, search/engine.py,
+search/autocomplete.py, search/click_priors.py, catalog/catalog_version.py)
+and guest carts (cart/store.py) live in the default cache, so every worker
+must share it. A process-local backend silently breaks cross-worker
+invalidation: a bump made by the worker that saved a product never reaches
+the others.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_default_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        f"CACHES['default'] uses {backend}, which is not shared between processes.",
+        hint=(
+            'Point CACHE_URL at Redis (django.core.cache.backends.redis.RedisCache) or '
+            'use memcached. Test settings that run in one process may add core.E001 to '
+            'SILENCED_SYSTEM_CHECKS.'
+        ),
+        id='core.E001',
+    )]
@@ -1,38 +1,32 @@
+from django.utils.functional import SimpleLazyObject
 
 from catalog.models import Brand
-from cart.views import get_or_create_cart
+from cart.store import find_cart
+from cart.summary import cart_summary
 
 
 def global_context(request):
     """
     Injects common context variables into every template:
       - nav_brands       : active brands for nav dropdowns
+      - cart             : the visitor's cart or None (looked up only if used)
       - cart_count       : number of items in cart
       - wishlist_count   : number of wishlist items (authenticated users)
+    Nothing is written: the counts come from cart/summary.py.
     """
     # Navigation brands (top 10 by display_order)
     nav_brands = Brand.objects.filter(is_active=True).order_by('display_order')[:10]
 
-    # Cart count
-    cart_count = 0
-    cart = None
+    # Cart and wishlist counts (cached, never creates a session or cart)
+    summary = {'cart_count': 0, 'wishlist_count': 0}
     try:
-        cart = get_or_create_cart(request)
-        cart_count = cart.items.count()
+        summary = cart_summary(request)
     except Exception:
         pass
 
-    # Wishlist count (only for authenticated users)
-    wishlist_count = 0
-    if request.user.is_authenticated:
-        try:
-            wishlist_count = request.user.wishlist.products.count()
-        except Exception:
-            pass
-
     return {
         'nav_brands':      nav_brands,
-        'cart':            cart,
-        'cart_count':      cart_count,
-        'wishlist_count':  wishlist_count,
-    }
\ No newline at end of file
+        'cart':            SimpleLazyObject(lambda: find_cart(request)),
+        'cart_count':      summary['cart_count'],
+        'wishlist_count':  summary['wishlist_count'],
+    }
@@ -0,0 +1,162 @@
+# core/db_router.py
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Settings (config/settings.py):
+
+    DATABASE_REPLICAS     aliases in DATABASES that replicate `default`
+    REPLICA_READ_VIEWS    dotted view prefixes whose GET/HEAD requests may read
+                          from a replica (catalog, search, content, reviews,
+                          the admin dashboard)
+    REPLICA_MAX_LAG       seconds of replication lag before a replica is skipped
+    REPLICA_PIN_SECONDS   how long a client's reads stay on the primary after
+                          it wrote something
+
+core.middleware.ReplicaRoutingMiddleware decides per request whether reads
+may go to a replica. Everything else — POSTs, other views, management
+commands, reads inside a transaction and reads after a write in the same
+request — stays on the primary. A write also sets a short-lived pin cookie
+so the client's next requests read the primary until replication has caught
+up with what it just wrote.
+
+Code that fills a cache or an in-memory index stamped with a version the
+primary bumped after commit (detail contexts, search and autocomplete
+indexes, the home snapshot, ...) wraps its reads in primary_reads(): built
+from a lagging replica, the old data would be stored under the new version
+and served until the next bump.
+
+Replicas are health-checked at most every HEALTH_CHECK_INTERVAL seconds per
+process: one that is unreachable or lags more than REPLICA_MAX_LAG is
+skipped, and with no healthy replica reads fall back to the primary.
+
+Locally, add a second SQLite database to DATABASES, list it in
+DATABASE_REPLICAS and run `manage.py migrate --database <alias>`; the lag
+check only applies to MySQL replicas.
+"""
+
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL = 5  # seconds
+
+_state  = threading.local()
+_health = {}  # alias → (checked_at, healthy)
+_health_lock = threading.Lock()
+
+
+# ── Request state ─────────────────────────────────────────────────────────────
+
+def begin_request():
+    _state.allow_replica = False
+    _state.replica       = None
+    _state.wrote         = False
+
+
+def allow_replica_reads():
+    _state.allow_replica = True
+
+
+def end_request():
+    """True if the request wrote to the primary."""
+    wrote = getattr(_state, 'wrote', False)
+    _state.__dict__.clear()
+    return wrote
+
+
+@contextmanager
+def primary_reads():
+    """Send this thread's reads to the primary inside the block."""
+    previous = getattr(_state, 'primary_reads', 0)
+    _state.primary_reads = previous + 1
+    try:
+        yield
+    finally:
+        _state.primary_reads = previous
+
+
+# ── Replica health ────────────────────────────────────────────────────────────
+
+def replica_lag(alias):
+    """Seconds the replica is behind, or None if it is not replicating."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor != 'mysql':
+            cursor.execute('SELECT 1')
+            return 0
+        try:
+            cursor.execute('SHOW REPLICA STATUS')
+            column = 'Seconds_Behind_Source'
+        except DatabaseError:
+            cursor.execute('SHOW SLAVE STATUS')  # MySQL < 8.0.22 / MariaDB
+            column = 'Seconds_Behind_Master'
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([col[0] for col in cursor.description], row)).get(column)
+
+
+def replica_is_healthy(alias):
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (None, False))
+    if checked_at is not None and now - checked_at < HEALTH_CHECK_INTERVAL:
+        return healthy
+
+    with _health_lock:
+        checked_at, healthy = _health.get(alias, (None, False))
+        if checked_at is not None and now - checked_at < HEALTH_CHECK_INTERVAL:
+            return healthy
+        try:
+            lag     = replica_lag(alias)
+            healthy = lag is not None and lag <= settings.REPLICA_MAX_LAG
+            if not healthy:
+                logger.warning('Replica %s skipped: lag %s', alias, lag)
+        except Exception:
+            logger.exception('Replica %s health check failed', alias)
+            healthy = False
+        _health[alias] = (now, healthy)
+        return healthy
+
+
+def _choose_replica():
+    healthy = [alias for alias in settings.DATABASE_REPLICAS if replica_is_healthy(alias)]
+    return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+
+# ── Router ────────────────────────────────────────────────────────────────────
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, 'allow_replica', False) or _state.wrote:
+            return DEFAULT_DB_ALIAS
+        if getattr(_state, 'primary_reads', 0):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Reads inside a transaction must see its own writes.
+            return DEFAULT_DB_ALIAS
+        if _state.replica is None:
+            # One replica per request, so its reads are consistent with each other.
+            _state.replica = _choose_replica()
+        return _state.replica
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
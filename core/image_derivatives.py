@@ -0,0 +1,262 @@
+# core/image_derivatives.py
+"""
+Responsive image derivatives for uploaded media.
+
+ProductImage.image, Banner.image_desktop and Brand.logo are resized to
+fixed WIDTHS and encoded as WebP and JPEG. Files are stored under the
+SHA-256 of the source bytes:
+
+    derivatives/<h[:2]>/<h[:20]>-<width>w.<webp|jpg>
+
+so the same upload is only ever rendered once and the URLs can be cached
+forever. Each processed source gets an ImageDerivativeSet manifest row; the
+`srcset` / `picture` template tags (core/templatetags/responsive_images.py)
+read it through the cache and fall back to the original file until it
+exists. Grid and home views prefetch the manifests of a whole page with
+prefetch_manifests() so tiles don't look them up one by one.
+
+`manage.py build_image_derivatives` renders everything still missing in a
+process pool. It is idempotent — renditions already in storage are skipped
+— and resumable: a manifest is saved as soon as its source is done, so an
+interrupted run continues where it stopped.
+"""
+
+import hashlib
+import io
+from urllib.parse import unquote
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps
+
+from .db_router import primary_reads
+from .models import ImageDerivativeSet
+
+
+WIDTHS          = (320, 640, 960, 1280, 1920)
+DERIVATIVE_ROOT = 'derivatives'
+
+# format → (Pillow format, save options, file extension)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}, 'webp'),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}, 'jpg'),
+}
+
+# (model label, image field) pairs whose files get derivatives
+SOURCES = [
+    ('catalog.ProductImage', 'image'),
+    ('content.Banner',       'image_desktop'),
+    ('catalog.Brand',        'logo'),
+]
+
+MANIFEST_CACHE_TIMEOUT = 60 * 60  # seconds
+
+
+# ── Naming ────────────────────────────────────────────────────────────────────
+
+def target_widths(original_width):
+    """WIDTHS below the original, plus the original itself capped at the largest width."""
+    widths = {w for w in WIDTHS if w < original_width}
+    widths.add(min(original_width, WIDTHS[-1]))
+    return sorted(widths)
+
+
+def derivative_name(content_hash, width, fmt):
+    return f'{DERIVATIVE_ROOT}/{content_hash[:2]}/{content_hash[:20]}-{width}w.{FORMATS[fmt][2]}'
+
+
+def source_name(image):
+    """Storage name for a FieldFile, a storage name or a MEDIA_URL-prefixed URL."""
+    if hasattr(image, 'name'):
+        return image.name or ''
+    value = str(image or '')
+    if value.startswith(settings.MEDIA_URL):
+        # Storage URLs are percent-encoded (filepath_to_uri); manifests are keyed by the raw name.
+        return unquote(value[len(settings.MEDIA_URL):])
+    return value
+
+
+# ── Rendering (pool workers) ──────────────────────────────────────────────────
+
+def _for_format(image, fmt):
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if fmt == 'jpeg':
+        if has_alpha:
+            rgba = image.convert('RGBA')
+            flat = Image.new('RGB', rgba.size, 'white')
+            flat.paste(rgba, mask=rgba.getchannel('A'))
+            return flat
+        return image.convert('RGB')
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def render_derivatives(source):
+    """
+    Render the missing renditions of `source` and return its manifest.
+    Runs inside a pool process: it only touches storage, never the database.
+    """
+    with default_storage.open(source, 'rb') as fh:
+        data = fh.read()
+    content_hash = hashlib.sha256(data).hexdigest()
+
+    with Image.open(io.BytesIO(data)) as opened:
+        image = ImageOps.exif_transpose(opened)
+        width, height = image.size
+
+        renditions = {fmt: {} for fmt in FORMATS}
+        for target in target_widths(width):
+            resized = None
+            for fmt, (pil_format, options, _ext) in FORMATS.items():
+                name = derivative_name(content_hash, target, fmt)
+                renditions[fmt][str(target)] = name
+                if default_storage.exists(name):
+                    continue
+                if resized is None:
+                    size    = (target, max(1, round(height * target / width)))
+                    resized = image if target == width else image.resize(size, Image.LANCZOS)
+                buffer = io.BytesIO()
+                _for_format(resized, fmt).save(buffer, pil_format, **options)
+                saved = default_storage.save(name, ContentFile(buffer.getvalue()))
+                if saved != name:
+                    # Another worker rendered an identical upload first; keep its file.
+                    default_storage.delete(saved)
+
+    return {
+        'source':       source,
+        'content_hash': content_hash,
+        'width':        width,
+        'height':       height,
+        'renditions':   renditions,
+    }
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+# ── Orchestration ─────────────────────────────────────────────────────────────
+
+def all_sources():
+    names = set()
+    for label, field in SOURCES:
+        model = apps.get_model(label)
+        names.update(
+            model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+            .values_list(field, flat=True).distinct()
+        )
+    return names
+
+
+def pending_sources(force=False):
+    """Sources without a manifest (all of them with force=True), in a stable order."""
+    names = all_sources()
+    if not force:
+        names -= set(ImageDerivativeSet.objects.values_list('source', flat=True))
+    return sorted(names)
+
+
+def save_manifest(manifest):
+    ImageDerivativeSet.objects.update_or_create(
+        source=manifest['source'],
+        defaults={
+            'content_hash': manifest['content_hash'],
+            'width':        manifest['width'],
+            'height':       manifest['height'],
+            'renditions':   manifest['renditions'],
+        },
+    )
+    cache.delete(_manifest_key(manifest['source']))
+
+
+def build_derivatives(sources, workers=None, on_progress=None):
+    """
+    Render `sources` in a process pool, saving each manifest as it completes.
+    Returns (done, failures) where failures is [(source, error)].
+    """
+    done, failures = 0, []
+    if not sources:
+        return done, failures
+
+    # Children must not inherit open database connections.
+    connections.close_all()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(render_derivatives, source): source for source in sources}
+        for future in as_completed(futures):
+            source = futures[future]
+            try:
+                save_manifest(future.result())
+                done += 1
+            except Exception as exc:
+                failures.append((source, exc))
+            if on_progress:
+                on_progress(done, len(failures), len(sources))
+    return done, failures
+
+
+# ── Reads (template tags) ─────────────────────────────────────────────────────
+
+def _manifest_key(source):
+    return 'image_derivatives:' + hashlib.md5(source.encode()).hexdigest()
+
+
+def get_manifest(source):
+    """{'width', 'height', 'renditions'} for a storage name, or None if not rendered yet."""
+    if not source:
+        return None
+    key   = _manifest_key(source)
+    entry = cache.get(key)
+    if entry is None:
+        with primary_reads():
+            entry = ImageDerivativeSet.objects.filter(source=source).values('width', 'height', 'renditions').first() or {}
+        cache.set(key, entry, MANIFEST_CACHE_TIMEOUT)
+    return entry or None
+
+
+def get_manifests(sources):
+    """get_manifest() for many storage names: one cache round trip and one query for the misses."""
+    sources = {source for source in sources if source}
+    if not sources:
+        return {}
+    keys    = {_manifest_key(source): source for source in sources}
+    entries = {keys[key]: entry for key, entry in cache.get_many(keys).items()}
+
+    missing = sources - entries.keys()
+    if missing:
+        with primary_reads():
+            rows = {
+                row.pop('source'): row for row in
+                ImageDerivativeSet.objects.filter(source__in=missing).values('source', 'width', 'height', 'renditions')
+            }
+        fetched = {source: rows.get(source, {}) for source in missing}
+        cache.set_many({_manifest_key(source): entry for source, entry in fetched.items()}, MANIFEST_CACHE_TIMEOUT)
+        entries.update(fetched)
+    return {source: entry or None for source, entry in entries.items()}
+
+
+def prefetch_manifests(images):
+    """
+    {storage name: manifest or None} for the FieldFiles / names / URLs a page
+    renders. Views pass it to templates as `image_manifests`, so the tags
+    skip their per-image cache lookups.
+    """
+    return get_manifests(source_name(image) for image in images)
+
+
+def build_srcset(manifest, fmt):
+    renditions = sorted(manifest['renditions'].get(fmt, {}).items(), key=lambda item: int(item[0]))
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in renditions)
+
+
+def rendition_name(manifest, width, fmt='jpeg'):
+    """Storage name of the smallest rendition at least `width` wide (the largest one otherwise), or None."""
+    renditions = sorted((int(w), n) for w, n in (manifest or {}).get('renditions', {}).get(fmt, {}).items())
+    if not renditions:
+        return None
+    return next((n for w, n in renditions if w >= int(width)), renditions[-1][1])
@@ -0,0 +1,40 @@
+# core/management/commands/build_image_derivatives.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.image_derivatives import pending_sources, build_derivatives
+
+
+class Command(BaseCommand):
+    help = ('Render WebP/JPEG width derivatives for product images, banners and brand logos. '
+            'Only images without a manifest are processed, so it is safe to re-run (e.g. from cron).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count).')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-check every image; renditions already in storage are still reused.')
+        parser.add_argument('--limit', type=int, default=None, help='Process at most this many images.')
+
+    def handle(self, *args, **options):
+        sources = pending_sources(force=options['force'])
+        if options['limit'] is not None:
+            sources = sources[:options['limit']]
+        if not sources:
+            self.stdout.write('No images to process.')
+            return
+
+        self.stdout.write(f'Processing {len(sources)} images...')
+        started = time.monotonic()
+
+        def progress(done, failed, total):
+            if (done + failed) % 100 == 0:
+                self.stdout.write(f'  {done + failed}/{total}')
+
+        done, failures = build_derivatives(sources, workers=options['workers'], on_progress=progress)
+
+        for source, error in failures:
+            self.stderr.write(f'  {source}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Built derivatives for {done} images ({len(failures)} failed) in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,38 @@
+# core/middleware.py
+from django.conf import settings
+
+from .db_router import begin_request, end_request, allow_replica_reads
+
+
+PIN_COOKIE = 'db_pin'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets GET/HEAD requests to REPLICA_READ_VIEWS read from a replica
+    (core/db_router.py) unless the client is pinned to the primary, and pins
+    it for REPLICA_PIN_SECONDS after any request that wrote.
+
+    Sits above SessionMiddleware so session saves count as writes too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        begin_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = end_request()
+        if wrote:
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD') or PIN_COOKIE in request.COOKIES:
+            return None
+        view = f'{view_func.__module__}.{view_func.__name__}'
+        if view.startswith(tuple(settings.REPLICA_READ_VIEWS)):
+            allow_replica_reads()
+        return None
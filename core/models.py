@@ -1,3 +1,26 @@
 from django.db import models
 
 # Create your models here.
+
+
+class ImageDerivativeSet(models.Model):
+    """
+    Resized WebP/JPEG renditions of one uploaded image (see core/image_derivatives.py).
+    Files are named after the source's content hash, so identical uploads share them.
+    """
+    source = models.CharField(max_length=500, unique=True)  # storage name of the original
+    content_hash = models.CharField(max_length=64, db_index=True)
+
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    # {'webp': {'320': 'derivatives/ab/abcd…-320w.webp', ...}, 'jpeg': {...}}
+    renditions = models.JSONField(default=dict)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'core_image_derivative_sets'
+
+    def __str__(self):
+        return self.source
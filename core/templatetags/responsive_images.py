@@ -0,0 +1,89 @@
+# core/templatetags/responsive_images.py
+"""
+Template tags for the derivatives built by core/image_derivatives.py.
+
+    {% load responsive_images %}
+    <img {% srcset product.card.primary_image_url sizes="(max-width: 768px) 50vw, 25vw" %} alt="…">
+    {% picture brand.logo alt=brand.name sizes="160px" %}
+    <div data-bg="{% derivative_url slide.image_desktop 1920 %}">
+
+`image` may be a FieldFile, a storage name or a MEDIA_URL URL (ProductCard
+stores URLs). Until `manage.py build_image_derivatives` has processed an
+image, every tag falls back to the original file.
+
+Manifests come from the context's `image_manifests`
+(core.image_derivatives.prefetch_manifests) when the view prefetched them,
+else from get_manifest() per image.
+"""
+
+from django import template
+from django.core.files.storage import default_storage
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from core.image_derivatives import source_name, get_manifest, build_srcset, rendition_name
+
+register = template.Library()
+
+
+def _manifest(context, name):
+    prefetched = context.get('image_manifests')
+    if prefetched is not None and name in prefetched:
+        return prefetched[name]
+    return get_manifest(name)
+
+
+def _original_url(image, name):
+    if hasattr(image, 'url'):
+        return image.url
+    return image if str(image).startswith(('/', 'http://', 'https://')) else default_storage.url(name)
+
+
+@register.simple_tag(takes_context=True)
+def srcset(context, image, sizes='100vw'):
+    """`src`, `srcset` and `sizes` attributes for an <img> (JPEG renditions)."""
+    name = source_name(image)
+    if not name:
+        return ''
+    src      = _original_url(image, name)
+    manifest = _manifest(context, name)
+    if not manifest:
+        return format_html('src="{}"', src)
+    return format_html('src="{}" srcset="{}" sizes="{}"', src, build_srcset(manifest, 'jpeg'), sizes)
+
+
+@register.simple_tag(takes_context=True)
+def picture(context, image, alt='', sizes='100vw', css_class='', loading='lazy', width=None, height=None):
+    """<picture> with a WebP <source> and a JPEG-srcset <img>; a plain <img> until derivatives exist."""
+    name = source_name(image)
+    if not name:
+        return ''
+    manifest = _manifest(context, name)
+    attrs = {
+        'src':     _original_url(image, name),
+        'alt':     alt,
+        'class':   css_class or None,
+        'loading': loading or None,
+        'width':   width or (manifest or {}).get('width'),
+        'height':  height or (manifest or {}).get('height'),
+    }
+    if not manifest:
+        return format_html('<img{}>', flatatt(attrs))
+
+    attrs.update(srcset=build_srcset(manifest, 'jpeg'), sizes=sizes)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}"><img{}></picture>',
+        build_srcset(manifest, 'webp'), sizes, flatatt(attrs),
+    )
+
+
+@register.simple_tag(takes_context=True)
+def derivative_url(context, image, width, fmt='jpeg'):
+    """URL of the smallest rendition at least `width` wide (the largest one otherwise), e.g. for CSS backgrounds."""
+    name = source_name(image)
+    if not name:
+        return ''
+    chosen = rendition_name(_manifest(context, name), width, fmt)
+    if not chosen:
+        return _original_url(image, name)
+    return default_storage.url(chosen)
@@ -1,3 +1,168 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+
+from catalog.models import Category, Product
+from . import db_router
+from .db_router import ReplicaRouter, allow_replica_reads, begin_request, end_request, primary_reads
+from .middleware import PIN_COOKIE, ReplicaRoutingMiddleware
+
+
+REPLICAS = ['replica_test_1', 'replica_test_2']
+
+
+def read_view(request):
+    return HttpResponse()
+
+
+read_view.__module__ = 'catalog.views'  # a REPLICA_READ_VIEWS prefix
+
+
+def other_view(request):
+    return HttpResponse()
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_MAX_LAG=5)
+class ReplicaRouterTests(TransactionTestCase):
+    """
+    Routing outside a transaction (TestCase would wrap every read in one),
+    with REPLICAS set up as test mirrors of the default database — what
+    TEST: {"MIRROR": "default"} on the replica aliases in settings gives.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after the test databases exist, as the runner sets up mirrors.
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict
+        for alias in REPLICAS:
+            connections.settings[alias] = {**primary, 'TEST': {**primary['TEST'], 'MIRROR': DEFAULT_DB_ALIAS}}
+            connections[alias].creation.set_as_test_mirror(primary)
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in REPLICAS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        super().tearDownClass()
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        db_router._health.clear()
+        self.addCleanup(db_router._health.clear)
+        begin_request()
+        self.addCleanup(end_request)
+
+    def read(self):
+        return self.router.db_for_read(Product)
+
+    def test_primary_unless_replica_reads_allowed(self):
+        self.assertEqual(self.read(), DEFAULT_DB_ALIAS)
+
+    def test_one_replica_per_request(self):
+        allow_replica_reads()
+        alias = self.read()
+        self.assertIn(alias, REPLICAS)
+        self.assertEqual({self.read() for _ in range(10)}, {alias})
+
+    def test_replica_reads_see_primary_rows(self):
+        category = Category.objects.create(name='Frames', slug='frames')
+        begin_request()
+        allow_replica_reads()
+        self.assertEqual(Category.objects.db_manager(self.read()).get(slug='frames').pk, category.pk)
+        self.assertFalse(end_request())
+
+    def test_write_pins_the_rest_of_the_request(self):
+        allow_replica_reads()
+        self.assertIn(self.read(), REPLICAS)
+        self.assertEqual(self.router.db_for_write(Product), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.read(), DEFAULT_DB_ALIAS)
+        self.assertTrue(end_request())
+
+    def test_reads_inside_atomic_go_to_primary(self):
+        allow_replica_reads()
+        with transaction.atomic():
+            self.assertEqual(self.read(), DEFAULT_DB_ALIAS)
+        self.assertIn(self.read(), REPLICAS)
+
+    def test_primary_reads_block(self):
+        allow_replica_reads()
+        with primary_reads():
+            self.assertEqual(self.read(), DEFAULT_DB_ALIAS)
+            with primary_reads():
+                self.assertEqual(self.read(), DEFAULT_DB_ALIAS)
+            self.assertEqual(self.read(), DEFAULT_DB_ALIAS)
+        self.assertIn(self.read(), REPLICAS)
+
+    def test_lagging_replica_is_skipped(self):
+        lag = {REPLICAS[0]: 60, REPLICAS[1]: 0}
+        with mock.patch.object(db_router, 'replica_lag', side_effect=lag.get), self.assertLogs('core.db_router', 'WARNING'):
+            allow_replica_reads()
+            self.assertEqual(self.read(), REPLICAS[1])
+
+    def test_no_healthy_replica_falls_back_to_primary(self):
+        for failure in (lambda alias: None, DatabaseError('gone away')):  # not replicating / unreachable
+            with self.subTest(failure=failure), mock.patch.object(db_router, 'replica_lag', side_effect=failure), \
+                    self.assertLogs('core.db_router', 'WARNING'):
+                db_router._health.clear()
+                begin_request()
+                allow_replica_reads()
+                self.assertEqual(self.read(), DEFAULT_DB_ALIAS)
+
+    def test_health_is_checked_once_per_interval(self):
+        with mock.patch.object(db_router, 'replica_lag', return_value=0) as replica_lag:
+            for _ in range(3):
+                begin_request()
+                allow_replica_reads()
+                self.read()
+        self.assertEqual(replica_lag.call_count, len(REPLICAS))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_test_1'], REPLICA_PIN_SECONDS=30)
+class ReplicaRoutingMiddlewareTests(TransactionTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        db_router._health[REPLICAS[0]] = (float('inf'), True)  # never re-checked
+        self.addCleanup(db_router._health.clear)
+
+    def run_request(self, request, view, write=False):
+        """The response, and where the view's reads went."""
+        routed = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            routed.append(ReplicaRouter().db_for_read(Product))
+            if write:
+                ReplicaRouter().db_for_write(Product)
+            return view(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        return middleware(request), routed[0]
+
+    def test_get_to_read_view_uses_replica(self):
+        response, alias = self.run_request(self.factory.get('/'), read_view)
+        self.assertEqual(alias, REPLICAS[0])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_other_views_and_posts_use_primary(self):
+        self.assertEqual(self.run_request(self.factory.get('/'), other_view)[1], DEFAULT_DB_ALIAS)
+        self.assertEqual(self.run_request(self.factory.post('/'), read_view)[1], DEFAULT_DB_ALIAS)
+
+    def test_write_sets_pin_cookie(self):
+        response, _alias = self.run_request(self.factory.post('/'), other_view, write=True)
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 30)
+        self.assertTrue(cookie['httponly'])
+
+    def test_pinned_client_reads_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.run_request(request, read_view)[1], DEFAULT_DB_ALIAS)
+
+    def test_state_does_not_leak_between_requests(self):
+        self.run_request(self.factory.post('/'), read_view, write=True)
+        self.assertEqual(self.run_request(self.factory.get('/'), read_view)[1], REPLICAS[0])
@@ -5,55 +5,43 @@ from catalog.models import Product
 
 from django.shortcuts import render
 from catalog.models import Product
+from catalog.home_snapshot import get_home_snapshot
 
-def format_products_for_template(products_queryset):
-    """Helper to format data for the frontend design"""
+def format_products_for_template(cards):
+    """Helper to format data for the frontend design (one ProductCard per product)"""
     products_data = []
-    
-    for product in products_queryset:
-        # 1. Get Images
-        primary_image = product.images.filter(is_primary=True).first()
-        if not primary_image:
-            primary_image = product.images.first()
-        
-        secondary_image = product.images.exclude(id=primary_image.id if primary_image else None).first()
-        
-        # 2. Get Variants (for color swatches)
-        variants = product.variants.filter(is_active=True)[:4]
-        
-        # 3. Calculate Discount
-        discount_percentage = None
-        if product.compare_at_price and product.compare_at_price > product.base_price:
-            discount_percentage = int(
-                ((product.compare_at_price - product.base_price) / product.compare_at_price) * 100
-            )
 
+    for card in cards:
         products_data.append({
-            'id': product.id,
-            'name': product.name,
-            'slug': product.slug,
-            'sku': product.sku,
-            'base_price': product.base_price,
-            'compare_at_price': product.compare_at_price,
-            'discount_percentage': discount_percentage,
-            'primary_image': primary_image,
-            'secondary_image': secondary_image,
-            'variants': variants,
+            'id': card.product_id,
+            'name': card.name,
+            'slug': card.slug,
+            'sku': card.sku,
+            'brand_name': card.brand_name,
+            'base_price': card.base_price,
+            'compare_at_price': card.compare_at_price,
+            'min_price': card.min_price,
+            'discount_percentage': card.discount_percentage,
+            'primary_image_url': card.primary_image_url,
+            'secondary_image_url': card.secondary_image_url,
+            'swatches': card.swatches,
+            'in_stock': card.in_stock,
+            'rating_average': card.rating_average,
+            'rating_count': card.rating_count,
         })
     return products_data
 
 def home(request):
+    snapshot = get_home_snapshot()
+
     # Tab 1: Latest
-    latest_qs = Product.objects.filter(is_active=True).order_by('-created_at')[:8]
-    latest_products = format_products_for_template(latest_qs)
+    latest_products = format_products_for_template(snapshot['latest_cards'])
 
     # Tab 2: Top Rated (Simulated using 'is_featured')
-    top_qs = Product.objects.filter(is_active=True, is_featured=True).order_by('-base_price')[:8]
-    top_rated_products = format_products_for_template(top_qs)
+    top_rated_products = format_products_for_template(snapshot['top_rated_cards'])
 
     # Tab 3: Best Sellers (Simulated using ID ordering)
-    best_qs = Product.objects.filter(is_active=True).order_by('id')[:8]
-    best_seller_products = format_products_for_template(best_qs)
+    best_seller_products = format_products_for_template(snapshot['best_seller_cards'])
 
     context = {
         'latest_products': latest_products,
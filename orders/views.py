@@ -15,6 +15,7 @@ from django.conf import settings
 from .models import Order, OrderItem, OrderItemLensAddOn, OrderStatusHistory, PaymentTransaction
 from cart.models import Cart
 from users.models import Address
+from cart.pricing import cart_lines, price_lines, product_line
 from cart.views import get_or_create_cart
 from .payment_services import (
     SadadPaymentService, SadadPaymentError,
@@ -45,24 +46,6 @@ def _dec(v, default='0.00'):
     except Exception:
         return Decimal(default)
 
-def _calc_totals(cart_items):
-    subtotal = Decimal('0.00')
-    for item in cart_items:
-        line = _dec(getattr(item, 'unit_price', 0)) * item.quantity
-        lp   = _dec(getattr(item, 'lens_price', 0))
-        if lp > 0:
-            line += lp * item.quantity
-        try:
-            for a in item.lens_addons.all():
-                line += _dec(getattr(a, 'price', 0)) * item.quantity
-        except Exception:
-            pass
-        subtotal += line
-    tax      = Decimal('0.00')
-    shipping = Decimal('0.00') if subtotal >= Decimal('200.00') else Decimal('20.00')
-    return subtotal, tax, shipping, subtotal + tax + shipping
-
-
 # ─────────────────────────────────────────────────────────────
 # CHECKOUT
 # ─────────────────────────────────────────────────────────────
@@ -76,13 +59,13 @@ def checkout(request):
         return redirect('cart:cart_view')
 
     addrs          = request.user.addresses.all()
-    sub, tax, ship, total = _calc_totals(cart_items)
+    pricing        = price_lines(cart_lines(cart))
     return render(request, 'checkout.html', {
         'cart': cart, 'cart_items': cart_items,
         'shipping_addresses': addrs,
         'default_shipping':   addrs.filter(is_default_shipping=True).first(),
         'default_billing':    addrs.filter(is_default_billing=True).first(),
-        'subtotal': sub, 'tax': tax, 'shipping': ship, 'total': total,
+        'subtotal': pricing.subtotal, 'tax': pricing.tax, 'shipping': pricing.shipping, 'total': pricing.total,
     })
 
 
@@ -156,7 +139,8 @@ def place_order(request):
             else:
                 bill = {'line1':request.POST.get('billing_address_line1','').strip(),'line2':'','city':request.POST.get('billing_city','').strip(),'state':'','country':request.POST.get('billing_country','Qatar').strip() or 'Qatar','postal_code':''}
 
-        sub, tax_amt, ship_amt, total = _calc_totals(cart_items)
+        pricing  = price_lines(cart_lines(cart))
+        total    = pricing.total
         currency = str(getattr(cart,'currency',None) or 'QAR')
 
         # ── Create order ──────────────────────────────────────
@@ -164,7 +148,7 @@ def place_order(request):
             order = Order.objects.create(
                 order_number=_gen_order_number(), customer=request.user,
                 order_type='online', status='pending', currency=currency,
-                subtotal=sub, tax_amount=tax_amt, shipping_amount=ship_amt,
+                subtotal=pricing.subtotal, tax_amount=pricing.tax, shipping_amount=pricing.shipping,
                 discount_amount=Decimal('0.00'), total_amount=total,
                 customer_email=request.user.email,
                 customer_phone=ship.get('phone',''), customer_name=ship.get('name',''),
@@ -182,9 +166,10 @@ def place_order(request):
             )
 
             for ci in cart_items:
-                ip  = _dec(getattr(ci,'unit_price',0))
-                lp  = _dec(getattr(ci,'lens_price',0))
-                sub_item = ip * ci.quantity + (lp * ci.quantity if lp else Decimal('0'))
+                ip   = _dec(getattr(ci,'unit_price',0))
+                lp   = _dec(getattr(ci,'lens_price',0))
+                line = pricing.line(ci.id)
+                sub_item = line.goods + line.lenses
 
                 vd = None
                 if getattr(ci,'variant',None):
@@ -593,9 +578,7 @@ def buy_now_checkout(request):
     quantity = buy_now_data.get('quantity', 1)
     
     unit_price = product.base_price
-    subtotal = unit_price * quantity
-    shipping = Decimal('0.00') if subtotal >= Decimal('200.00') else Decimal('20.00')
-    total = subtotal + shipping
+    pricing = price_lines([product_line(product, quantity)])
     
     addrs = request.user.addresses.all()
     
@@ -603,10 +586,10 @@ def buy_now_checkout(request):
         'product': product,
         'quantity': quantity,
         'unit_price': unit_price,
-        'subtotal': subtotal,
-        'tax': Decimal('0.00'),
-        'shipping': shipping,
-        'total': total,
+        'subtotal': pricing.subtotal,
+        'tax': pricing.tax,
+        'shipping': pricing.shipping,
+        'total': pricing.total,
         'shipping_addresses': addrs,
         'default_shipping': addrs.filter(is_default_shipping=True).first(),
         'is_buy_now': True,
@@ -662,9 +645,8 @@ def place_buy_now_order(request):
             }
         
         unit_price = _dec(product.base_price)
-        subtotal = unit_price * quantity
-        shipping_amt = Decimal('0.00') if subtotal >= Decimal('200.00') else Decimal('20.00')
-        total = subtotal + shipping_amt
+        pricing = price_lines([product_line(product, quantity)])
+        subtotal, shipping_amt, total = pricing.subtotal, pricing.shipping, pricing.total
         
         with transaction.atomic():
             order = Order.objects.create(
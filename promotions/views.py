@@ -8,7 +8,8 @@ from django.utils import timezone
 from decimal import Decimal
 
 from .models import Coupon, CouponUsage
-from cart.views import get_or_create_cart
+from cart.pricing import price_lines
+from cart.store import get_cart_store
 
 
 def validate_coupon(coupon_code, user, cart_total):
@@ -63,17 +64,8 @@ def validate_coupon(coupon_code, user, cart_total):
 
 
 def _get_cart_subtotal(request):
-    """Helper: compute cart subtotal including lens prices and addons."""
-    cart = get_or_create_cart(request)
-    subtotal = Decimal('0.00')
-    for item in cart.items.all():
-        item_total = item.unit_price * item.quantity
-        if item.lens_price:
-            item_total += item.lens_price * item.quantity
-        for addon in item.lens_addons.all():
-            item_total += addon.price * item.quantity
-        subtotal += item_total
-    return subtotal
+    """Helper: cart subtotal including lens prices and addons (cart/pricing.py)."""
+    return price_lines(get_cart_store(request).priced_lines()).subtotal
 
 
 @require_POST
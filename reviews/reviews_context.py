@@ -20,6 +20,16 @@ def get_review_context(request, product):
             return render(request, 'sunglass_detail.html', context)
     """
 
+    context = get_rating_summary(product)
+    context.update(get_user_review_context(request, product))
+    return context
+
+
+def get_rating_summary(product):
+    """
+    Product-level rating stats. Depends only on the product's reviews, so
+    detail pages cache it with the rest of the product context.
+    """
     # Rating statistics
     rating_stats = Review.objects.filter(
         product=product,
@@ -44,6 +54,14 @@ def get_review_context(request, product):
         1: round((rating_stats['one_star'] / total) * 100),
     }
 
+    return {
+        'rating_stats': rating_stats,
+        'rating_percentages': rating_percentages,
+    }
+
+
+def get_user_review_context(request, product):
+    """Per-user review state: never cached."""
     # Can this user write a review?
     can_review = False
     user_review = None
@@ -55,8 +73,6 @@ def get_review_context(request, product):
         can_review = not user_review
 
     return {
-        'rating_stats': rating_stats,
-        'rating_percentages': rating_percentages,
         'can_review': can_review,
         'user_review': user_review,
     }
\ No newline at end of file
@@ -0,0 +1,257 @@
+# search/autocomplete.py
+"""
+Process-local prefix / n-gram index for the search box.
+
+`autocomplete` and `search_suggestions` used to run up to seven icontains
+queries per keystroke, plus two image queries per product suggestion. Each
+process now keeps one dictionary per suggestion kind — products (from
+ProductCard), brands, categories and PopularSearch keywords — with the
+ready-made JSON payloads and two postings maps over the words of every
+entry:
+
+    prefixes   "r", "ra", "ray", …  (up to MAX_PREFIX characters) → entries
+    trigrams   "ray", "ayb", …                                     → entries
+
+Entries are numbered most popular first, so every posting is a sorted
+int32 array already in ranking order: a query intersects the postings of
+its words and keeps the first few hits. Entries where every query word
+starts a word come first, then those where it only occurs inside one.
+
+Popularity: products — featured, then approved-review count; brands and
+categories — active product count; keywords — searches in the last
+SEARCH_WINDOW days, then display_order.
+
+search/signals.py bumps a version stamp in the cache whenever something
+shown here changes. The next request that notices starts a rebuild in a
+background thread (at most one per REBUILD_INTERVAL seconds) and keeps
+answering from the current index until the new one is ready; only a
+process's very first build is done in the request.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Count, Sum
+
+from catalog.models import Brand, Category, Product, ProductCard
+from core.db_router import primary_reads
+from core.image_derivatives import rendition_name, source_name
+from core.models import ImageDerivativeSet
+from .fuzzy import build_vocabulary
+from .models import PopularSearch, SearchQueryDaily
+from .rollups import window_start
+from .text import words
+
+
+MAX_PREFIX       = 12
+THUMBNAIL_WIDTH  = 320
+SEARCH_WINDOW    = 30    # days of searches (search/rollups.py) counted for keyword popularity
+REBUILD_INTERVAL = 30    # seconds
+VERSION_KEY      = 'autocomplete:version'
+
+_EMPTY = np.zeros(0, np.int32)
+
+_lock     = threading.Lock()
+_index    = None
+_building = False
+
+
+# ── Versions ──────────────────────────────────────────────────────────────────
+
+def index_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_index_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+# ── Dictionaries ──────────────────────────────────────────────────────────────
+
+def _contains(entry_words, word, prefix):
+    if prefix or len(word) < 3:
+        return any(w.startswith(word) for w in entry_words)
+    return any(word in w for w in entry_words)
+
+
+class _Dictionary:
+    """Payloads and postings for one kind of suggestion."""
+
+    def __init__(self, entries):
+        """entries: [(text, payload)], most popular first."""
+        self.payloads = [payload for _text, payload in entries]
+        self.words    = []
+        prefixes, trigrams = defaultdict(list), defaultdict(list)
+        for i, (text, _payload) in enumerate(entries):
+            entry_words = words(text)
+            self.words.append(entry_words)
+            keys_p, keys_t = set(), set()
+            for word in entry_words:
+                keys_p.update(word[:n] for n in range(1, min(len(word), MAX_PREFIX) + 1))
+                keys_t.update(word[j:j + 3] for j in range(len(word) - 2))
+            for key in keys_p:
+                prefixes[key].append(i)
+            for key in keys_t:
+                trigrams[key].append(i)
+        self.prefixes = {key: np.array(rows, np.int32) for key, rows in prefixes.items()}
+        self.trigrams = {key: np.array(rows, np.int32) for key, rows in trigrams.items()}
+
+    def _posting(self, word, prefix):
+        if prefix or len(word) < 3:
+            return self.prefixes.get(word[:MAX_PREFIX], _EMPTY)
+        rows = None
+        for j in range(len(word) - 2):
+            posting = self.trigrams.get(word[j:j + 3], _EMPTY)
+            rows = posting if rows is None else np.intersect1d(rows, posting, assume_unique=True)
+            if not len(rows):
+                break
+        return rows
+
+    def match(self, query_words, limit):
+        """Payloads of up to `limit` entries containing every query word, best first."""
+        found = []
+        for prefix in (True, False):
+            rows = None
+            for word in sorted(query_words, key=len, reverse=True):  # longest word: shortest posting
+                posting = self._posting(word, prefix)
+                rows = posting if rows is None else np.intersect1d(rows, posting, assume_unique=True)
+                if not len(rows):
+                    break
+            for i in rows.tolist():
+                if i not in found and all(_contains(self.words[i], word, prefix) for word in query_words):
+                    found.append(i)
+                    if len(found) == limit:
+                        return [self.payloads[i] for i in found]
+        return [self.payloads[i] for i in found]
+
+
+# ── Building ──────────────────────────────────────────────────────────────────
+
+def _thumbnails(image_urls):
+    """{card image url: URL of its smallest derivative} (the original where none exists yet)."""
+    sources = {url: source_name(url) for url in image_urls if url}
+    names   = list(set(sources.values()))
+    renditions = {}
+    for start in range(0, len(names), 1000):
+        for source, manifest in (ImageDerivativeSet.objects.filter(source__in=names[start:start + 1000])
+                                 .values_list('source', 'renditions')):
+            name = rendition_name({'renditions': manifest}, THUMBNAIL_WIDTH)
+            if name:
+                renditions[source] = default_storage.url(name)
+    return {url: renditions.get(source, url) for url, source in sources.items()}
+
+
+def _product_entries():
+    cards = list(
+        ProductCard.objects.filter(is_active=True)
+        .order_by('-is_featured', '-rating_count', 'name', 'product_id')
+        # brand name from Brand: cards keep the name they were built with
+        .values_list('name', 'slug', 'product__brand__name', 'primary_image_url', 'base_price')
+    )
+    thumbnails = _thumbnails(row[3] for row in cards)
+    return [
+        (f'{name} {brand or ""}', {
+            'type':  'product',
+            'name':  name,
+            'brand': brand or '',
+            'url':   f'/product/{slug}/',
+            'image': thumbnails.get(image) or None,
+            'price': str(price),
+        })
+        for name, slug, brand, image, price in cards
+    ]
+
+
+def _counted(model, field):
+    """Active rows of Brand / Category with their active product counts, most products first."""
+    counts = dict(
+        Product.objects.filter(is_active=True).values(field)
+        .annotate(n=Count('id')).order_by().values_list(field, 'n')
+    )
+    rows = model.objects.filter(is_active=True).values_list('id', 'name', 'slug')
+    return sorted(rows, key=lambda row: (-counts.get(row[0], 0), row[1]))
+
+
+def _keyword_entries():
+    keywords = list(PopularSearch.objects.filter(is_active=True).order_by('display_order', 'id')
+                    .values_list('keyword', flat=True))
+    counts = dict(
+        SearchQueryDaily.objects.filter(day__gte=window_start(SEARCH_WINDOW), query__in=keywords)
+        .values('query').annotate(n=Sum('searches')).order_by().values_list('query', 'n')
+    )
+    ranked = sorted(keywords, key=lambda keyword: -counts.get(keyword, 0))  # stable: display_order breaks ties
+    entries = [(keyword, {'type': 'popular', 'name': keyword, 'url': f'/search/?q={keyword}'}) for keyword in ranked]
+    return entries, keywords
+
+
+class AutocompleteIndex:
+
+    def __init__(self, version):
+        self.version  = version
+        self.built_at = time.monotonic()
+        keywords, curated = _keyword_entries()
+        self.kinds = {
+            'product':  _Dictionary(_product_entries()),
+            'brand':    _Dictionary([
+                (name, {'type': 'brand', 'name': name, 'url': f'/brand/{slug}/'})
+                for _id, name, slug in _counted(Brand, 'brand_id')
+            ]),
+            'category': _Dictionary([
+                (name, {'type': 'category', 'name': name, 'url': f'/category/{slug}/'})
+                for _id, name, slug in _counted(Category, 'category_id')
+            ]),
+            'popular':  _Dictionary(keywords),
+        }
+        # Spelling vocabulary for search/fuzzy.py; brand / category names also as joined pairs ("rayban")
+        self.vocabulary = build_vocabulary(
+            [w for kind in ('product', 'brand', 'category') for w in self.kinds[kind].words],
+            self.kinds['brand'].words + self.kinds['category'].words,
+        )
+        self.curated = curated  # PopularSearch keywords in display_order, for the empty search box
+
+    def suggest(self, query, limits):
+        """{kind: [payload]} with up to limits[kind] suggestions of each kind for `query`."""
+        query_words = words(query)
+        if not query_words:
+            return {kind: [] for kind in limits}
+        return {kind: self.kinds[kind].match(query_words, limit) for kind, limit in limits.items()}
+
+
+def _rebuild(version):
+    global _index, _building
+    try:
+        with primary_reads():
+            _index = AutocompleteIndex(version)
+    finally:
+        _building = False
+        connection.close()
+
+
+def get_autocomplete_index():
+    """The process-local index; a changed version starts a background rebuild."""
+    global _index, _building
+    index   = _index
+    version = index_version()
+    if index is not None and (index.version == version or _building
+                              or time.monotonic() - index.built_at < REBUILD_INTERVAL):
+        return index
+    with _lock:
+        if _index is None:
+            with primary_reads():
+                _index = AutocompleteIndex(version)
+        elif not _building and _index.version != version:
+            _building = True
+            threading.Thread(target=_rebuild, args=(version,), daemon=True).start()
+        return _index
@@ -0,0 +1,147 @@
+# search/click_priors.py
+"""
+Click-through priors for search ranking.
+
+Result links report clicks to `search_click`, which logs them through
+search/query_log.py as SearchQuery rows carrying clicked_product_id.
+`manage.py compute_search_click_priors` — run nightly — turns the last
+WINDOW_DAYS of them into one SearchClickPrior row per (normalised query,
+product):
+
+    prior = min(1, clicks(q, p) / (searches(q) + SMOOTHING))
+
+searches(q) comes from the daily rollups (search/rollups.py). SMOOTHING
+counts as that many extra searches without a click, so a product clicked
+twice after three searches does not outrank one clicked 300 times in
+1,000. Only the MAX_PER_QUERY most clicked products of queries with at
+least MIN_CLICKS clicks are kept.
+
+Each process loads the table once per job run (a version stamp in the
+cache) as {normalised query: (sorted product ids, priors)}, and
+search/engine.py multiplies relevance scores by 1 + CLICK_WEIGHT · prior —
+ranking reads nothing from the database per request.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from catalog.bulk_sql import insert_rows
+from core.db_router import primary_reads
+from .models import SearchClickPrior, SearchQuery, SearchQueryDaily
+from .rollups import window_start
+from .text import normalized_query
+
+
+WINDOW_DAYS   = 90
+SMOOTHING     = 20
+MIN_CLICKS    = 3
+MAX_PER_QUERY = 50
+CLICK_WEIGHT  = 2.0
+VERSION_KEY   = 'search_click_priors:version'
+
+_lock   = threading.Lock()
+_priors = None
+
+
+# ── Versions ──────────────────────────────────────────────────────────────────
+
+def priors_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_priors_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+# ── Batch job ─────────────────────────────────────────────────────────────────
+
+def compute_click_priors(days=WINDOW_DAYS):
+    """Replace the SearchClickPrior table from the last `days` days. Returns the number of rows."""
+    since = window_start(days)
+
+    searches = defaultdict(int)
+    for query, n in (SearchQueryDaily.objects.filter(day__gte=since)
+                     .values('query').annotate(n=Sum('searches')).order_by().values_list('query', 'n')):
+        searches[normalized_query(query)] += n
+
+    clicks = defaultdict(lambda: defaultdict(int))
+    for query, product_id, n in (
+        SearchQuery.objects
+        .filter(created_at__gte=timezone.now() - timedelta(days=days), clicked_product_id__isnull=False)
+        .values('query', 'clicked_product_id').annotate(n=Count('id')).order_by()
+        .values_list('query', 'clicked_product_id', 'n')
+    ):
+        clicks[normalized_query(query)][product_id] += n
+
+    rows = []
+    for query, products in clicks.items():
+        total_clicks = sum(products.values())
+        if not query or total_clicks < MIN_CLICKS:
+            continue
+        # The rollups may not include today's searches yet; never divide by fewer searches than clicks.
+        denominator = max(searches.get(query, 0), total_clicks) + SMOOTHING
+        best = sorted(products.items(), key=lambda item: -item[1])[:MAX_PER_QUERY]
+        rows.extend([query, product_id, n, round(min(1.0, n / denominator), 6)] for product_id, n in best)
+
+    with transaction.atomic():
+        SearchClickPrior.objects.all().delete()
+        insert_rows(SearchClickPrior, ['query', 'product_id', 'clicks', 'prior'], rows)
+    bump_priors_version()
+    return len(rows)
+
+
+# ── Lookup ────────────────────────────────────────────────────────────────────
+
+class ClickPriors:
+
+    def __init__(self, version):
+        self.version = version
+        grouped = defaultdict(list)
+        for query, product_id, prior in (SearchClickPrior.objects.order_by('query', 'product_id')
+                                         .values_list('query', 'product_id', 'prior').iterator(chunk_size=5000)):
+            grouped[query].append((product_id, prior))
+        self.table = {
+            query: (np.array([p for p, _ in pairs], np.int64), np.array([v for _, v in pairs], np.float32))
+            for query, pairs in grouped.items()
+        }
+
+    def get(self, query):
+        """(sorted product ids, priors) for a raw query, or None."""
+        return self.table.get(normalized_query(query))
+
+
+def get_click_priors():
+    global _priors
+    version = priors_version()
+    priors  = _priors
+    if priors is not None and priors.version == version:
+        return priors
+    with _lock, primary_reads():
+        if _priors is None or _priors.version != version:
+            _priors = ClickPriors(version)
+        return _priors
+
+
+def apply_priors(ids, scores, priors):
+    """Relevance `scores` of product `ids` with their click priors blended in (new array)."""
+    prior_ids, values = priors
+    at    = np.minimum(np.searchsorted(prior_ids, ids), len(prior_ids) - 1)
+    known = prior_ids[at] == ids
+    boost = np.ones(len(ids), np.float32)
+    boost[known] += CLICK_WEIGHT * values[at[known]]
+    return scores * boost
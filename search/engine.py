@@ -0,0 +1,355 @@
+# search/engine.py
+"""
+In-memory inverted index with BM25 ranking over SearchDocument rows.
+
+Every process holds the active documents as a *base* segment — column
+arrays (id, weighted length, brand, category, product type, price,
+created_at, name) and a
+postings map term → (row array, weighted tf array) — plus a small *overlay*
+segment with the documents that changed since the base was built. A query
+scores both with BM25 (k1=1.2, b=0.75):
+
+    idf(t)     = ln(1 + (N − df + 0.5) / (df + 0.5))
+    score(d)   = Σ idf(t) · tf·(k1 + 1) / (tf + k1·(1 − b + b·|d| / avgdl))
+
+tf and |d| are the field-weighted values from search/indexing.py. Products
+matching every query term are returned when there are any, otherwise those
+matching at least one. df counts base rows that were since replaced until
+the next rebuild — close enough for ranking.
+
+Freshness: search/indexing.py bumps a version in the cache after writing
+documents. A process that sees a new version reads the documents whose
+updated_at is past its watermark (minus SYNC_MARGIN, for transactions that
+commit out of order), marks their base rows dead and rebuilds the overlay;
+once more than OVERLAY_LIMIT documents have changed it rebuilds the base.
+
+Facets (brand, category, product type, price bucket) are counted over the
+same matches as the results, in the same pass; each dimension ignores its
+own filter so the sidebar shows what selecting another value would give.
+search_products() caches them per normalised query and filters.
+
+Relevance order also weighs what searchers clicked for the same query:
+search_products() passes the query's click priors (search/click_priors.py).
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Max
+
+from catalog.price_stats import PRICE_BUCKETS
+from core.db_router import primary_reads
+from .click_priors import apply_priors, get_click_priors
+from .models import SearchDocument
+from .text import normalized_query, tokenize
+
+
+K1 = 1.2
+B  = 0.75
+
+SORTS         = ('relevance', 'price_low', 'price_high', 'name', 'newest')
+VERSION_KEY   = 'search_index:version'
+SYNC_MARGIN   = timedelta(seconds=60)
+OVERLAY_LIMIT = 5000
+
+FACET_CACHE_TIMEOUT = 10 * 60  # seconds; keys also carry the index version
+
+_COLUMNS = ('product_id', 'terms', 'length', 'name', 'brand_id', 'category_id', 'product_type', 'base_price', 'created_at')
+
+_lock  = threading.Lock()
+_index = None
+
+# product_type ↔ small int code, for the segments' type column
+_TYPES      = []
+_TYPE_CODES = {}
+
+
+def _type_code(product_type):
+    code = _TYPE_CODES.get(product_type)
+    if code is None:
+        code = _TYPE_CODES[product_type] = len(_TYPES)
+        _TYPES.append(product_type)
+    return code
+
+
+# ── Versions ──────────────────────────────────────────────────────────────────
+
+def index_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_index_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+# ── Segments ──────────────────────────────────────────────────────────────────
+
+class _Segment:
+    """Column arrays and postings for a fixed set of documents (rows starting with _COLUMNS)."""
+
+    def __init__(self, rows):
+        n = len(rows)
+        self.ids        = np.fromiter((r[0] for r in rows), np.int64, n)
+        self.lengths    = np.fromiter((r[2] for r in rows), np.float32, n)
+        self.names      = [r[3] for r in rows]
+        self.brands     = np.fromiter((-1 if r[4] is None else r[4] for r in rows), np.int64, n)
+        self.categories = np.fromiter((-1 if r[5] is None else r[5] for r in rows), np.int64, n)
+        self.types      = np.fromiter((_type_code(r[6]) for r in rows), np.int16, n)
+        self.prices     = np.fromiter((float(r[7]) for r in rows), np.float64, n)
+        self.created    = np.fromiter((r[8].timestamp() if r[8] else 0.0 for r in rows), np.float64, n)
+        self.alive      = np.ones(n, dtype=bool)
+        self.position   = {pid: i for i, pid in enumerate(self.ids.tolist())}
+
+        term_rows, term_tfs = defaultdict(list), defaultdict(list)
+        for i, row in enumerate(rows):
+            for term, tf in row[1].items():
+                term_rows[term].append(i)
+                term_tfs[term].append(tf)
+        self.postings = {
+            term: (np.array(term_rows[term], np.int32), np.array(term_tfs[term], np.float32))
+            for term in term_rows
+        }
+
+    def df(self, term):
+        posting = self.postings.get(term)
+        return 0 if posting is None else len(posting[0])
+
+    def score(self, weights, avgdl):
+        """(BM25 scores, number of query terms matched) for every row."""
+        scores = np.zeros(len(self.ids), np.float32)
+        hits   = np.zeros(len(self.ids), np.int16)
+        for term, idf in weights.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            rows, tf = posting
+            norm = K1 * (1 - B + B * self.lengths[rows] / avgdl)
+            scores[rows] += idf * tf * (K1 + 1) / (tf + norm)
+            hits[rows]   += 1
+        return scores, hits
+
+
+# ── Index ─────────────────────────────────────────────────────────────────────
+
+class SearchIndex:
+
+    def __init__(self, version):
+        self.version   = version
+        # Read the watermark first: anything written meanwhile is picked up by the next sync.
+        self.watermark = SearchDocument.objects.aggregate(m=Max('updated_at'))['m']
+        rows = list(
+            SearchDocument.objects.filter(is_active=True)
+            .values_list(*_COLUMNS, 'updated_at').iterator(chunk_size=2000)
+        )
+        self.stamps  = {row[0]: row[9] for row in rows}  # product_id → updated_at of the version held
+        self.base    = _Segment(rows)
+        self.changed = {}  # product_id → row, documents newer than the base
+        self.overlay = _Segment([])
+        self._update_stats()
+
+    def _update_stats(self):
+        alive          = self.base.alive
+        self.doc_count = int(alive.sum()) + len(self.overlay.ids)
+        total_length   = float(self.base.lengths[alive].sum()) + float(self.overlay.lengths.sum())
+        self.avgdl     = total_length / self.doc_count if self.doc_count else 1.0
+
+    def sync(self, version):
+        """Apply documents written since the watermark. False if a full rebuild is due instead."""
+        docs = SearchDocument.objects.all()
+        if self.watermark is not None:
+            docs = docs.filter(updated_at__gte=self.watermark - SYNC_MARGIN)
+        rows = [
+            row for row in docs.values_list(*_COLUMNS, 'updated_at', 'is_active')
+            if self.stamps.get(row[0]) != row[9]  # the margin re-reads documents already held
+        ]
+        if len(self.changed) + len(rows) > OVERLAY_LIMIT:
+            return False
+
+        for row in rows:
+            product_id = row[0]
+            position   = self.base.position.get(product_id)
+            if position is not None:
+                self.base.alive[position] = False
+            if row[10]:
+                self.changed[product_id] = row[:10]
+            else:
+                self.changed.pop(product_id, None)
+            self.stamps[product_id] = row[9]
+            if self.watermark is None or row[9] > self.watermark:
+                self.watermark = row[9]
+
+        self.overlay = _Segment(list(self.changed.values()))
+        self.version = version
+        self._update_stats()
+        return True
+
+    def has_term(self, term):
+        return term in self.base.postings or term in self.overlay.postings
+
+    def search(self, query, brand_id=None, category_id=None, product_type=None, min_price=None, max_price=None,
+               sort='relevance', facets=True, priors=None):
+        """
+        {'ids', 'total', 'facets'} for `query`: matching product ids in `sort`
+        order after the filters, and (unless facets=False) facet counts over the
+        same matches — see _facet_counts(). `priors` are the query's click
+        priors (search/click_priors.py), blended into relevance order.
+        """
+        terms  = list(dict.fromkeys(tokenize(query)))
+        result = {'ids': [], 'total': 0, 'facets': empty_facets() if facets else None}
+        if not terms or not self.doc_count:
+            return result
+
+        weights = {}
+        for term in terms:
+            df = self.base.df(term) + self.overlay.df(term)
+            weights[term] = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+
+        segments = [(segment, *segment.score(weights, self.avgdl)) for segment in (self.base, self.overlay)]
+        need = len(terms)
+        if not any(((hits == need) & segment.alive).any() for segment, _scores, hits in segments):
+            need = 1
+
+        columns = defaultdict(list)
+        for segment, scores, hits in segments:
+            matched = (hits >= need) & segment.alive
+            # One mask per filter; each facet is counted with every filter but its own.
+            masks = {
+                'brands':        segment.brands == brand_id if brand_id is not None else True,
+                'categories':    segment.categories == category_id if category_id is not None else True,
+                'product_types': segment.types == _TYPE_CODES.get(product_type, -1) if product_type is not None else True,
+                'price_buckets': ((segment.prices >= float(min_price)) if min_price is not None else True)
+                                 & ((segment.prices <= float(max_price)) if max_price is not None else True),
+            }
+            selected = matched & masks['brands'] & masks['categories'] & masks['product_types'] & masks['price_buckets']
+            if facets:
+                _facet_counts(result['facets'], segment, matched, masks)
+
+            rows = np.flatnonzero(selected)
+            columns['ids'].append(segment.ids[rows])
+            columns['scores'].append(scores[rows])
+            columns['prices'].append(segment.prices[rows])
+            columns['created'].append(segment.created[rows])
+            columns['names'].extend(segment.names[i] for i in rows.tolist())
+
+        ids, scores = np.concatenate(columns['ids']), np.concatenate(columns['scores'])
+        prices, created = np.concatenate(columns['prices']), np.concatenate(columns['created'])
+
+        if sort == 'price_low':
+            order = np.lexsort((-created, prices))
+        elif sort == 'price_high':
+            order = np.lexsort((-created, -prices))
+        elif sort == 'newest':
+            order = np.argsort(-created, kind='stable')
+        elif sort == 'name':
+            names = columns['names']
+            order = sorted(range(len(names)), key=lambda i: names[i].casefold())
+        else:
+            if priors is not None:
+                scores = apply_priors(ids, scores, priors)
+            order = np.lexsort((-created, -scores))
+
+        result['ids']   = ids[order].tolist()
+        result['total'] = len(result['ids'])
+        return result
+
+
+# ── Facets ────────────────────────────────────────────────────────────────────
+
+_BUCKET_BOUNDS = np.array([float(bound) for bound in PRICE_BUCKETS])
+
+
+def empty_facets():
+    return {
+        'brands':        {},  # brand id → matches
+        'categories':    {},  # category id → matches
+        'product_types': {},  # product_type → matches
+        'price_buckets': [
+            {'min': low, 'max': PRICE_BUCKETS[i + 1] if i + 1 < len(PRICE_BUCKETS) else None, 'count': 0}
+            for i, low in enumerate(PRICE_BUCKETS)
+        ],
+    }
+
+
+def _count_into(counts, values):
+    keys, n = np.unique(values, return_counts=True)
+    for key, count in zip(keys.tolist(), n.tolist()):
+        counts[key] = counts.get(key, 0) + count
+
+
+def _facet_counts(facets, segment, matched, masks):
+    """Add a segment's matches to `facets`, each dimension filtered by all the other dimensions' masks."""
+    def others(name):
+        mask = matched
+        for other, other_mask in masks.items():
+            if other != name:
+                mask = mask & other_mask
+        return mask
+
+    brands = segment.brands[others('brands')]
+    _count_into(facets['brands'], brands[brands >= 0])
+    categories = segment.categories[others('categories')]
+    _count_into(facets['categories'], categories[categories >= 0])
+    types = segment.types[others('product_types')]
+    for code, count in enumerate(np.bincount(types, minlength=len(_TYPES)).tolist()):
+        if count and _TYPES[code]:
+            facets['product_types'][_TYPES[code]] = facets['product_types'].get(_TYPES[code], 0) + count
+    buckets = np.searchsorted(_BUCKET_BOUNDS, segment.prices[others('price_buckets')], side='right') - 1
+    for i, count in enumerate(np.bincount(buckets[buckets >= 0], minlength=len(PRICE_BUCKETS)).tolist()):
+        facets['price_buckets'][i]['count'] += count
+
+
+def get_search_index():
+    """The process-local index, synced or rebuilt when the cached version has moved on."""
+    global _index
+    version = index_version()
+    index   = _index
+    if index is not None and index.version == version:
+        return index
+    # Read the primary: the version was bumped there, and rows a lagging
+    # replica hasn't got yet would never be picked up under it.
+    with _lock, primary_reads():
+        if _index is None or not (_index.version == version or _index.sync(version)):
+            _index = SearchIndex(version)
+        return _index
+
+
+def _facets_key(version, query, filters):
+    # sort orders the results but never changes the facets
+    described = sorted((name, str(value)) for name, value in filters.items() if name != 'sort' and value is not None)
+    digest = hashlib.md5(repr((normalized_query(query), described)).encode()).hexdigest()
+    return f'search_facets:{version}:{digest}'
+
+
+def search_products(query, **filters):
+    """
+    SearchIndex.search() on the process index with the query's click priors,
+    the facets cached per normalised query and filters.
+    """
+    index  = get_search_index()
+    key    = _facets_key(index.version, query, filters)
+    facets = cache.get(key)
+    result = index.search(query, facets=facets is None, priors=get_click_priors().get(query), **filters)
+    if facets is None:
+        cache.set(key, result['facets'], FACET_CACHE_TIMEOUT)
+    else:
+        result['facets'] = facets
+    return result
+
+
+def products_in_order(ids, queryset):
+    """The objects of `queryset` with `ids`, in the order of `ids` (one query)."""
+    objects = queryset.in_bulk(list(ids))
+    return [objects[pk] for pk in ids if pk in objects]
@@ -0,0 +1,137 @@
+# search/fuzzy.py
+"""
+Typo-tolerant query rewriting.
+
+"rayban", "oakly" or "acuvue oasis" found nothing: every query term has to
+exist in the index. correct_query() checks each query word against the
+search index and replaces the ones it has never seen with the closest word
+of a vocabulary built from brand, category and product names:
+
+    candidates   vocabulary words sharing padded trigrams with the word
+                 (Jaccard similarity ≥ MIN_SIMILARITY), found through a
+                 trigram → words postings map
+    accepted     Damerau-Levenshtein distance within the word's budget:
+                 none up to 2 characters, 1 up to 5, 2 beyond
+    best         smallest distance, then most frequent, then most similar
+
+Brand and category names also contribute their adjacent word pairs written
+together, so "rayban" becomes "ray ban". The vocabulary lives on the
+autocomplete index (search/autocomplete.py) and is rebuilt with it. Words
+the index knows cost a dict lookup each, so the check runs inline on every
+search.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+from .engine import get_search_index
+from .text import tokenize, words
+
+
+MIN_SIMILARITY = 0.2
+MAX_CANDIDATES = 200
+
+
+def _grams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_budget(word):
+    return 0 if len(word) <= 2 else 1 if len(word) <= 5 else 2
+
+
+def edit_distance(a, b, limit):
+    """Optimal-string-alignment distance of `a` and `b`, or limit + 1 as soon as it must exceed `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class Vocabulary:
+
+    def __init__(self, counts, joins):
+        """counts: {word: frequency}; joins: {"rayban": ("ray ban", frequency)}."""
+        forms = {word: (word, n) for word, n in counts.items() if len(word) >= 3 and word.isalpha()}
+        for joined, (replacement, n) in joins.items():
+            forms.setdefault(joined, (replacement, n))
+
+        self.forms        = list(forms)
+        self.replacements = [forms[form][0] for form in self.forms]
+        self.counts       = [forms[form][1] for form in self.forms]
+        self.lengths      = np.fromiter((len(form) for form in self.forms), np.int16, len(self.forms))
+        self.gram_counts  = np.zeros(len(self.forms), np.float32)
+        postings = defaultdict(list)
+        for i, form in enumerate(self.forms):
+            grams = _grams(form)
+            self.gram_counts[i] = len(grams)
+            for gram in grams:
+                postings[gram].append(i)
+        self.postings = {gram: np.array(rows, np.int32) for gram, rows in postings.items()}
+
+    def correct(self, word):
+        """The replacement for a misspelt `word`, or None if nothing is close enough."""
+        budget = edit_budget(word)
+        grams  = _grams(word)
+        rows   = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not budget or not rows:
+            return None
+
+        # Only forms sharing a trigram are scored, and only those of a reachable length.
+        candidates, shared = np.unique(np.concatenate(rows), return_counts=True)
+        near       = np.abs(self.lengths[candidates] - len(word)) <= budget
+        candidates, shared = candidates[near], shared[near]
+        similarity = shared / (len(grams) + self.gram_counts[candidates] - shared)
+        keep       = similarity >= MIN_SIMILARITY
+        candidates, similarity = candidates[keep], similarity[keep]
+        order      = np.argsort(-similarity, kind='stable')[:MAX_CANDIDATES]
+
+        best = None
+        for i, sim in zip(candidates[order].tolist(), similarity[order].tolist()):
+            distance = edit_distance(word, self.forms[i], budget)
+            if distance <= budget:
+                key = (distance, -self.counts[i], -sim)
+                if best is None or key < best[0]:
+                    best = (key, i)
+        return None if best is None else self.replacements[best[1]]
+
+
+def build_vocabulary(names, compound_names):
+    """Vocabulary over the word lists `names`; adjacent pairs of `compound_names` are also added joined."""
+    counts, joins = defaultdict(int), {}
+    for entry_words in names:
+        for word in set(entry_words):
+            counts[word] += 1
+    for entry_words in compound_names:
+        for first, second in zip(entry_words, entry_words[1:]):
+            replacement, n = joins.get(first + second, (f'{first} {second}', 0))
+            joins[first + second] = (replacement, n + 1)
+    return Vocabulary(counts, joins)
+
+
+def correct_query(query):
+    """`query` with the words the search index does not know replaced by close vocabulary words; None if none were."""
+    from .autocomplete import get_autocomplete_index  # builds its vocabulary with this module
+
+    index      = get_search_index()
+    vocabulary = get_autocomplete_index().vocabulary
+    corrected, changed = [], False
+    for word in words(query):
+        if all(index.has_term(term) for term in tokenize(word)):
+            corrected.append(word)
+            continue
+        replacement = vocabulary.correct(word)
+        corrected.append(replacement or word)
+        changed = changed or replacement is not None
+    return ' '.join(corrected) if changed else None
@@ -0,0 +1,138 @@
+# search/indexing.py
+"""
+Builds SearchDocument rows from products.
+
+Each field is tokenised with search/text.py and its term counts are added
+with the field's boost, so a product's document is one {term: weight} map
+plus its weighted length — what BM25 in search/engine.py needs:
+
+    name ×3 · sku ×3 · brand ×2.5 · category ×1.5 · product type ×1.5
+    tags ×1.5 · specification values ×1 · short description ×1 · description ×0.5
+
+search/signals.py refreshes a product's document after commit whenever it
+or its brand, category, tags or specifications change;
+`manage.py rebuild_search_index` (re)builds all of them.
+"""
+
+import threading
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from catalog.bulk_sql import insert_rows
+from catalog.models import Product, ProductSpecification, ProductTagRelation
+from .engine import bump_index_version
+from .models import SearchDocument
+from .text import tokenize
+
+
+FIELD_BOOSTS = {
+    'name':              3.0,
+    'sku':               3.0,
+    'brand':             2.5,
+    'category':          1.5,
+    'product_type':      1.5,
+    'tags':              1.5,
+    'specs':             1.0,
+    'short_description': 1.0,
+    'description':       0.5,
+}
+
+BATCH_SIZE = 1000
+
+DOCUMENT_FIELDS = ['is_active', 'terms', 'length', 'name', 'brand_id', 'category_id', 'product_type',
+                   'base_price', 'created_at', 'updated_at']
+
+
+def build_terms(fields):
+    """({term: weighted frequency}, weighted length) for {field: text}."""
+    terms, length = Counter(), 0.0
+    for field, text in fields.items():
+        boost  = FIELD_BOOSTS[field]
+        tokens = tokenize(text)
+        for token in tokens:
+            terms[token] += boost
+        length += boost * len(tokens)
+    return {term: round(weight, 2) for term, weight in terms.items()}, round(length, 2)
+
+
+def _document_rows(product_ids, now):
+    types = dict(Product.PRODUCT_TYPES)
+    products = (
+        Product.objects.filter(id__in=product_ids)
+        .values('id', 'sku', 'name', 'product_type', 'short_description', 'description', 'base_price',
+                'created_at', 'is_active', 'brand_id', 'brand__name', 'category_id', 'category__name')
+    )
+    tags, specs = defaultdict(list), defaultdict(list)
+    for product_id, name in ProductTagRelation.objects.filter(product_id__in=product_ids).values_list('product_id', 'tag__name'):
+        tags[product_id].append(name)
+    for product_id, value in ProductSpecification.objects.filter(product_id__in=product_ids).values_list('product_id', 'spec_value'):
+        specs[product_id].append(value)
+
+    rows = []
+    for p in products:
+        if not p['is_active']:
+            continue
+        sku = p['sku'] or ''
+        terms, length = build_terms({
+            'name':              p['name'],
+            # "RB-3025" is also found as "rb3025"
+            'sku':               f"{sku} {''.join(ch for ch in sku if ch.isalnum())}",
+            'brand':             p['brand__name'] or '',
+            'category':          p['category__name'] or '',
+            'product_type':      types.get(p['product_type'], p['product_type']),
+            'tags':              ' '.join(tags[p['id']]),
+            'specs':             ' '.join(specs[p['id']]),
+            'short_description': p['short_description'],
+            'description':       p['description'],
+        })
+        rows.append([p['id'], True, terms, length, p['name'][:255], p['brand_id'], p['category_id'],
+                     p['product_type'], p['base_price'], p['created_at'], now])
+
+    # Deleted or inactive products: tombstones.
+    for product_id in set(product_ids) - {row[0] for row in rows}:
+        rows.append([product_id, False, {}, 0.0, '', None, None, '', 0, None, now])
+    return rows
+
+
+def refresh_search_documents(product_ids=None, batch_size=BATCH_SIZE):
+    """Rebuild the documents of `product_ids` (all products if None). Returns the number of rows written."""
+    if product_ids is None:
+        product_ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+    product_ids = sorted(set(product_ids))
+
+    written = 0
+    for start in range(0, len(product_ids), batch_size):
+        batch = product_ids[start:start + batch_size]
+        rows  = _document_rows(batch, timezone.now())
+        insert_rows(
+            SearchDocument,
+            ['product_id'] + DOCUMENT_FIELDS,
+            rows,
+            conflict_field='product_id',
+            update_fields=DOCUMENT_FIELDS,
+        )
+        written += len(rows)
+    if written:
+        transaction.on_commit(bump_index_version)
+    return written
+
+
+# ── Deferred refresh ──────────────────────────────────────────────────────────
+
+_pending = threading.local()
+
+
+def _flush_pending():
+    ids = getattr(_pending, 'ids', None)
+    if ids:
+        _pending.ids = set()
+        refresh_search_documents(ids)
+
+
+def schedule_search_refresh(product_ids):
+    if not hasattr(_pending, 'ids'):
+        _pending.ids = set()
+    _pending.ids.update(product_ids)
+    transaction.on_commit(_flush_pending)
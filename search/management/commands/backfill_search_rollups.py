@@ -0,0 +1,43 @@
+# search/management/commands/backfill_search_rollups.py
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from search.rollups import first_search_day, rollup_days
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Not a date (YYYY-MM-DD): {value}')
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily search analytics rollups for past days (all of SearchQuery by default).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=_date, help='first day (YYYY-MM-DD); default: the first logged search')
+        parser.add_argument('--until', type=_date, help='last day (YYYY-MM-DD); default: today')
+
+    def handle(self, *args, **options):
+        first = options['since'] or first_search_day()
+        last  = options['until'] or timezone.localdate()
+        if first is None:
+            self.stdout.write('No searches logged yet.')
+            return
+        if first > last:
+            raise CommandError('--since is after --until.')
+
+        started = time.monotonic()
+
+        def progress(day, queries):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {day}: {queries} queries')
+
+        days = rollup_days(first, last, progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up {days} day(s) ({first} to {last}) in {time.monotonic() - started:.1f}s.'
+        ))
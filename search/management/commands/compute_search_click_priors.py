@@ -0,0 +1,23 @@
+# search/management/commands/compute_search_click_priors.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from search.click_priors import WINDOW_DAYS, compute_click_priors
+from search.rollups import rollup_recent
+
+
+class Command(BaseCommand):
+    help = ('Recompute the click-through priors blended into search relevance from the last --days days of '
+            'result clicks. Schedule it nightly.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=WINDOW_DAYS, help=f'Click window (default {WINDOW_DAYS}).')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rollup_recent()  # searches per query come from the rollups
+        rows = compute_click_priors(options['days'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {rows} click prior(s) in {time.monotonic() - started:.1f}s.'
+        ))
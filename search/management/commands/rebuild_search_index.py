@@ -0,0 +1,22 @@
+# search/management/commands/rebuild_search_index.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from search.indexing import BATCH_SIZE, refresh_search_documents
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the SearchDocument rows the search index is built from (all products, or the given ids). '
+            'Running processes pick the changes up on their next query.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_ids', nargs='*', type=int)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = refresh_search_documents(options['product_ids'] or None, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {written} product(s) in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,16 @@
+# search/management/commands/rollup_search_analytics.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from search.rollups import rollup_recent
+
+
+class Command(BaseCommand):
+    help = ('Roll up SearchQuery rows into the daily search analytics tables, from the last rolled-up day '
+            'through today. Safe to run repeatedly; schedule it every few minutes.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        days = rollup_recent()
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {days} day(s) in {time.monotonic() - started:.1f}s.'))
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.25 on 2026-10-16 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('product_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('is_active', models.BooleanField(default=True)),
+                ('terms', models.JSONField(blank=True, default=dict)),
+                ('length', models.FloatField(default=0)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('brand_id', models.BigIntegerField(blank=True, null=True)),
+                ('category_id', models.BigIntegerField(blank=True, null=True)),
+                ('base_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'db_table': 'search_documents',
+            },
+        ),
+    ]
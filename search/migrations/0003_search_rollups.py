@@ -0,0 +1,43 @@
+# Generated by Django 4.2.25 on 2026-10-16 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_search_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDailyTotal',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('zero_results', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('distinct_queries', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'search_daily_totals',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchQueryDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('query', models.CharField(max_length=500)),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('zero_results', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'search_query_daily',
+                'unique_together': {('day', 'query')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.25 on 2026-10-16 20:50
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def copy_product_types(apps, schema_editor):
+    Product = apps.get_model('catalog', 'Product')
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    SearchDocument.objects.update(product_type=Coalesce(
+        Subquery(Product.objects.filter(id=OuterRef('product_id')).values('product_type')[:1]),
+        Value(''),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_contact_lens_power_matrix'),
+        ('search', '0003_search_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchdocument',
+            name='product_type',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.RunPython(copy_product_types, migrations.RunPython.noop),
+    ]
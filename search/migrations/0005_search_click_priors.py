@@ -0,0 +1,27 @@
+# Generated by Django 4.2.25 on 2026-10-16 20:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0004_search_document_product_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchClickPrior',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=500)),
+                ('product_id', models.BigIntegerField()),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('prior', models.FloatField(default=0)),
+            ],
+            options={
+                'db_table': 'search_click_priors',
+                'unique_together': {('query', 'product_id')},
+            },
+        ),
+    ]
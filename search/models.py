@@ -36,4 +36,76 @@ class PopularSearch(models.Model):
     
     class Meta:
         db_table = 'popular_searches'
-        ordering = ['display_order']
\ No newline at end of file
+        ordering = ['display_order']
+
+class SearchDocument(models.Model):
+    """
+    Tokenised, field-weighted text of one product for the in-memory search
+    index (see search/engine.py). Rows outlive their product: a deleted or
+    deactivated product leaves a tombstone (is_active=False) so every
+    process can drop it from its index.
+    """
+    product_id = models.BigIntegerField(primary_key=True)
+    is_active = models.BooleanField(default=True)
+
+    terms = models.JSONField(default=dict, blank=True)  # term → field-weighted frequency
+    length = models.FloatField(default=0)  # field-weighted token count
+
+    # Filter / sort attributes, so results never go back to catalog_products
+    name = models.CharField(max_length=255, blank=True)
+    brand_id = models.BigIntegerField(null=True, blank=True)
+    category_id = models.BigIntegerField(null=True, blank=True)
+    product_type = models.CharField(max_length=50, blank=True)
+    base_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    created_at = models.DateTimeField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'search_documents'
+
+
+class SearchQueryDaily(models.Model):
+    """Searches of one query on one day, rolled up from SearchQuery by search/rollups.py."""
+    day = models.DateField()
+    query = models.CharField(max_length=500)
+
+    searches = models.PositiveIntegerField(default=0)
+    zero_results = models.PositiveIntegerField(default=0)  # searches that found nothing
+    clicks = models.PositiveIntegerField(default=0)  # searches with a clicked_product_id
+
+    class Meta:
+        db_table = 'search_query_daily'
+        unique_together = [('day', 'query')]
+
+
+class SearchDailyTotal(models.Model):
+    """All searches of one day, rolled up with SearchQueryDaily."""
+    day = models.DateField(primary_key=True)
+
+    searches = models.PositiveIntegerField(default=0)
+    zero_results = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+    distinct_queries = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'search_daily_totals'
+        ordering = ['-day']
+
+
+class SearchClickPrior(models.Model):
+    """
+    Smoothed click-through rate of one product for one normalised query,
+    computed nightly by search/click_priors.py and blended into ranking.
+    """
+    query = models.CharField(max_length=500)  # search.text.normalized_query()
+    product_id = models.BigIntegerField()
+
+    clicks = models.PositiveIntegerField(default=0)
+    prior = models.FloatField(default=0)
+
+    class Meta:
+        db_table = 'search_click_priors'
+        unique_together = [('query', 'product_id')]
@@ -0,0 +1,122 @@
+# search/query_log.py
+"""
+Buffered SearchQuery logging.
+
+search_view used to insert a SearchQuery row per request — and create a
+session first for anonymous visitors, a second write. Searches are now
+appended to a bounded in-process queue and written by a background thread
+in batches, whichever comes first of:
+
+    FLUSH_SIZE       queued searches
+    FLUSH_INTERVAL   seconds since the last flush
+
+When the queue already holds QUEUE_SIZE searches (the database is slow or
+down) new ones are dropped and counted rather than blocking requests. A
+failed batch is counted and discarded. stats() returns the counters of
+this process; whatever is still queued at interpreter exit is flushed.
+
+Rows are written with catalog.bulk_sql.insert_rows so each keeps the time
+of its search — bulk_create() would stamp them all with the flush time
+through created_at's auto_now_add.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from catalog.bulk_sql import insert_rows
+from .models import SearchQuery
+
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE     = 10000
+FLUSH_SIZE     = 200
+FLUSH_INTERVAL = 5  # seconds
+
+FIELDS = ['user_id', 'session_key', 'query', 'results_count', 'filters_applied', 'clicked_product_id', 'created_at']
+
+_queue   = queue.Queue(maxsize=QUEUE_SIZE)
+_wake    = threading.Event()
+_lock    = threading.Lock()
+_stats   = {'queued': 0, 'written': 0, 'dropped': 0, 'failed': 0}
+_started = None  # pid that owns the flusher thread (restarted after a fork)
+
+
+# ── Logging ───────────────────────────────────────────────────────────────────
+
+def log_search(query, results_count, filters_applied=None, user_id=None, session_key=None, clicked_product_id=None):
+    """
+    Queue a SearchQuery row; never blocks and never touches the database.
+    A click on a result is logged as a row of its own with clicked_product_id.
+    """
+    _ensure_flusher()
+    row = [user_id, session_key, query[:500], results_count, filters_applied or {}, clicked_product_id, timezone.now()]
+    try:
+        _queue.put_nowait(row)
+    except queue.Full:
+        _stats['dropped'] += 1
+        if _stats['dropped'] % 1000 == 1:
+            logger.warning('Search log queue full: %d searches dropped so far', _stats['dropped'])
+        return
+    _stats['queued'] += 1
+    if _queue.qsize() >= FLUSH_SIZE:
+        _wake.set()
+
+
+def stats():
+    return dict(_stats, pending=_queue.qsize())
+
+
+# ── Flushing ──────────────────────────────────────────────────────────────────
+
+def flush():
+    """Write everything queued so far. Returns the number of rows written."""
+    written = 0
+    while True:
+        rows = []
+        while len(rows) < FLUSH_SIZE:
+            try:
+                rows.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not rows:
+            return written
+        try:
+            insert_rows(SearchQuery, FIELDS, rows)
+        except DatabaseError:
+            _stats['failed'] += len(rows)
+            logger.exception('Could not write %d search log rows', len(rows))
+            return written
+        _stats['written'] += len(rows)
+        written += len(rows)
+
+
+def _run():
+    while True:
+        _wake.wait(FLUSH_INTERVAL)
+        _wake.clear()
+        try:
+            flush()
+        except Exception:
+            logger.exception('Search log flush failed')
+        finally:
+            connection.close()  # the thread's own connection; reopened at the next flush
+
+
+def _ensure_flusher():
+    global _started
+    if _started == os.getpid():
+        return
+    with _lock:
+        if _started != os.getpid():
+            _started = os.getpid()
+            threading.Thread(target=_run, name='search-log-flusher', daemon=True).start()
+
+
+atexit.register(flush)
@@ -0,0 +1,99 @@
+# search/result_cache.py
+"""
+Result cache for search pages.
+
+A handful of head queries ("ray ban", "contact lens", "sunglasses") make up
+most search traffic. search_page() caches what a results page needs — the
+page's product ids in order, the total, the facets and the spelling
+correction — under
+
+    normalised query · filters · sort · page · language
+    · catalog version (catalog/catalog_version.py) · search index version
+    · click priors version (search/click_priors.py)
+
+The catalog version is bumped after every product, brand or category
+write, the index version whenever search documents change (tags,
+specifications), the priors version by each priors job run, so a stale
+entry is never served; entries also expire
+after RESULT_CACHE_TIMEOUT.
+
+Hits and misses are counted in the shared cache (all processes) and shown
+by search_analytics.
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.translation import get_language
+
+from catalog.catalog_version import catalog_version
+from core.db_router import primary_reads
+from .click_priors import priors_version
+from .engine import get_search_index, search_products
+from .fuzzy import correct_query
+from .text import normalized_query
+
+
+RESULT_CACHE_TIMEOUT = 10 * 60  # seconds
+
+HITS_KEY   = 'search_results:hits'
+MISSES_KEY = 'search_results:misses'
+
+
+def _page_number(page):
+    try:
+        return max(int(page), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def _key(query, filters, sort, page):
+    described = sorted((name, str(value)) for name, value in filters.items() if value is not None)
+    digest = hashlib.md5(
+        repr((normalized_query(query), described, sort, page, get_language())).encode()
+    ).hexdigest()
+    return f'search_results:{catalog_version()}:{get_search_index().version}:{priors_version()}:{digest}'
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def search_page(query, filters, sort, page, per_page):
+    """
+    {'ids', 'total', 'page', 'facets', 'corrected_query'} for one results page.
+    `page` is taken like Paginator.get_page(): junk → 1, past the end → the last page.
+    """
+    page  = _page_number(page)
+    key   = _key(query, filters, sort, page)
+    entry = cache.get(key)
+    if entry is not None:
+        _count(HITS_KEY)
+        return entry
+
+    _count(MISSES_KEY)
+    with primary_reads():
+        corrected = correct_query(query)
+        result    = search_products(corrected or query, sort=sort, **filters)
+    page_obj  = Paginator(result['ids'], per_page).get_page(page)
+    entry = {
+        'ids':             list(page_obj.object_list),
+        'total':           result['total'],
+        'page':            page_obj.number,
+        'facets':          result['facets'],
+        'corrected_query': corrected,
+    }
+    cache.set(key, entry, RESULT_CACHE_TIMEOUT)
+    return entry
+
+
+def cache_stats():
+    counts  = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': round(100 * hits / lookups, 1) if lookups else None}
@@ -0,0 +1,103 @@
+# search/rollups.py
+"""
+Daily search analytics rollups.
+
+trending_searches and search_analytics grouped 30 days of raw
+search_queries rows on every page view. SearchQueryDaily now holds one row
+per (day, query) — searches, zero-result searches, click-throughs — and
+SearchDailyTotal one row per day; the pages sum those instead.
+
+A day is rolled up by recomputing it from SearchQuery with one GROUP BY
+over that day's rows and replacing its rollup rows in a transaction, so
+runs are idempotent. Rows that arrive late (search/query_log.py flushes
+every few seconds, clicks are recorded after the search) are counted by
+the next run that covers their day.
+
+    manage.py rollup_search_analytics    the days since the last rollup,
+                                         re-doing the last REOPEN_DAYS —
+                                         run from cron every few minutes
+    manage.py backfill_search_rollups    any range of past days
+
+Days are local days in TIME_ZONE.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from catalog.bulk_sql import insert_rows
+from .models import SearchQuery, SearchQueryDaily, SearchDailyTotal
+
+
+REOPEN_DAYS = 1  # a finished day is recomputed once more for rows flushed after midnight
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def rollup_day(day):
+    """Recompute the rollups of one day. Returns the number of distinct queries."""
+    start, end = _day_bounds(day)
+    rows = list(
+        SearchQuery.objects.filter(created_at__gte=start, created_at__lt=end)
+        .values('query')
+        .annotate(
+            # Click rows (search/query_log.py) are not searches of their own.
+            searches=Count('id', filter=Q(clicked_product_id__isnull=True)),
+            zero_results=Count('id', filter=Q(results_count=0, clicked_product_id__isnull=True)),
+            clicks=Count('clicked_product_id'),
+        )
+        .order_by()
+        .values_list('query', 'searches', 'zero_results', 'clicks')
+    )
+    with transaction.atomic():
+        SearchQueryDaily.objects.filter(day=day).delete()
+        insert_rows(
+            SearchQueryDaily,
+            ['day', 'query', 'searches', 'zero_results', 'clicks'],
+            [[day, *row] for row in rows],
+        )
+        SearchDailyTotal.objects.update_or_create(day=day, defaults={
+            'searches':         sum(row[1] for row in rows),
+            'zero_results':     sum(row[2] for row in rows),
+            'clicks':           sum(row[3] for row in rows),
+            'distinct_queries': len(rows),
+            'updated_at':       timezone.now(),
+        })
+    return len(rows)
+
+
+def rollup_days(first, last, on_progress=None):
+    """Roll up every day from `first` through `last`. Returns the number of days."""
+    day, done = first, 0
+    while day <= last:
+        queries = rollup_day(day)
+        done += 1
+        if on_progress:
+            on_progress(day, queries)
+        day += timedelta(days=1)
+    return done
+
+
+def first_search_day():
+    first = SearchQuery.objects.aggregate(m=Min('created_at'))['m']
+    return timezone.localdate(first) if first else None
+
+
+def rollup_recent(on_progress=None):
+    """The incremental job: from the last rolled-up day (re-done) through today; all history on the first run."""
+    today = timezone.localdate()
+    last  = SearchDailyTotal.objects.aggregate(m=Max('day'))['m']
+    first = last - timedelta(days=REOPEN_DAYS) if last else (first_search_day() or today)
+    return rollup_days(min(first, today), today, on_progress)
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+def window_start(days):
+    """First day of the last `days` days, for filtering rollups on `day`."""
+    return timezone.localdate() - timedelta(days=days)
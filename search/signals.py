@@ -0,0 +1,62 @@
+# search/signals.py
+"""
+Keeps SearchDocument rows (search/indexing.py) in step with the catalog:
+a product's document is refreshed after commit when the product, its tags
+or specifications, or its brand / category / tag names change. The
+autocomplete index (search/autocomplete.py) is marked stale after commit
+when a product, product image, brand, category or popular search changes.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from catalog.models import Product, ProductImage, ProductSpecification, ProductTag, ProductTagRelation, Brand, Category
+from .autocomplete import bump_index_version as bump_autocomplete_version
+from .indexing import schedule_search_refresh
+from .models import PopularSearch
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_document_for_product(sender, instance, **kwargs):
+    schedule_search_refresh([instance.pk])
+
+
+@receiver(post_save, sender=ProductSpecification)
+@receiver(post_delete, sender=ProductSpecification)
+@receiver(post_save, sender=ProductTagRelation)
+@receiver(post_delete, sender=ProductTagRelation)
+def refresh_document_for_child(sender, instance, **kwargs):
+    schedule_search_refresh([instance.product_id])
+
+
+@receiver(post_save, sender=Brand)
+def refresh_documents_for_brand(sender, instance, created, **kwargs):
+    if not created:
+        schedule_search_refresh(Product.objects.filter(brand=instance).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Category)
+def refresh_documents_for_category(sender, instance, created, **kwargs):
+    if not created:
+        schedule_search_refresh(Product.objects.filter(category=instance).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=ProductTag)
+def refresh_documents_for_tag(sender, instance, created, **kwargs):
+    if not created:
+        schedule_search_refresh(ProductTagRelation.objects.filter(tag=instance).values_list('product_id', flat=True))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=PopularSearch)
+@receiver(post_delete, sender=PopularSearch)
+def mark_autocomplete_stale(sender, instance, **kwargs):
+    transaction.on_commit(bump_autocomplete_version)
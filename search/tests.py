@@ -1,3 +1,188 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import translation
+
+from catalog.cards import refresh_product_cards
+from catalog.models import Brand, Category, Product, ProductImage
+from . import engine
+from .engine import SearchIndex, bump_index_version, get_search_index, index_version, products_in_order
+from .indexing import refresh_search_documents
+
+
+class SearchIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.frames     = Category.objects.create(name='Frames', slug='frames')
+        cls.sunglasses = Category.objects.create(name='Sunglasses', slug='sunglasses')
+        cls.rayban     = Brand.objects.create(name='Ray-Ban', slug='ray-ban', logo='brands/ray-ban.png')
+        cls.oakley     = Brand.objects.create(name='Oakley', slug='oakley', logo='brands/oakley.png')
+
+    def setUp(self):
+        cache.clear()
+        engine._index = None
+        self.addCleanup(setattr, engine, '_index', None)
+
+    def product(self, sku, name, price='300', category=None, brand=None, product_type='sunglasses', **fields):
+        product = Product.objects.create(
+            sku=sku, name=name, slug=sku.lower(), product_type=product_type, category=category or self.sunglasses,
+            brand=brand, base_price=Decimal(price), **fields,
+        )
+        refresh_search_documents([product.id])
+        return product
+
+    def index(self):
+        return SearchIndex(index_version())
+
+    def resync(self, index, *products):
+        refresh_search_documents([product.id for product in products])
+        bump_index_version()
+        self.assertTrue(index.sync(index_version()))
+
+    def test_name_outranks_description(self):
+        described = self.product('A-1', 'Round frame', description='An aviator inspired round frame.')
+        named     = self.product('A-2', 'Aviator classic')
+        self.assertEqual(self.index().search('aviator')['ids'], [named.id, described.id])
+
+    def test_all_terms_preferred_over_any(self):
+        both = self.product('A-1', 'Gold aviator')
+        self.product('A-2', 'Silver aviator')
+        index = self.index()
+        self.assertEqual(index.search('gold aviator')['ids'], [both.id])
+        self.assertEqual(index.search('gold wayfarer')['ids'], [both.id])  # no product has both: any term
+
+    def test_edit_after_build_replaces_base_posting(self):
+        edited = self.product('A-1', 'Aviator classic')
+        other  = self.product('A-2', 'Aviator sport')
+        index  = self.index()
+
+        edited.name = 'Wayfarer classic'
+        edited.save()
+        self.resync(index, edited)
+
+        self.assertFalse(index.base.alive[index.base.position[edited.id]])
+        self.assertIn(edited.id, index.changed)
+        self.assertEqual(index.search('aviator')['ids'], [other.id])
+        self.assertEqual(index.search('wayfarer')['ids'], [edited.id])
+        self.assertEqual(index.search('classic')['ids'], [edited.id])  # the base row is not returned too
+        self.assertEqual(index.doc_count, 2)
+
+    def test_deactivated_product_disappears(self):
+        product = self.product('A-1', 'Aviator classic')
+        self.product('A-2', 'Aviator sport')
+        index = self.index()
+
+        product.is_active = False
+        product.save()
+        self.resync(index, product)
+        self.assertNotIn(product.id, index.search('aviator')['ids'])
+        self.assertEqual(index.doc_count, 1)
+
+        product.is_active = True
+        product.save()
+        self.resync(index, product)
+        self.assertIn(product.id, index.search('aviator')['ids'])
+
+    def test_deleted_product_disappears(self):
+        product = self.product('A-1', 'Aviator classic')
+        index   = self.index()
+        product_id = product.id
+        product.delete()
+        refresh_search_documents([product_id])
+        bump_index_version()
+        self.assertTrue(index.sync(index_version()))
+        self.assertEqual(index.search('aviator')['ids'], [])
+        self.assertEqual(index.doc_count, 0)
+
+    def test_overlay_product_added_after_build(self):
+        built = self.product('A-1', 'Aviator classic')
+        index = self.index()
+        added = self.product('A-2', 'Aviator sport')
+        bump_index_version()
+        self.assertTrue(index.sync(index_version()))
+        self.assertEqual(sorted(index.search('aviator')['ids']), sorted([built.id, added.id]))
+
+    def test_get_search_index_syncs_on_version_change(self):
+        product = self.product('A-1', 'Aviator classic')
+        index   = get_search_index()
+        self.assertIs(get_search_index(), index)
+        product.name = 'Wayfarer classic'
+        product.save()
+        refresh_search_documents([product.id])
+        bump_index_version()
+        self.assertIs(get_search_index(), index)  # synced in place, not rebuilt
+        self.assertEqual(index.search('wayfarer')['ids'], [product.id])
+
+    def test_facet_counts_match_filtered_results(self):
+        self.product('A-1', 'Aviator gold', '150', brand=self.rayban)
+        self.product('A-2', 'Aviator silver', '650', brand=self.rayban, category=self.frames, product_type='eyeglasses')
+        self.product('A-3', 'Aviator sport', '1200', brand=self.oakley)
+        self.product('A-4', 'Aviator kids', '90', category=self.frames, product_type='eyeglasses')
+        edited = self.product('A-5', 'Round', '400', brand=self.oakley)
+        index  = self.index()
+        edited.name = 'Aviator round'  # in the overlay: counted too
+        edited.save()
+        self.resync(index, edited)
+
+        facets = index.search('aviator')['facets']
+        for brand_id, count in facets['brands'].items():
+            self.assertEqual(index.search('aviator', brand_id=brand_id, facets=False)['total'], count)
+        for category_id, count in facets['categories'].items():
+            self.assertEqual(index.search('aviator', category_id=category_id, facets=False)['total'], count)
+        for product_type, count in facets['product_types'].items():
+            self.assertEqual(index.search('aviator', product_type=product_type, facets=False)['total'], count)
+        self.assertEqual(facets['brands'], {self.rayban.id: 2, self.oakley.id: 2})
+        self.assertEqual(sum(bucket['count'] for bucket in facets['price_buckets']), 5)
+
+        # A filter narrows the other dimensions but not its own.
+        filtered = index.search('aviator', brand_id=self.oakley.id)
+        self.assertEqual(filtered['total'], 2)
+        self.assertEqual(filtered['facets']['brands'], facets['brands'])
+        self.assertEqual(filtered['facets']['product_types'], {'sunglasses': 2})
+
+    def test_products_in_order(self):
+        first  = self.product('A-1', 'Aviator classic')
+        second = self.product('A-2', 'Aviator sport')
+        products = products_in_order([second.id, 0, first.id], Product.objects.all())
+        self.assertEqual(products, [second, first])
+
+
+class SearchViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Sunglasses', slug='sunglasses')
+        brand    = Brand.objects.create(name='Ray-Ban', slug='ray-ban', logo='brands/ray-ban.png')
+        for i, name in enumerate(['Aviator'] * 2 + ['Wayfarer'] * 6):
+            product = Product.objects.create(sku=f'S-{i}', name=f'{name} {i}', slug=f's-{i}', product_type='sunglasses',
+                                             category=category, brand=brand, base_price=Decimal('300'))
+            ProductImage.objects.create(product=product, image=f'products/s-{i}.jpg', is_primary=True)
+        refresh_product_cards()
+        refresh_search_documents()
+
+    def setUp(self):
+        cache.clear()
+        engine._index = None
+        self.addCleanup(setattr, engine, '_index', None)
+
+    def search(self, query):
+        with translation.override('en'):
+            url = reverse('search:search')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
 
-# Create your tests here.
+    def test_result_tiles_use_cards_and_prefetched_manifests(self):
+        self.search('round')  # builds the index
+        response, two = self.search('aviator')
+        self.assertEqual(len(response.context['products']), 2)
+        self.assertContains(response, 'products/s-0.jpg')
+        self.assertEqual(set(response.context['image_manifests']), {'products/s-0.jpg', 'products/s-1.jpg'})
+        _response, six = self.search('wayfarer')
+        self.assertEqual(six, two)  # no query per tile
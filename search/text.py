@@ -0,0 +1,103 @@
+# search/text.py
+"""
+Tokenising and normalisation shared by indexing and querying.
+
+English: NFKC, case folding, accents stripped, a few stop words dropped
+and a light plural stemmer (lens / lenses → len, glasses → glass,
+case / cases → cas) — both sides go through the same function, so only
+consistency matters, not linguistic correctness.
+
+Arabic: diacritics and tatweel removed, alef / yeh / teh marbuta / hamza
+carriers folded (أ إ آ ٱ → ا, ى → ي, ة → ه, ؤ → و, ئ → ي), Arabic-Indic
+digits mapped to ASCII, the definite article (with و / ب / ك / ف / ل) and
+the plural / feminine suffixes ات ون ين ه stripped from longer words.
+"""
+
+import re
+import unicodedata
+
+
+TOKEN_RE = re.compile(r'[^\W_]+(?:\.\d+)?')  # words, codes and decimals like 1.56
+
+ARABIC_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')  # incl. tatweel
+ARABIC_FOLD = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ة': 'ه', 'ؤ': 'و', 'ئ': 'ي',
+    '\u066b': '.',  # Arabic decimal separator
+    **{chr(0x0660 + i): str(i) for i in range(10)},  # ٠-٩
+    **{chr(0x06f0 + i): str(i) for i in range(10)},  # ۰-۹
+})
+ARABIC_PREFIXES = ('وال', 'بال', 'كال', 'فال', 'لل', 'ال')
+ARABIC_SUFFIXES = ('ات', 'ون', 'ين', 'ه')
+
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'by', 'for', 'from', 'in', 'of', 'on', 'or', 'the', 'to', 'with',
+    'في', 'من', 'مع', 'علي', 'الي', 'و',
+})
+
+
+def _is_arabic(token):
+    return any('\u0600' <= ch <= '\u06ff' for ch in token)
+
+
+def _stem_arabic(token):
+    for prefix in ARABIC_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 3:
+            token = token[len(prefix):]
+            break
+    for suffix in ARABIC_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def _stem_english(token):
+    if len(token) <= 3 or not token.isalpha() or not token.isascii():
+        return token
+    if token.endswith('ies') and len(token) > 4:
+        return token[:-3] + 'y'
+    # Strip plural / silent-e endings until nothing changes, so every form of
+    # a word meets at the same stem (lens, lense, lenses → len).
+    while True:
+        if token.endswith('es') and token[:-2].endswith(('ss', 'x', 'z', 'ch', 'sh')):
+            stem = token[:-2]
+        elif token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+            stem = token[:-1]
+        elif token.endswith('e'):
+            stem = token[:-1]
+        else:
+            return token
+        if len(stem) < 3:
+            return token
+        token = stem
+
+
+def normalize(text):
+    """Case-folded, accent-free text with Arabic letter variants folded."""
+    text = text or ''
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = ARABIC_DIACRITICS.sub('', text).translate(ARABIC_FOLD)
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    """Index terms of `text`, in order (duplicates kept)."""
+    terms = []
+    for token in TOKEN_RE.findall(normalize(text)):
+        if token in STOP_WORDS:
+            continue
+        terms.append(_stem_arabic(token) if _is_arabic(token) else _stem_english(token))
+    return terms
+
+
+def words(text):
+    """Normalised words of `text` without stemming or stop-word removal (autocomplete, spelling)."""
+    return TOKEN_RE.findall(normalize(text))
+
+
+def normalized_query(query):
+    """The query's index terms, de-duplicated and sorted: queries that match and rank alike share it."""
+    return ' '.join(sorted(set(tokenize(query))))
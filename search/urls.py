@@ -6,6 +6,7 @@ app_name = 'search'
 urlpatterns = [
     # Main Search
     path('', views.search_view, name='search'),
+    path('click/', views.search_click, name='click'),
     
     # AJAX Endpoints
     path('autocomplete/', views.autocomplete, name='autocomplete'),
@@ -1,12 +1,27 @@
 # search/views.py
 from django.shortcuts import render
 from django.http import JsonResponse
-from django.db.models import Q, Count
-from django.views.decorators.http import require_GET
-from django.core.paginator import Paginator
+from django.db.models import Sum
+from django.views.decorators.http import require_GET, require_POST
+from django.core.paginator import Page
 
-from .models import SearchQuery, PopularSearch
+from .autocomplete import get_autocomplete_index
+from .engine import SORTS, products_in_order
+from .models import SearchQuery, PopularSearch, SearchQueryDaily, SearchDailyTotal
+from .query_log import log_search, stats as query_log_stats
+from .result_cache import search_page, cache_stats as result_cache_stats
+from .rollups import window_start
+from catalog.listing import _CountedPaginator, _parse_price
 from catalog.models import Product, Brand, Category
+from core.image_derivatives import prefetch_manifests
+
+
+def _with_counts(objects, counts):
+    """`objects` with a `result_count` attribute from {id: count}, most results first."""
+    objects = list(objects)
+    for obj in objects:
+        obj.result_count = counts.get(obj.id, 0)
+    return sorted(objects, key=lambda obj: (-obj.result_count, obj.name))
 
 
 def search_view(request):
@@ -25,98 +40,112 @@ def search_view(request):
     # Get filters
     brand_filter = request.GET.get('brand')
     category_filter = request.GET.get('category')
+    type_filter = request.GET.get('type')
     min_price = request.GET.get('min_price')
     max_price = request.GET.get('max_price')
     sort_by = request.GET.get('sort', 'relevance')
     
-    # Search products
-    products = Product.objects.filter(
-        Q(name__icontains=query) |
-        Q(description__icontains=query) |
-        Q(brand__name__icontains=query) |
-        Q(category__name__icontains=query),
-        is_active=True
-    ).select_related('brand', 'category').distinct()
-    
     # Apply filters
     filters_applied = {}
-    
+    filters = {}
+
     if brand_filter:
-        products = products.filter(brand__slug=brand_filter)
+        filters['brand_id'] = Brand.objects.filter(slug=brand_filter).values_list('id', flat=True).first() or 0
         filters_applied['brand'] = brand_filter
-    
+
     if category_filter:
-        products = products.filter(category__slug=category_filter)
+        filters['category_id'] = Category.objects.filter(slug=category_filter).values_list('id', flat=True).first() or 0
         filters_applied['category'] = category_filter
-    
+
+    if type_filter:
+        filters['product_type'] = type_filter
+        filters_applied['type'] = type_filter
+
     if min_price:
-        products = products.filter(base_price__gte=min_price)
+        filters['min_price'] = _parse_price(min_price)
         filters_applied['min_price'] = min_price
-    
+
     if max_price:
-        products = products.filter(base_price__lte=max_price)
+        filters['max_price'] = _parse_price(max_price)
         filters_applied['max_price'] = max_price
-    
-    # Sorting
-    if sort_by == 'price_low':
-        products = products.order_by('base_price')
-    elif sort_by == 'price_high':
-        products = products.order_by('-base_price')
-    elif sort_by == 'name':
-        products = products.order_by('name')
-    else:  # relevance
-        # TODO: Implement relevance scoring
-        products = products.order_by('-created_at')
-    
-    total_results = products.count()
-    
-    # Log search query
-    session_key = request.session.session_key
-    if not session_key:
-        request.session.create()
-        session_key = request.session.session_key
-    
-    SearchQuery.objects.create(
-        user=request.user if request.user.is_authenticated else None,
-        session_key=session_key,
-        query=query,
-        results_count=total_results,
-        filters_applied=filters_applied
+
+    # Search the index; relevance is BM25 (search/engine.py). Words the index
+    # has never seen ("rayban", "oakly") are spell-corrected first. Pages are
+    # cached per normalised query (search/result_cache.py).
+    if sort_by not in SORTS:
+        sort_by = 'relevance'
+    result = search_page(query, filters, sort_by, request.GET.get('page'), 24)
+    corrected_query = result['corrected_query']
+    total_results = result['total']
+    
+    # Log search query (buffered, written in batches by search/query_log.py)
+    log_search(
+        query,
+        total_results,
+        filters_applied,
+        user_id=request.user.pk if request.user.is_authenticated else None,
+        session_key=request.session.session_key,
     )
     
     # Pagination
-    paginator = Paginator(products, 24)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Get brands and categories for filters
-    available_brands = Brand.objects.filter(
-        id__in=Product.objects.filter(
-            Q(name__icontains=query) | Q(description__icontains=query),
-            is_active=True
-        ).values_list('brand_id', flat=True)
+    paginator = _CountedPaginator([], 24, total_results)
+    page_obj = Page(
+        products_in_order(result['ids'], Product.objects.select_related('brand', 'category', 'card')),
+        result['page'],
+        paginator,
     )
     
-    available_categories = Category.objects.filter(
-        id__in=Product.objects.filter(
-            Q(name__icontains=query) | Q(description__icontains=query),
-            is_active=True
-        ).values_list('category_id', flat=True)
-    )
+    # Facets, counted over the same matches as the results (search/engine.py)
+    facets = result['facets']
+    available_brands = _with_counts(Brand.objects.filter(id__in=facets['brands']), facets['brands'])
+    available_categories = _with_counts(Category.objects.filter(id__in=facets['categories']), facets['categories'])
+    type_labels = dict(Product.PRODUCT_TYPES)
+    available_types = [
+        {'value': value, 'label': type_labels.get(value, value), 'count': count}
+        for value, count in sorted(facets['product_types'].items(), key=lambda item: -item[1])
+    ]
     
     context = {
         'query': query,
+        'corrected_query': corrected_query,
         'products': page_obj,
         'total_results': total_results,
         'available_brands': available_brands,
         'available_categories': available_categories,
+        'available_types': available_types,
+        'price_buckets': [bucket for bucket in facets['price_buckets'] if bucket['count']],
         'filters_applied': filters_applied,
         'sort_by': sort_by,
+        'image_manifests': prefetch_manifests(
+            getattr(getattr(product, 'card', None), 'primary_image_url', '') for product in page_obj
+        ),
     }
     
     return render(request, 'search.html', context)
 
 
+@require_POST
+def search_click(request):
+    """Record a click on a search result (sent with navigator.sendBeacon from search.html)"""
+    query = request.POST.get('q', '').strip()
+    try:
+        product_id = int(request.POST.get('product_id', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Product ID required'}, status=400)
+    if not query:
+        return JsonResponse({'error': 'Query required'}, status=400)
+
+    # Logged like a search, as a row with clicked_product_id (search/click_priors.py)
+    log_search(
+        query,
+        0,
+        user_id=request.user.pk if request.user.is_authenticated else None,
+        session_key=request.session.session_key,
+        clicked_product_id=product_id,
+    )
+    return JsonResponse({'success': True})
+
+
 @require_GET
 def autocomplete(request):
     """Autocomplete suggestions (AJAX)"""
@@ -125,74 +154,14 @@ def autocomplete(request):
     if len(query) < 2:
         return JsonResponse({'suggestions': []})
     
-    # Get product suggestions
-    products = Product.objects.filter(
-        Q(name__icontains=query) | Q(brand__name__icontains=query),
-        is_active=True
-    ).select_related('brand')[:5]
-    
-    product_suggestions = [
-        {
-            'type': 'product',
-            'name': product.name,
-            'brand': product.brand.name if product.brand else '',
-            'url': f'/product/{product.slug}/',
-            'image': product.images.first().image.url if product.images.first() else None,
-            'price': str(product.base_price)
-        }
-        for product in products
-    ]
-    
-    # Get brand suggestions
-    brands = Brand.objects.filter(
-        name__icontains=query,
-        is_active=True
-    )[:3]
-    
-    brand_suggestions = [
-        {
-            'type': 'brand',
-            'name': brand.name,
-            'url': f'/brand/{brand.slug}/'
-        }
-        for brand in brands
-    ]
-    
-    # Get category suggestions
-    categories = Category.objects.filter(
-        name__icontains=query,
-        is_active=True
-    )[:3]
-    
-    category_suggestions = [
-        {
-            'type': 'category',
-            'name': category.name,
-            'url': f'/category/{category.slug}/'
-        }
-        for category in categories
-    ]
-    
-    # Get popular searches
-    popular = PopularSearch.objects.filter(
-        keyword__icontains=query,
-        is_active=True
-    )[:3]
-    
-    popular_suggestions = [
-        {
-            'type': 'popular',
-            'name': search.keyword,
-            'url': f'/search/?q={search.keyword}'
-        }
-        for search in popular
-    ]
+    # Products, brands, categories and popular searches from the in-memory index
+    suggestions = get_autocomplete_index().suggest(query, {'product': 5, 'brand': 3, 'category': 3, 'popular': 3})
     
     all_suggestions = (
-        product_suggestions + 
-        brand_suggestions + 
-        category_suggestions + 
-        popular_suggestions
+        suggestions['product'] + 
+        suggestions['brand'] + 
+        suggestions['category'] + 
+        suggestions['popular']
     )
     
     return JsonResponse({'suggestions': all_suggestions[:10]})
@@ -202,11 +171,11 @@ def autocomplete(request):
 def search_suggestions(request):
     """Get search suggestions for search bar"""
     query = request.GET.get('q', '').strip()
+    index = get_autocomplete_index()
     
     if len(query) < 2:
         # Return popular searches
-        popular = PopularSearch.objects.filter(is_active=True)[:5]
-        suggestions = [{'keyword': p.keyword} for p in popular]
+        suggestions = [{'keyword': keyword} for keyword in index.curated[:5]]
         return JsonResponse({'suggestions': suggestions})
     
     # Get recent searches by user
@@ -218,19 +187,10 @@ def search_suggestions(request):
         ).values('query').distinct()[:3]
         recent_searches = [{'keyword': s['query'], 'type': 'recent'} for s in recent]
     
-    # Get popular matching searches
-    popular = PopularSearch.objects.filter(
-        keyword__icontains=query,
-        is_active=True
-    )[:5]
-    popular_searches = [{'keyword': p.keyword, 'type': 'popular'} for p in popular]
-    
-    # Get product name matches
-    products = Product.objects.filter(
-        name__icontains=query,
-        is_active=True
-    ).values('name')[:3]
-    product_searches = [{'keyword': p['name'], 'type': 'product'} for p in products]
+    # Get popular matching searches and product name matches
+    suggestions = index.suggest(query, {'popular': 5, 'product': 3})
+    popular_searches = [{'keyword': p['name'], 'type': 'popular'} for p in suggestions['popular']]
+    product_searches = [{'keyword': p['name'], 'type': 'product'} for p in suggestions['product']]
     
     all_suggestions = recent_searches + popular_searches + product_searches
     
@@ -243,7 +203,8 @@ def search_history(request):
         return render(request, 'search_history.html', {'searches': []})
     
     searches = SearchQuery.objects.filter(
-        user=request.user
+        user=request.user,
+        clicked_product_id__isnull=True,
     ).order_by('-created_at')[:50]
     
     context = {
@@ -263,16 +224,13 @@ def clear_search_history(request):
 
 def trending_searches(request):
     """Get trending/popular searches"""
-    # Get most searched queries in last 30 days
-    from django.utils import timezone
-    from datetime import timedelta
+    # Get most searched queries in last 30 days (daily rollups, search/rollups.py)
+    thirty_days_ago = window_start(30)
     
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    
-    trending = SearchQuery.objects.filter(
-        created_at__gte=thirty_days_ago
+    trending = SearchQueryDaily.objects.filter(
+        day__gte=thirty_days_ago
     ).values('query').annotate(
-        search_count=Count('id')
+        search_count=Sum('searches')
     ).order_by('-search_count')[:20]
     
     context = {
@@ -288,39 +246,34 @@ def search_analytics(request):
     if not request.user.is_staff:
         return JsonResponse({'error': 'Access denied'}, status=403)
     
-    from django.utils import timezone
-    from datetime import timedelta
-    
-    # Last 30 days
-    thirty_days_ago = timezone.now() - timedelta(days=30)
+    # Last 30 days, from the daily rollups (search/rollups.py)
+    thirty_days_ago = window_start(30)
+    daily = SearchQueryDaily.objects.filter(day__gte=thirty_days_ago)
     
     # Top searches
-    top_searches = SearchQuery.objects.filter(
-        created_at__gte=thirty_days_ago
-    ).values('query').annotate(
-        count=Count('id')
+    top_searches = daily.values('query').annotate(
+        count=Sum('searches')
     ).order_by('-count')[:20]
     
     # Searches with no results
-    no_results = SearchQuery.objects.filter(
-        created_at__gte=thirty_days_ago,
-        results_count=0
+    no_results = daily.filter(
+        zero_results__gt=0
     ).values('query').annotate(
-        count=Count('id')
+        count=Sum('zero_results')
     ).order_by('-count')[:20]
     
-    # Total searches
-    total_searches = SearchQuery.objects.filter(
-        created_at__gte=thirty_days_ago
-    ).count()
+    # Totals
+    totals = SearchDailyTotal.objects.filter(day__gte=thirty_days_ago).aggregate(
+        searches=Sum('searches'), clicks=Sum('clicks')
+    )
     
     context = {
         'top_searches': top_searches,
         'no_results': no_results,
-        'total_searches': total_searches,
+        'total_searches': totals['searches'] or 0,
+        'total_clicks': totals['clicks'] or 0,
+        'result_cache': result_cache_stats(),  # hits / misses across all processes
+        'query_log': query_log_stats(),  # this process's buffered logging counters
     }
     
     return render(request, 'analytics.html', context)
-
-
- 
@@ -0,0 +1,18 @@
+# wishlist/signals.py
+"""
+Drops a user's cached wishlist count (cart/summary.py) whenever an item is
+added to or removed from their wishlist.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from cart.summary import invalidate_wishlist_count
+from .models import Wishlist, WishlistItem
+
+
+@receiver(post_save, sender=WishlistItem)
+@receiver(post_delete, sender=WishlistItem)
+def forget_wishlist_count(sender, instance, **kwargs):
+    user_id = Wishlist.objects.filter(pk=instance.wishlist_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate_wishlist_count(user_id)
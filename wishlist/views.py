@@ -1,6 +1,7 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST, require_http_methods
 
@@ -233,7 +234,7 @@ def clear_wishlist(request):
 
 @require_POST
 def move_to_cart(request, product_id):
-    """Add the product to the cart then remove it from the wishlist."""
+    """Add the product to the cart then remove it from the wishlist, in one transaction."""
     is_ajax = ajax_or_json(request)
 
     if not request.user.is_authenticated:
@@ -242,28 +243,21 @@ def move_to_cart(request, product_id):
         return redirect('/accounts/login/')
 
     try:
-        from cart.views import get_or_create_cart as get_cart
-        from cart.models import CartItem
+        from cart.batch import apply_cart_operations
+        from cart.store import get_cart_store
 
         product  = get_object_or_404(Product, id=product_id, is_active=True)
         wishlist = get_or_create_wishlist(request.user)
-        cart     = get_cart(request)
+        store    = get_cart_store(request)
 
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            defaults={'quantity': 1, 'unit_price': product.base_price},
-        )
-        if not created:
-            cart_item.quantity += 1
-            cart_item.save()
-
-        WishlistItem.objects.filter(wishlist=wishlist, product=product).delete()
+        with transaction.atomic():
+            apply_cart_operations(store, [{'op': 'add', 'product_id': product.id}])
+            WishlistItem.objects.filter(wishlist=wishlist, product=product).delete()
 
         if is_ajax:
             return JsonResponse({
                 'success':        True,
-                'cart_count':     cart.items.count(),
+                'cart_count':     store.quantity(),
                 'wishlist_count': get_wishlist_count(wishlist),
                 'message':        f'"{product.name}" moved to cart!',
             })
@@ -285,7 +279,7 @@ def move_to_cart(request, product_id):
 
 @require_POST
 def move_all_to_cart(request):
-    """Move every wishlist item to the cart at once."""
+    """Move every wishlist item to the cart at once: one cart batch, then one delete."""
     is_ajax = ajax_or_json(request)
 
     if not request.user.is_authenticated:
@@ -294,34 +288,24 @@ def move_all_to_cart(request):
         return redirect('/accounts/login/')
 
     try:
-        from cart.views import get_or_create_cart as get_cart
-        from cart.models import CartItem
+        from cart.batch import apply_cart_operations
+        from cart.store import get_cart_store
 
-        wishlist = get_or_create_wishlist(request.user)
-        cart     = get_cart(request)
-        moved    = 0
-
-        for wish_item in wishlist.items.select_related('product'):
-            product = wish_item.product
-            if not product.is_active:
-                continue
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=cart,
-                product=product,
-                defaults={'quantity': 1, 'unit_price': product.base_price},
-            )
-            if not created:
-                cart_item.quantity += 1
-                cart_item.save()
-            moved += 1
-
-        wishlist.items.all().delete()
+        wishlist    = get_or_create_wishlist(request.user)
+        store       = get_cart_store(request)
+        product_ids = list(wishlist.items.filter(product__is_active=True).values_list('product_id', flat=True))
+        moved       = len(product_ids)
+
+        with transaction.atomic():
+            if product_ids:
+                apply_cart_operations(store, [{'op': 'add', 'product_id': pid} for pid in product_ids])
+            wishlist.items.all().delete()
 
         if is_ajax:
             return JsonResponse({
                 'success':        True,
                 'moved':          moved,
-                'cart_count':     cart.items.count(),
+                'cart_count':     store.quantity(),
                 'wishlist_count': 0,
             })
 